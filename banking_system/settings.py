@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the recorded latency includes the other middleware.
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,11 +81,88 @@ WSGI_APPLICATION = 'banking_system.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # django.db.backends.sqlite3 plus the init_command and transaction_mode OPTIONS of Django 5.1.
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.environ.get('BANKING_DB_NAME', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# The production SQLite profile, applied to the default database with BANKING_DB_PRODUCTION=1. It is off by
+# default because journal_mode=WAL is stored in the database file: every connection, even `manage.py check`,
+# would convert db.sqlite3 and create the -wal/-shm files next to it.
+SQLITE_PRODUCTION = {
+    # Keep connections open across requests instead of reconnecting (and re-running init_command) each time.
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        # Seconds a connection waits for a lock held by another writer before failing.
+        'timeout': 20,
+        # Write transactions take the write lock when they begin, so they queue on `timeout` instead of
+        # failing when a read lock cannot be upgraded.
+        'transaction_mode': 'IMMEDIATE',
+        # WAL lets readers run while a writer commits. synchronous=FULL keeps every commit durable
+        # across power loss; NORMAL is faster but may lose the last commits.
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=FULL; PRAGMA cache_size=-65536; '
+                        'PRAGMA temp_store=MEMORY; PRAGMA mmap_size=268435456',
+    },
+}
+
+if os.environ.get('BANKING_DB_PRODUCTION') == '1':
+    DATABASES['default'].update(SQLITE_PRODUCTION)
+
+# Optional read replica. Reads of safe requests go to it (core.routers); keep it fresh with
+# `python manage.py sync_replica`, or point it at a real replica of the primary.
+if os.environ.get('BANKING_DB_REPLICA'):
+    DATABASES['replica'] = dict(DATABASES['default'], NAME=os.environ['BANKING_DB_REPLICA'],
+                                TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by every process on the host, like the SQLite database. Point it at memcached or another shared
+    # cache when processes run on several hosts.
+    'accounts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('BANKING_ACCOUNT_CACHE_DIR',
+                                   os.path.join(tempfile.gettempdir(), 'banking_system_accounts')),
+    },
+}
+
+
+# Account cache in front of Account.objects.get (see core/cache.py). It must be shared by every process that
+# writes accounts, or a process keeps serving a balance from before another process's write. Set
+# BANKING_SINGLE_PROCESS=1 when a single process serves requests and runs the management commands to use the
+# faster in-process LRU instead.
+
+if os.environ.get('BANKING_SINGLE_PROCESS') == '1':
+    ACCOUNT_CACHE = {
+        'BACKEND': 'core.cache.LRUBackend',
+        'SINGLE_PROCESS': True,
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'TIMEOUT': 5},
+    }
+else:
+    ACCOUNT_CACHE = {
+        'BACKEND': 'core.cache.DjangoCacheBackend',
+        'OPTIONS': {'CACHE_ALIAS': 'accounts', 'TIMEOUT': 300},
+    }
+
+
+# Group commit of deposits and withdrawals (see core/journal.py). When enabled, operations are committed in
+# batches of up to MAX_BATCH, or of whatever arrived within MAX_DELAY_MS, by one writer thread per process.
+
+LEDGER_JOURNAL = {
+    'ENABLED': os.environ.get('BANKING_LEDGER_JOURNAL') == '1',
+    'MAX_BATCH': 256,
+    'MAX_DELAY_MS': 2,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .metrics import install_query_counter
+        from .signals import invalidate_cached_account, record_created_account
+
+        Account = self.get_model('Account')
+        post_save.connect(invalidate_cached_account, sender=Account, dispatch_uid='invalidate_cached_account_save')
+        post_delete.connect(invalidate_cached_account, sender=Account,
+                            dispatch_uid='invalidate_cached_account_delete')
+        post_save.connect(record_created_account, sender=Account, dispatch_uid='record_created_account')
+        connection_created.connect(install_query_counter, dispatch_uid='install_query_counter')
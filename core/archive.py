@@ -0,0 +1,93 @@
+"""
+Hot/cold tiering of the ledger.
+
+Transactions older than a horizon are moved from Transaction (hot) to ArchivedTransaction (cold) with
+their ids unchanged, and each account's BalanceCheckpoint records the balance after its newest archived
+row. Archiving never touches AccountPeriodCounter or DailyBalance, so the rules are unaffected.
+`ledger_values` reads both tiers as one ledger for exports and rebuilds.
+"""
+import heapq
+from datetime import timedelta
+from operator import itemgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import ArchiveConstant
+from .models import ArchivedTransaction, BalanceCheckpoint, Transaction
+from .periods import day_start
+
+LEDGER_MODELS = (ArchivedTransaction, Transaction)
+_ARCHIVED_FIELDS = ('id', 'account_id', 'amount', 'transaction_type', 'timestamp',
+                    'available_balance_after_transaction', 'charge')
+
+
+def archive_cutoff(days=ArchiveConstant.HOT_DAYS, today=None):
+    """
+    Return the start of the day `days` days ago; older transactions are archived.
+    """
+    return day_start((today or timezone.localdate()) - timedelta(days=days))
+
+
+def archive_transactions(cutoff, account_ids=None, batch_size=ArchiveConstant.BATCH_SIZE):
+    """
+    Move every hot transaction older than `cutoff` to the archive, `batch_size` rows per database
+    transaction, so the job can be interrupted and rerun. Returns the number of rows moved.
+    """
+    transactions = Transaction.objects.filter(timestamp__lt=cutoff).order_by('pk')
+    if account_ids:
+        transactions = transactions.filter(account_id__in=account_ids)
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(transactions.values_list(*_ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                return moved
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction(**dict(zip(_ARCHIVED_FIELDS, row))) for row in rows])
+            Transaction.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            _advance_checkpoints(rows)
+        moved += len(rows)
+
+
+def _advance_checkpoints(rows):
+    newest = {}
+    counts = {}
+    for row in rows:
+        pk, account_id, timestamp = row[0], row[1], row[4]
+        counts[account_id] = counts.get(account_id, 0) + 1
+        if account_id not in newest or (timestamp, pk) > (newest[account_id][4], newest[account_id][0]):
+            newest[account_id] = row
+
+    checkpoints = BalanceCheckpoint.objects.select_for_update().in_bulk(newest, field_name='account_id')
+    for account_id, (pk, _, _, _, timestamp, balance_after, _) in newest.items():
+        checkpoint = checkpoints.get(account_id)
+        if checkpoint is None:
+            BalanceCheckpoint.objects.create(account_id=account_id, archived_through=timestamp,
+                                             last_transaction_id=pk, balance=balance_after,
+                                             archived_count=counts[account_id])
+            continue
+        checkpoint.archived_count += counts[account_id]
+        if (timestamp, pk) > (checkpoint.archived_through, checkpoint.last_transaction_id):
+            checkpoint.archived_through = timestamp
+            checkpoint.last_transaction_id = pk
+            checkpoint.balance = balance_after
+        checkpoint.save()
+
+
+def ledger_values(fields, chunk_size=ArchiveConstant.BATCH_SIZE, annotations=None, **filters):
+    """
+    Yield `values_list(*fields)` tuples of the transactions of both tiers matching `filters`,
+    ordered by (account, timestamp, id) as if the ledger were a single table. `fields` may name
+    `annotations`, a dict of expressions computed by the database.
+    """
+    tiers = [
+        model.objects.filter(**filters).annotate(**(annotations or {})).order_by(
+            'account_id', 'timestamp', 'id').values_list('account_id', *fields).iterator(chunk_size=chunk_size)
+        for model in LEDGER_MODELS
+    ]
+    # Every archived row of an account is older than its hot rows, so merging on the account alone is
+    # enough; heapq.merge is stable and yields the archive tier (listed first) before the hot tier.
+    for row in heapq.merge(*tiers, key=itemgetter(0)):
+        yield row[1:]
@@ -0,0 +1,152 @@
+"""
+Native async versions of the deposit, withdraw, history and KYC views, served under `async/` by the
+ASGI application (banking_system/asgi.py).
+
+Reads use Django's async ORM, so a request waiting on the database does not pin a worker thread. The
+deposit/withdraw write path holds a row lock inside transaction.atomic, which Django only supports in
+sync code, so it runs through sync_to_async on the shared database thread. Responses match the sync views.
+"""
+import json
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+
+from .cache import acached_account
+from .constants import IdempotencyConstant
+from .idempotency import IdempotencyError, record, replay, request_fingerprint
+from .models import Account
+from .pagination import InvalidHistoryParameter, ahistory_page, ahistory_rows, is_paginated
+from .serializers import TRANSACTION_ROWS
+
+
+def _async_view(*methods):
+    """
+    Restrict an async view to the given HTTP methods and exempt it from CSRF, like DRF's @api_view.
+    Django 4.2's own view decorators wrap views in sync functions, which breaks async views.
+    """
+    def decorator(view):
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view(request, *args, **kwargs)
+        wrapper.__name__ = view.__name__
+        wrapper.__doc__ = view.__doc__
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+async def _get_account(account_id):
+    try:
+        return await acached_account(account_id)
+    except Account.DoesNotExist:
+        return None
+
+
+async def _post_transaction(request, account_id, transaction_type):
+    key = request.headers.get(IdempotencyConstant.HEADER)
+    if key is None:
+        status_code, body = await _transaction_response(request, account_id, transaction_type)
+        return JsonResponse(body, status=status_code)
+
+    data = _request_data(request)
+    fingerprint = request_fingerprint(transaction_type, account_id, (data or {}).get('amount', 0))
+    try:
+        stored = await sync_to_async(replay)(key, fingerprint)
+        if stored is not None:
+            status_code, body = stored
+            response = JsonResponse(body, status=status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        # The key is stored in the transaction of the ledger write, so the whole request runs on the
+        # database thread.
+        respond = async_to_sync(_transaction_response)
+        status_code, body = await sync_to_async(record)(
+            key, fingerprint, lambda: respond(request, account_id, transaction_type))
+    except IdempotencyError as error:
+        return JsonResponse({"error": str(error)}, status=error.status_code)
+    return JsonResponse(body, status=status_code)
+
+
+async def _transaction_response(request, account_id, transaction_type):
+    account = await _get_account(account_id)
+    if account is None:
+        return 404, {"error": "Account not found"}
+
+    noun = 'Deposit' if transaction_type == 'deposit' else 'Withdrawal'
+    data = _request_data(request)
+    try:
+        amount = int(data.get('amount', 0)) if data is not None else 0
+    except (TypeError, ValueError):
+        amount = 0
+    if amount <= 0:
+        return 400, {"error": f"Invalid {noun.lower()} amount"}
+
+    operation = account.deposit if transaction_type == 'deposit' else account.withdraw
+    success, failed_reason = await sync_to_async(operation)(amount)
+    if success:
+        # DRF renders Decimals as JSON numbers; do the same so both paths return identical bodies.
+        return 200, {"message": f"{noun} successful", "updated_balance": float(account.get_balance())}
+    return 400, {"error": f"{noun} failed because {failed_reason}"}
+
+
+@_async_view('POST')
+async def deposit(request, account_id):
+    """
+    Async version of `core.views.deposit`.
+    """
+    return await _post_transaction(request, account_id, 'deposit')
+
+
+@_async_view('POST')
+async def withdraw(request, account_id):
+    """
+    Async version of `core.views.withdraw`.
+    """
+    return await _post_transaction(request, account_id, 'withdrawal')
+
+
+@_async_view('GET')
+async def transaction_history(request, account_id):
+    """
+    Async version of `core.views.transaction_history`.
+    """
+    if not await Account.objects.filter(pk=account_id).aexists():
+        return JsonResponse({"error": "Account not found"}, status=404)
+
+    try:
+        if not is_paginated(request.GET):
+            rows = await ahistory_rows(account_id, request.GET, TRANSACTION_ROWS.columns)
+            return JsonResponse(TRANSACTION_ROWS.rows(rows), status=200, safe=False)
+        rows, next_cursor = await ahistory_page(account_id, request.GET, TRANSACTION_ROWS.columns)
+    except InvalidHistoryParameter as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    return JsonResponse({"results": TRANSACTION_ROWS.rows(rows), "next_cursor": next_cursor}, status=200)
+
+
+@_async_view('PATCH')
+async def update_kyc_status(request, account_id):
+    """
+    Async version of `core.views.update_kyc_status`.
+    """
+    account = await _get_account(account_id)
+    if account is None:
+        return JsonResponse({"error": "Account not found"}, status=404)
+
+    data = _request_data(request)
+    kyc_verified = data.get('kyc_verified', None) if data is not None else None
+    if kyc_verified is None:
+        return JsonResponse({"error": "KYC flag not provided"}, status=400)
+
+    await account.aupdate_kyc_status(kyc_verified)
+    return JsonResponse({"message": "KYC status updated successfully"}, status=200)
@@ -0,0 +1,41 @@
+"""
+SQLite backend with the `init_command` and `transaction_mode` OPTIONS of Django 5.1.
+
+- init_command: SQL statements, separated by semicolons, run on every new connection (e.g. PRAGMAs).
+- transaction_mode: 'DEFERRED', 'IMMEDIATE' or 'EXCLUSIVE'. With 'IMMEDIATE', `transaction.atomic()` takes the
+  write lock when it starts, so a concurrent writer waits up to the `timeout` option for it instead of failing
+  with "database is locked" when its read lock cannot be upgraded.
+
+Once the project is on Django 5.1 or later, switch ENGINE back to 'django.db.backends.sqlite3' and remove
+this package.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        transaction_mode = kwargs.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] must be one of "
+                f"{', '.join(TRANSACTION_MODES)}.")
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in (self.init_command or '').split(';'):
+            if statement.strip():
+                conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -0,0 +1,229 @@
+"""
+Posting of many deposits and withdrawals in one request.
+
+Operations are grouped by account. Each account is loaded once with its RuleContext, the existing
+strategies are evaluated in memory in request order, and the ledger rows are written with a single
+bulk_create. Accounts are processed in id order, so batches that share accounts lock them in the
+same order.
+
+`apply_operations` posts a whole list in the caller's transaction instead: every account is locked with one
+query and every table is written with one bulk statement, however many accounts the list touches. The
+ledger journal posts its group commits with it.
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import account_cache
+from .constants import BatchConstant
+from .models import Account, AccountPeriodCounter, DailyBalance, RollupDelta, RuleContext, Transaction
+from .periods import month_start
+
+
+class StaleBalance(Exception):
+    """
+    The account balance changed between loading the account and writing the batch.
+    """
+
+
+class BatchRolledBack(Exception):
+    """
+    Raised inside an all-or-nothing batch to undo it after an operation was rejected.
+    """
+
+
+def post_operations(operations, atomic=False):
+    """
+    Post a list of operations and return one result per operation, in request order.
+
+    Parameters:
+    - operations: A list of dicts with `account_id`, `transaction_type` ('deposit' or 'withdrawal') and `amount`.
+    - atomic: When True, the whole batch is committed only if every operation is allowed.
+      Otherwise each account's operations are committed on their own and rejected operations are skipped.
+
+    Returns:
+    - A list of result dicts with `status` 'posted', 'rejected' or 'rolled_back', the failure `reason`
+      and the `updated_balance` after a posted operation.
+    """
+    results, groups = _results(operations)
+    if not atomic:
+        for account_id in sorted(groups):
+            _post_account_operations(account_id, groups[account_id])
+        return results
+
+    try:
+        with transaction.atomic():
+            for account_id in sorted(groups):
+                _post_account_operations(account_id, groups[account_id])
+            if any(result['status'] == 'rejected' for result in results):
+                raise BatchRolledBack
+    except BatchRolledBack:
+        for result in results:
+            if result['status'] == 'posted':
+                result.update(status='rolled_back', reason=BatchConstant.FAILURE_REASONS["BATCH_ROLLED_BACK"],
+                              updated_balance=None)
+    return results
+
+
+def apply_operations(operations):
+    """
+    Post a list of operations inside the caller's transaction, writing each table with one bulk statement,
+    and return one result per operation, in request order, as `post_operations` does. Rejected operations
+    are skipped.
+
+    The accounts are locked with one SELECT ... FOR UPDATE in id order, so the balances are written with an
+    upsert on the primary key rather than compare-and-set per account, as in core.interest.
+    """
+    results, groups = _results(operations)
+    accounts = RuleContext.annotate(Account.objects.select_for_update(of=('self',))).filter(pk__in=groups)
+    accounts = {account.pk: account for account in accounts.order_by('pk')}
+    contexts = RuleContext.load(accounts.values())
+
+    changed = []
+    ledger = []
+    for account_id in sorted(groups):
+        account = accounts.get(account_id)
+        if account is None:
+            for result in groups[account_id]:
+                result['reason'] = BatchConstant.FAILURE_REASONS["ACCOUNT_NOT_FOUND"]
+            continue
+        context = contexts[account_id]
+        opening_balance = account.balance
+        rows = _evaluate(account, context, groups[account_id])
+        if rows:
+            account.version += 1
+            changed.append((account, context, opening_balance))
+            ledger.extend(rows)
+    if not ledger:
+        return results
+
+    now = timezone.now()
+    today = timezone.localdate(now)
+    period = month_start(now)
+    for row in ledger:
+        row.timestamp = now
+    Account.objects.bulk_create([account for account, _, _ in changed], update_conflicts=True,
+                                unique_fields=['pk'], update_fields=['balance', 'version'])
+    Transaction.objects.bulk_create(ledger)
+    RollupDelta.record_ledger(accounts, ledger)
+    AccountPeriodCounter.objects.bulk_create(
+        [AccountPeriodCounter(account_id=account.pk, period=period, withdrawal_count=context.withdrawal_count,
+                              deposit_total=context.deposit_total) for account, context, _ in changed],
+        update_conflicts=True, unique_fields=['account', 'period'],
+        update_fields=['withdrawal_count', 'deposit_total'])
+    DailyBalance.objects.bulk_create(
+        [daily_row(account, context.latest, opening_balance, today) for account, context, opening_balance in changed],
+        update_conflicts=True, unique_fields=['account', 'date'], update_fields=['closing_balance'])
+    cache = account_cache()
+    for account, _, _ in changed:
+        cache.write_through(account)
+    return results
+
+
+def daily_row(account, latest, opening_balance, today):
+    """
+    Return today's DailyBalance row of an account after a batch changed its balance from `opening_balance`,
+    given its latest row before the batch (`RuleContext.latest`). Upserting it only writes the closing
+    balance when the row already exists.
+    """
+    if latest is not None and latest.date == today:
+        row = DailyBalance(account_id=account.pk, date=today, opening_balance=opening_balance,
+                           cumulative_balance=latest.cumulative_balance)
+    elif latest is not None:
+        # The closing balance of the latest row is the balance before the batch.
+        row = DailyBalance(account_id=account.pk, date=latest.date, closing_balance=opening_balance,
+                           cumulative_balance=latest.cumulative_balance).carried_to(today)
+    else:
+        row = DailyBalance(account_id=account.pk, date=today, opening_balance=opening_balance, cumulative_balance=0)
+    row.closing_balance = account.balance
+    return row
+
+
+def _results(operations):
+    """
+    Return the pending result of every operation and the results grouped by account, in request order.
+    """
+    results = [
+        {
+            'index': index,
+            'account_id': operation['account_id'],
+            'transaction_type': operation['transaction_type'],
+            'amount': operation['amount'],
+            'status': 'rejected',
+            'reason': '',
+            'updated_balance': None,
+        }
+        for index, operation in enumerate(operations)
+    ]
+    groups = OrderedDict()
+    for result in results:
+        groups.setdefault(result['account_id'], []).append(result)
+    return results, groups
+
+
+def _post_account_operations(account_id, results):
+    for attempt in range(BatchConstant.MAX_STALE_RETRIES):
+        try:
+            with transaction.atomic():
+                return _apply(account_id, results)
+        except StaleBalance:
+            for result in results:
+                result.update(status='rejected', reason='', updated_balance=None)
+    for result in results:
+        result['reason'] = BatchConstant.FAILURE_REASONS["ACCOUNT_BUSY"]
+
+
+def _apply(account_id, results):
+    try:
+        account = RuleContext.annotate(Account.objects.select_for_update(of=('self',))).get(pk=account_id)
+    except Account.DoesNotExist:
+        for result in results:
+            result['reason'] = BatchConstant.FAILURE_REASONS["ACCOUNT_NOT_FOUND"]
+        return
+
+    context = RuleContext.load([account])[account.pk]
+    opening_balance = account.balance
+    withdrawal_count, deposit_total = context.withdrawal_count, context.deposit_total
+    ledger_rows = _evaluate(account, context, results)
+    if not ledger_rows:
+        return
+    # Compare-and-set on the version the rules were evaluated against: on backends where
+    # select_for_update() is a no-op a concurrent writer makes this update miss and the group is retried.
+    updated = Account.objects.filter(pk=account.pk, version=account.version).update(
+        balance=F('balance') + (account.balance - opening_balance), version=F('version') + 1)
+    if not updated:
+        raise StaleBalance
+    account.version += 1
+    account_cache().write_through(account)
+    Transaction.objects.bulk_create(ledger_rows)
+    RollupDelta.record_ledger({account.pk: account}, ledger_rows)
+    AccountPeriodCounter.add(account, withdrawal_count=context.withdrawal_count - withdrawal_count,
+                             deposit_total=context.deposit_total - deposit_total)
+    DailyBalance.record(account, opening_balance, account.balance)
+
+
+def _evaluate(account, context, results):
+    """
+    Evaluate an account's operations in request order against its in-memory balance and context, advancing
+    both, and return the ledger rows of the allowed ones.
+    """
+    ledger_rows = []
+    for result in results:
+        allowed, reason, ledger_amount = account.check_operation(result['transaction_type'], result['amount'],
+                                                                 context)
+        if not allowed:
+            result['reason'] = reason
+            continue
+        if result['transaction_type'] == 'deposit':
+            account.balance += ledger_amount
+        else:
+            account.balance -= ledger_amount
+        context.record(result['transaction_type'], ledger_amount)
+        ledger_rows.append(Transaction(account=account, amount=ledger_amount,
+                                       charge=ledger_amount - result['amount'],
+                                       transaction_type=result['transaction_type'],
+                                       available_balance_after_transaction=account.balance))
+        result.update(status='posted', updated_balance=account.balance)
+    return ledger_rows
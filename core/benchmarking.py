@@ -0,0 +1,110 @@
+"""
+Shared helpers for the benchmark management commands (bench_*).
+
+Benchmarks never touch the configured database: they run against a freshly migrated, file-backed
+scratch copy that is dropped afterwards, so several threads or processes can share it.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Account, Bank, User
+
+
+@contextmanager
+def scratch_database(alias='default'):
+    """
+    Point `alias` at a freshly migrated scratch database for the duration of the block.
+    A scratch SQLite database runs with the production profile (settings.SQLITE_PRODUCTION).
+    """
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    old_options = connection.settings_dict['OPTIONS']
+    if connection.vendor == 'sqlite':
+        # The default SQLite test database lives in memory and cannot be shared between processes.
+        fd, path = tempfile.mkstemp(prefix='bench-', suffix='.sqlite3')
+        os.close(fd)
+        connection.settings_dict['TEST']['NAME'] = path
+        # It is outside the working tree, so WAL mode and its -wal/-shm files are harmless.
+        connection.settings_dict['OPTIONS'] = dict(settings.SQLITE_PRODUCTION['OPTIONS'])
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connections.close_all()
+        connection.settings_dict['OPTIONS'] = old_options
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def create_account(account_type='regular_saving', balance=0, kyc_verified=True, bank=None, user=None,
+                   account_number=None):
+    """
+    Create an account, plus a bank and a user when none are given.
+    """
+    bank = bank or Bank.objects.create(name='Bench Bank', location='Bench')
+    user = user or User.objects.create(name='Bench User', address='Bench')
+    account_number = account_number or f"BENCH-{time.monotonic_ns()}"
+    return Account.objects.create(account_number=account_number, account_type=account_type, balance=balance,
+                                  kyc_verified=kyc_verified, bank=bank, user=user)
+
+
+def percentile(sorted_values, pct):
+    """
+    Return the `pct` percentile (0-100) of an already sorted list, or 0 for an empty list.
+    """
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(function, repeat, rollback=False, number=1):
+    """
+    Time `repeat` samples of `number` calls of `function` and return the sorted per-call durations in seconds.
+    Use a large `number` for functions too fast to time one call at a time. With `rollback`, each sample
+    runs in a transaction that is rolled back afterwards, so every sample sees the same database state;
+    the rollback itself is not timed.
+    """
+    durations = []
+    for _ in range(repeat):
+        with transaction.atomic():
+            started = time.perf_counter()
+            for _ in range(number):
+                function()
+            durations.append((time.perf_counter() - started) / number)
+            transaction.set_rollback(rollback)
+    return sorted(durations)
+
+
+def summarize(durations):
+    """
+    Summarize sorted durations (seconds) as milliseconds.
+    """
+    return {
+        'runs': len(durations),
+        'median_ms': round(statistics.median(durations) * 1000, 6) if durations else 0,
+        'p95_ms': round(percentile(durations, 95) * 1000, 6),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 6) if durations else 0,
+    }
+
+
+def find_regressions(results, baseline, threshold, min_delta_ms=0):
+    """
+    Compare two {name: summary} mappings and return (name, baseline_ms, current_ms) for every benchmark
+    whose median is more than `threshold` (e.g. 0.2 for 20%) and more than `min_delta_ms` slower than in
+    the baseline. The absolute floor keeps timer noise on sub-microsecond benchmarks from being flagged.
+    """
+    regressions = []
+    for name, summary in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        slowdown = summary['median_ms'] - previous['median_ms']
+        if slowdown > previous['median_ms'] * threshold and slowdown > min_delta_ms:
+            regressions.append((name, previous['median_ms'], summary['median_ms']))
+    return regressions
@@ -0,0 +1,239 @@
+"""
+Write-through cache of account state in front of `Account.objects.get`.
+
+Entries hold every concrete field of an account, including its `version`, which every ledger or KYC
+write increments. Writers drop the cached entry inside their transaction and store the new state once it
+commits; readers only fill missing entries, and a store does not replace an entry with an older version.
+The cache is not strictly consistent: with a backend whose version check is not atomic, two racing stores
+can leave the older state cached, and a backend that other processes cannot see keeps serving state from
+before their writes. Either lasts until the account's next write or until the entry expires after TIMEOUT
+seconds.
+
+The backend is pluggable through the ACCOUNT_CACHE setting:
+- core.cache.DjangoCacheBackend (the default): Any Django cache. Use one that every process writing the
+  database shares (file-based, memcached, ...); a locmem cache has the same limits as LRUBackend. The
+  version check is a get followed by a set.
+- core.cache.LRUBackend: In-process LRU dict. Version checks are atomic, but each process has its own copy,
+  so writes made by other processes (other server workers, management commands, pool children) only drop an
+  entry there once it expires. It is only accepted with 'SINGLE_PROCESS': True in ACCOUNT_CACHE, which
+  states that a single process writes the database.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_ACCOUNT_CACHE = {
+    'BACKEND': 'core.cache.DjangoCacheBackend',
+    'OPTIONS': {'CACHE_ALIAS': 'default', 'TIMEOUT': 300},
+}
+
+
+class LRUBackend:
+    def __init__(self, MAX_ENTRIES=10000, TIMEOUT=5):
+        self.max_entries = MAX_ENTRIES
+        self.timeout = TIMEOUT
+        self.evictions = 0
+        # key -> (expiry on the time.monotonic() clock or None, entry)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def add(self, key, entry):
+        with self._lock:
+            if self._live(key) is None:
+                self._insert(key, entry)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._insert(key, entry)
+
+    def set_if_newer(self, key, entry):
+        with self._lock:
+            current = self._live(key)
+            if current is None or current['version'] < entry['version']:
+                self._insert(key, entry)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _live(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _insert(self, key, entry):
+        expires_at = None if self.timeout is None else time.monotonic() + self.timeout
+        self._entries[key] = (expires_at, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+class DjangoCacheBackend:
+    def __init__(self, CACHE_ALIAS='default', TIMEOUT=300, KEY_PREFIX='account'):
+        self.cache = caches[CACHE_ALIAS]
+        self.timeout = TIMEOUT
+        self.key_prefix = KEY_PREFIX
+        self.evictions = 0
+
+    def _key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def add(self, key, entry):
+        self.cache.add(self._key(key), entry, self.timeout)
+
+    def set(self, key, entry):
+        self.cache.set(self._key(key), entry, self.timeout)
+
+    def set_if_newer(self, key, entry):
+        current = self.cache.get(self._key(key))
+        if current is None or current['version'] < entry['version']:
+            self.cache.set(self._key(key), entry, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def clear(self):
+        self.cache.clear()
+
+
+class AccountCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, account_id):
+        """
+        Return the account with the given id, from the cache when possible.
+        Raises Account.DoesNotExist like `Account.objects.get`.
+        """
+        from .models import Account
+
+        entry = self.backend.get(account_id)
+        if entry is not None:
+            self._count('hits')
+            return Account.from_db(None, list(entry), list(entry.values()))
+        self._count('misses')
+        # Fill from the primary: an entry read from a lagging replica could be older than the latest write.
+        account = Account.objects.using(router.db_for_write(Account)).get(pk=account_id)
+        self.backend.add(account_id, self._entry(account))
+        return account
+
+    async def aget(self, account_id):
+        """
+        Async variant of `get`; a miss is loaded with `Account.objects.aget`.
+        """
+        from .models import Account
+
+        entry = self.backend.get(account_id)
+        if entry is not None:
+            self._count('hits')
+            return Account.from_db(None, list(entry), list(entry.values()))
+        self._count('misses')
+        account = await Account.objects.using(router.db_for_write(Account)).aget(pk=account_id)
+        self.backend.add(account_id, self._entry(account))
+        return account
+
+    def store(self, account):
+        self._count('stores')
+        self.backend.set_if_newer(account.pk, self._entry(account))
+
+    def invalidate(self, account_id):
+        self._count('invalidations')
+        self.backend.delete(account_id)
+
+    def write_through(self, account):
+        """
+        Drop the cached entry now and store the account's current state when the surrounding transaction
+        commits. Call after writing the account, with `version` already incremented.
+        """
+        entry = self._entry(account)
+        self.invalidate(account.pk)
+        transaction.on_commit(lambda: self._store_entry(account.pk, entry))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'invalidations': self.invalidations,
+            'evictions': self.backend.evictions,
+        }
+
+    def _store_entry(self, account_id, entry):
+        self._count('stores')
+        self.backend.set_if_newer(account_id, entry)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _entry(account):
+        return {field.attname: getattr(account, field.attname) for field in account._meta.concrete_fields}
+
+
+@lru_cache(maxsize=None)
+def account_cache():
+    """
+    Return the process-wide AccountCache configured by the ACCOUNT_CACHE setting.
+    """
+    config = getattr(settings, 'ACCOUNT_CACHE', DEFAULT_ACCOUNT_CACHE)
+    backend_class = import_string(config['BACKEND'])
+    if issubclass(backend_class, LRUBackend) and not config.get('SINGLE_PROCESS'):
+        raise ImproperlyConfigured(
+            "ACCOUNT_CACHE: LRUBackend is per process and serves stale accounts after writes made by other "
+            "processes. Use DjangoCacheBackend on a shared cache, or set 'SINGLE_PROCESS': True when only one "
+            "process writes the database."
+        )
+    return AccountCache(backend_class(**config.get('OPTIONS', {})))
+
+
+def cached_account(account_id):
+    return account_cache().get(account_id)
+
+
+async def acached_account(account_id):
+    return await account_cache().aget(account_id)
+
+
+@receiver(setting_changed)
+def reset_account_cache(setting, **kwargs):
+    if setting in ('ACCOUNT_CACHE', 'CACHES'):
+        account_cache.cache_clear()
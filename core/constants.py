@@ -1,3 +1,6 @@
+from decimal import Decimal
+
+
 class AccountConstants:
     ACCOUNT_TYPES = (
         ('zero_balance', 'Zero Balance Account'),
@@ -22,6 +25,7 @@ class StudentAccountWithdrawalConstant(WithdrawalConstant):
 class SavingAccountWithdrawalConstant(WithdrawalConstant):
     MONTHLY_WITHDRAWAL_LIMIT = 10
     AVERAGE_BALANCE = 5000
+    AVERAGE_BALANCE_DAYS = 90
     EXTRA_WITHDRAWAL_CHARGE = 5
 
 
@@ -35,3 +39,136 @@ class DepositConstant:
 
 class StudentAccountDepositConstant(DepositConstant):
     MONTHLY_DEPOSIT_LIMIT = 10000
+
+
+class BatchConstant:
+    MAX_OPERATIONS = 5000
+    MAX_STALE_RETRIES = 3
+    FAILURE_REASONS = {
+        "ACCOUNT_NOT_FOUND": "Account not found",
+        "ACCOUNT_BUSY": "The account balance kept changing, retry the operation.",
+        "BATCH_ROLLED_BACK": "Another operation in the batch failed.",
+    }
+
+
+class TransferConstant:
+    # Transfers posted per database transaction by `post_transfers` and the `settle_transfers` command.
+    BATCH_SIZE = 1000
+    MAX_REFERENCE_LENGTH = 100
+    FAILURE_REASONS = {
+        "INVALID_AMOUNT": "The amount must be a positive number",
+        "SAME_ACCOUNT": "The source and destination accounts must differ",
+        "ACCOUNT_NOT_FOUND": "Account not found",
+        "DUPLICATE_REFERENCE": "A transfer with this reference was already posted",
+        "ACCOUNT_BUSY": "The account balances kept changing, retry the transfer.",
+        "BATCH_ROLLED_BACK": "Another transfer in the batch failed.",
+    }
+
+
+class HistoryConstant:
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 500
+    FAILURE_REASONS = {
+        "INVALID_CURSOR": "Invalid cursor",
+        "INVALID_PAGE_SIZE": "page_size must be a positive integer",
+        "INVALID_DATE": "from and to must be ISO 8601 dates or datetimes",
+        "INVALID_TRANSACTION_TYPE": "Invalid transaction type",
+    }
+
+
+class ExportConstant:
+    FORMATS = ('ndjson', 'csv')
+    CHUNK_SIZE = 2000
+    FLUSH_BYTES = 64 * 1024
+
+
+class IdempotencyConstant:
+    HEADER = 'Idempotency-Key'
+    MAX_KEY_LENGTH = 255
+    TTL_HOURS = 24
+    FRONT_CACHE_SIZE = 100000
+    PURGE_BATCH_SIZE = 5000
+    FAILURE_REASONS = {
+        "INVALID_KEY": "Idempotency-Key must be 1 to 255 characters",
+        "KEY_REUSED": "Idempotency-Key was already used for a different request",
+    }
+
+
+class ArchiveConstant:
+    # Transactions older than this many days are moved to the archive tier.
+    HOT_DAYS = 365
+    BATCH_SIZE = 5000
+
+
+class ReconcileConstant:
+    CHUNK_SIZE = 100000
+    REPORT_LIMIT = 20
+    # Account ids per balance query; stays under SQLite's limit of 999 query parameters.
+    ACCOUNT_BATCH_SIZE = 900
+
+
+class StatementConstant:
+    BATCH_SIZE = 1000
+    FAILURE_REASONS = {
+        "INVALID_MONTH": "month must be formatted YYYY-MM",
+        "STATEMENT_NOT_FOUND": "No statement for this month; it may not be closed yet",
+    }
+
+
+class InterestConstant:
+    ACCOUNT_TYPES = ('regular_saving',)
+    ANNUAL_RATE = Decimal('0.035')
+    DAYS_PER_YEAR = 365
+    CHUNK_SIZE = 5000
+    # Decimal places of InterestAccrual.annual_rate.
+    RATE_DECIMAL_PLACES = 5
+
+
+class RollupConstant:
+    BATCH_SIZE = 10000
+
+
+class BenchmarkConstant:
+    SCALES = [10, 1000, 100000]
+    REPEAT = 200
+    PAGE_SIZE = 50
+    SEED_BATCH_SIZE = 5000
+    INNER_LOOP = 1000
+    # A benchmark regresses when its median is this much, and at least REGRESSION_MIN_DELTA_MS, slower
+    # than in the baseline. Two runs of the same code drift apart by up to 30%, about 2.6ms on a deposit,
+    # so the floor sits above that.
+    REGRESSION_THRESHOLD = 0.2
+    REGRESSION_MIN_DELTA_MS = 3.0
+    # Fewer timed calls than this give medians too noisy to compare with a baseline.
+    MIN_COMPARE_REPEAT = 100
+
+
+class LoadTestConstant:
+    REQUESTS = 2000
+    WORKERS = 16
+    ACCOUNTS = 100
+    MIX = 'deposit=35,withdraw=25,history=30,update_kyc=5,create_account=5'
+    ZIPF_EXPONENT = 1.1
+    INITIAL_BALANCE = 100000
+
+
+class ImportConstant:
+    BATCH_SIZE = 5000
+    # File extensions and the record formats they imply.
+    FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+class MetricsConstant:
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+    # Histogram bucket upper bounds in seconds.
+    REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    RULE_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+
+
+class DatabaseConstant:
+    REPLICA_ALIAS = 'replica'
+    # After a write, the client's reads stay on the primary for this long, so it reads its own writes even
+    # though the replica lags behind.
+    PIN_COOKIE = 'primary_pin'
+    PIN_SECONDS = 60
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
@@ -0,0 +1,92 @@
+"""
+Streaming ledger exports as NDJSON or CSV, optionally gzip-compressed on the fly.
+
+Rows are read from both ledger tiers with `values_list(...).iterator(chunk_size=...)` and encoded one at
+a time, so memory stays constant regardless of the size of the ledger. The columns and their representation
+are those of TransactionSerializer (see `TRANSACTION_ROWS`), so exports and the history API describe rows
+the same way.
+"""
+import csv
+import io
+import json
+import zlib
+
+from .constants import ExportConstant
+from .archive import ledger_values
+from .serializers import TRANSACTION_ROWS
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def ledger_rows(account_id=None, bank_id=None, chunk_size=ExportConstant.CHUNK_SIZE):
+    """
+    Yield ledger rows as tuples of `TRANSACTION_ROWS.columns`, oldest first per account.
+    """
+    filters = {}
+    if account_id is not None:
+        filters['account_id'] = account_id
+    if bank_id is not None:
+        filters['account__bank_id'] = bank_id
+    return ledger_values(TRANSACTION_ROWS.columns, chunk_size=chunk_size, **filters)
+
+
+def ndjson_lines(rows):
+    for row in TRANSACTION_ROWS.iter_rows(rows):
+        yield json.dumps(row) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TRANSACTION_ROWS.field_names)
+    for row in TRANSACTION_ROWS.iter_rows(rows):
+        writer.writerow(row.values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header is flushed with the first row; an empty ledger still gets one.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _coalesce(lines, flush_bytes):
+    """
+    Join small encoded lines into chunks of roughly `flush_bytes` to keep the per-chunk overhead low.
+    """
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= flush_bytes:
+            yield b''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield b''.join(pending)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(rows, file_format='ndjson', compress=False, flush_bytes=ExportConstant.FLUSH_BYTES):
+    """
+    Encode ledger rows into a stream of byte chunks.
+    """
+    lines = ndjson_lines(rows) if file_format == 'ndjson' else csv_lines(rows)
+    chunks = _coalesce(lines, flush_bytes)
+    return _gzip(chunks) if compress else chunks
+
+
+def export_filename(scope, pk, file_format, compress):
+    return f"ledger-{scope}-{pk}.{file_format}" + ('.gz' if compress else '')
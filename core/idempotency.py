@@ -0,0 +1,114 @@
+"""
+Deduplication of retried deposits and withdrawals sent with an Idempotency-Key header.
+
+The first request with a key runs normally and its response is stored in the IdempotencyKey table in the
+same database transaction as the ledger write, so a stored response always matches a committed write and a
+rolled back write leaves no key behind. A retry with the same key is answered from the stored response
+without loading the account or evaluating any rule. Keys are the table's primary key, so a lookup is one
+index probe however many keys are stored; committed responses are also kept in an in-process LRU in front
+of the table. Keys expire after IdempotencyConstant.TTL_HOURS and are deleted by the
+`purge_idempotency_keys` command.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .cache import LRUBackend
+from .constants import IdempotencyConstant
+from .models import IdempotencyKey
+
+_front_cache = LRUBackend(MAX_ENTRIES=IdempotencyConstant.FRONT_CACHE_SIZE)
+
+
+class IdempotencyError(Exception):
+    status_code = 400
+
+
+class InvalidIdempotencyKey(IdempotencyError):
+    def __init__(self):
+        super().__init__(IdempotencyConstant.FAILURE_REASONS["INVALID_KEY"])
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    status_code = 422
+
+    def __init__(self):
+        super().__init__(IdempotencyConstant.FAILURE_REASONS["KEY_REUSED"])
+
+
+def request_fingerprint(transaction_type, account_id, amount, *details):
+    """
+    Identify the request a key is used for: the operation, the account and the amount as sent, plus any other
+    `details` of the request (e.g. a transfer's destination).
+    """
+    return hashlib.sha256('|'.join(map(str, (transaction_type, account_id, amount) + details)).encode()).hexdigest()
+
+
+def replay(key, fingerprint):
+    """
+    Return the stored (status_code, response_body) for `key`, or None if the key is new or expired.
+
+    Raises InvalidIdempotencyKey for an empty or over-long key, and IdempotencyKeyReused if the key was
+    stored for a different request.
+    """
+    if not key or len(key) > IdempotencyConstant.MAX_KEY_LENGTH:
+        raise InvalidIdempotencyKey
+    now = timezone.now()
+    entry = _front_cache.get(key)
+    if entry is None or entry['expires_at'] <= now:
+        row = IdempotencyKey.objects.filter(key=key, expires_at__gt=now).first()
+        if row is None:
+            return None
+        entry = _entry(row)
+        _front_cache.set(key, entry)
+    if entry['fingerprint'] != fingerprint:
+        raise IdempotencyKeyReused
+    return entry['status_code'], entry['response_body']
+
+
+def record(key, fingerprint, respond):
+    """
+    Run `respond`, which performs the request and returns (status_code, response_body), and store its
+    response under `key` in the same transaction. If another request stored the key first, the work done
+    by `respond` is rolled back and that request's response is returned instead.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            status_code, response_body = respond()
+            # An expired row keeps its primary key until it is purged.
+            IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+            row = IdempotencyKey.objects.create(
+                key=key, fingerprint=fingerprint, status_code=status_code, response_body=response_body,
+                created_at=now, expires_at=now + timedelta(hours=IdempotencyConstant.TTL_HOURS))
+            transaction.on_commit(lambda: _front_cache.set(key, _entry(row)))
+    except IntegrityError:
+        stored = replay(key, fingerprint)
+        if stored is None:
+            raise
+        return stored
+    return status_code, response_body
+
+
+def purge_expired(batch_size=IdempotencyConstant.PURGE_BATCH_SIZE, now=None):
+    """
+    Delete expired keys in batches of `batch_size`, using the expires_at index. Returns the number deleted.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        keys = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(key__in=keys).delete()[0]
+
+
+def clear_front_cache():
+    _front_cache.clear()
+
+
+def _entry(row):
+    return {'fingerprint': row.fingerprint, 'status_code': row.status_code,
+            'response_body': row.response_body, 'expires_at': row.expires_at}
@@ -0,0 +1,403 @@
+"""
+Bulk import of legacy accounts and their transaction history.
+
+Records are streamed from CSV or NDJSON files and imported `batch_size` at a time. Each batch is
+validated, mapped to model instances and written with `bulk_create` in one database transaction,
+together with the job's ImportCheckpoint, so an interrupted import resumes after the last committed batch.
+
+Transactions are replayed in file order. Each row's `available_balance_after_transaction` is the running
+balance of its account, and the account's balance, monthly counters and daily balances are brought up to
+date in the same database transaction as the rows, so no rebuild is needed afterwards. An account's
+imported transactions must be in chronological order and no older than anything already in its ledger;
+this keeps the archive tier's ordering (every archived row older than every hot row) intact.
+
+Account records: account_number, account_type, opening_balance, kyc_verified (optional), opened_on
+(optional, YYYY-MM-DD), customer_id, customer_name, customer_address. `opening_balance` is the balance before
+the first imported transaction. Accounts with the same customer_id share one User. An account without
+`opened_on` is opened on the day of the import, or on the day of its first imported transaction if earlier.
+
+Transaction records: account_number, transaction_type (deposit or withdrawal), amount, charge (optional,
+the part of a withdrawal's amount that is a fee), timestamp (ISO 8601; naive times are in local time).
+"""
+import csv
+import itertools
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .cache import account_cache
+from .constants import AccountConstants, ImportConstant
+from .models import Account, AccountPeriodCounter, BalanceCheckpoint, DailyBalance, ImportCheckpoint, \
+    RollupDelta, Transaction, User
+from .periods import month_start
+
+# Largest absolute value a DecimalField(max_digits=10, decimal_places=2) holds.
+MAX_AMOUNT = Decimal('99999999.99')
+_ACCOUNT_TYPES = {account_type for account_type, _ in AccountConstants.ACCOUNT_TYPES}
+_TRANSACTION_TYPES = {transaction_type for transaction_type, _ in Transaction.TRANSACTION_TYPES}
+_BOOLEANS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False, '': False}
+
+
+class ImportValidationError(Exception):
+    def __init__(self, record, message):
+        super().__init__(f"Record {record}: {message}")
+        self.record = record
+
+
+def detect_format(path):
+    """
+    Return 'csv' or 'ndjson' from the extension of `path`, or None if it is not recognised.
+    """
+    return ImportConstant.FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def read_records(path, format):
+    """
+    Yield the records of a CSV (with a header row) or NDJSON file as dicts, one at a time.
+    NDJSON numbers with a fraction are read as Decimal, so amounts are never rounded through float.
+    """
+    with open(path, newline='' if format == 'csv' else None, encoding='utf-8') as source:
+        if format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line, parse_float=Decimal)
+
+
+def job_name(kind, path):
+    """
+    Return the default checkpoint name of an import of `path`. The file size is part of the name, so
+    importing a different file at the same path starts a new job instead of resuming the old one.
+    """
+    return f"{kind}:{os.path.abspath(path)}:{os.path.getsize(path)}"
+
+
+def import_accounts(records, bank, job, batch_size=ImportConstant.BATCH_SIZE):
+    """
+    Import account records (see the module docstring) into `bank`, creating one User per customer_id.
+
+    Parameters:
+    - records: An iterable of account record dicts, e.g. from `read_records`.
+    - bank: The Bank the accounts belong to.
+    - job: The name of the job's ImportCheckpoint; records it already committed are skipped.
+    - batch_size: Number of records imported per database transaction.
+
+    Returns:
+    - The number of records imported by this call.
+    """
+    checkpoint = _checkpoint(job, 'accounts')
+    records = iter(records)
+    # Map the customers of the records committed by an earlier run to the users created for them.
+    customers = _committed_customers(itertools.islice(records, checkpoint.records), batch_size)
+
+    imported = 0
+    for first, batch in _batches(records, batch_size, checkpoint.records):
+        rows = [_parse_account(first + index, record) for index, record in enumerate(batch)]
+        _check_new_account_numbers(rows)
+        with transaction.atomic():
+            users = {row['customer_id']: User(name=row['customer_name'], address=row['customer_address'])
+                     for row in rows if row['customer_id'] not in customers}
+            User.objects.bulk_create(users.values())
+            accounts = Account.objects.bulk_create([
+                Account(account_number=row['account_number'], account_type=row['account_type'],
+                        balance=row['opening_balance'], kyc_verified=row['kyc_verified'], opened_on=row['opened_on'],
+                        user_id=customers.get(row['customer_id']) or users[row['customer_id']].pk, bank=bank)
+                for row in rows
+            ])
+            RollupDelta.record_accounts(accounts)
+            _advance(checkpoint, len(batch))
+        customers.update((customer, user.pk) for customer, user in users.items())
+        imported += len(batch)
+    return imported
+
+
+def import_transactions(records, job, batch_size=ImportConstant.BATCH_SIZE):
+    """
+    Import transaction records (see the module docstring) into existing accounts, deriving every row's
+    balance and updating the accounts' balances, monthly counters and daily balances.
+
+    Parameters:
+    - records: An iterable of transaction record dicts, e.g. from `read_records`.
+    - job: The name of the job's ImportCheckpoint; records it already committed are skipped.
+    - batch_size: Number of records imported per database transaction.
+
+    Returns:
+    - The number of records imported by this call.
+    """
+    checkpoint = _checkpoint(job, 'transactions')
+    records = iter(records)
+    for _ in itertools.islice(records, checkpoint.records):
+        pass
+
+    imported = 0
+    now = timezone.now()
+    for first, batch in _batches(records, batch_size, checkpoint.records):
+        rows = [_parse_transaction(first + index, record, now) for index, record in enumerate(batch)]
+        with transaction.atomic():
+            _write_transactions(rows)
+            _advance(checkpoint, len(batch))
+        imported += len(batch)
+    return imported
+
+
+def _write_transactions(rows):
+    accounts = _ledger_states({row['account_number'] for row in rows})
+    ledger = []
+    dailies = {}
+    counters = {}
+    for row in rows:
+        account = accounts.get(row['account_number'])
+        if account is None:
+            raise ImportValidationError(row['record'], f"Unknown account {row['account_number']}.")
+        timestamp = row['timestamp']
+        day = timezone.localdate(timestamp)
+        if account.last_timestamp is not None and timestamp < account.last_timestamp:
+            raise ImportValidationError(row['record'], f"Transactions of account {account.account_number} must be "
+                                                       "chronological and newer than its existing ledger.")
+        if account.daily is not None and day < account.daily.date:
+            account.daily = _drop_carried_days(account)
+        if account.opened_on is not None and day < account.opened_on:
+            account.opened_on = day
+
+        amount = row['amount']
+        opening_balance = account.balance
+        if row['transaction_type'] == 'deposit':
+            account.balance += amount
+        else:
+            account.balance -= amount
+        if account.balance < 0:
+            raise ImportValidationError(row['record'], f"Account {account.account_number} would be overdrawn.")
+        if account.balance > MAX_AMOUNT:
+            raise ImportValidationError(row['record'], f"Account {account.account_number}'s balance is too large.")
+        account.last_timestamp = timestamp
+        ledger.append(Transaction(account_id=account.pk, amount=amount, charge=row['charge'],
+                                  transaction_type=row['transaction_type'], timestamp=timestamp,
+                                  available_balance_after_transaction=account.balance))
+
+        if account.daily is None:
+            account.daily = DailyBalance(account_id=account.pk, date=day, opening_balance=opening_balance,
+                                         closing_balance=opening_balance, cumulative_balance=0)
+        elif account.daily.date != day:
+            account.daily = account.daily.carried_to(day)
+        account.daily.closing_balance = account.balance
+        dailies[account.pk, day] = account.daily
+
+        period = month_start(timestamp)
+        if account.counter is None or account.counter.period != period:
+            account.counter = AccountPeriodCounter(account_id=account.pk, period=period)
+        if row['transaction_type'] == 'withdrawal':
+            account.counter.withdrawal_count += 1
+        else:
+            account.counter.deposit_total += amount
+        counters[account.pk, period] = account.counter
+
+    touched = list(accounts.values())
+    for account in touched:
+        account.version += 1
+    Transaction.objects.bulk_create(ledger)
+    RollupDelta.record_ledger({account.pk: account for account in touched}, ledger)
+    # An upsert on the primary key writes all the balances in one statement; bulk_update's CASE per row is
+    # quadratic in the batch size.
+    Account.objects.bulk_create(touched, update_conflicts=True, unique_fields=['pk'],
+                                update_fields=['balance', 'version', 'opened_on'])
+    # The latest daily and counter rows of an account may already exist; they are overwritten with
+    # the totals that include this batch.
+    DailyBalance.objects.bulk_create(dailies.values(), update_conflicts=True, unique_fields=['account', 'date'],
+                                     update_fields=['closing_balance'])
+    AccountPeriodCounter.objects.bulk_create(counters.values(), update_conflicts=True,
+                                             unique_fields=['account', 'period'],
+                                             update_fields=['withdrawal_count', 'deposit_total'])
+    cache = account_cache()
+    for account in touched:
+        cache.write_through(account)
+
+
+def _ledger_states(account_numbers):
+    """
+    Lock the accounts with the given numbers and return {account_number: account}, each with the newest
+    timestamp in either ledger tier, the latest daily balance row and the latest period counter.
+    """
+    hot = Transaction.objects.filter(account=OuterRef('pk')).order_by('-timestamp')
+    archived = BalanceCheckpoint.objects.filter(account=OuterRef('pk'))
+    daily = DailyBalance.objects.filter(account=OuterRef('pk')).order_by('-date')
+    counter = AccountPeriodCounter.objects.filter(account=OuterRef('pk')).order_by('-period')
+    accounts = Account.objects.select_for_update().filter(account_number__in=account_numbers).annotate(
+        hot_timestamp=Subquery(hot.values('timestamp')[:1]),
+        archived_timestamp=Subquery(archived.values('archived_through')[:1]),
+        daily_date=Subquery(daily.values('date')[:1]),
+        daily_opening=Subquery(daily.values('opening_balance')[:1]),
+        daily_closing=Subquery(daily.values('closing_balance')[:1]),
+        daily_cumulative=Subquery(daily.values('cumulative_balance')[:1]),
+        counter_period=Subquery(counter.values('period')[:1]),
+        counter_withdrawals=Subquery(counter.values('withdrawal_count')[:1]),
+        counter_deposits=Subquery(counter.values('deposit_total')[:1]),
+    )
+    states = {}
+    for account in accounts:
+        account.last_timestamp = account.hot_timestamp or account.archived_timestamp
+        account.daily = None
+        if account.daily_date is not None:
+            account.daily = DailyBalance(account_id=account.pk, date=account.daily_date,
+                                         opening_balance=account.daily_opening,
+                                         closing_balance=account.daily_closing,
+                                         cumulative_balance=account.daily_cumulative)
+        account.counter = None
+        if account.counter_period is not None:
+            account.counter = AccountPeriodCounter(account_id=account.pk, period=account.counter_period,
+                                                   withdrawal_count=account.counter_withdrawals,
+                                                   deposit_total=account.counter_deposits)
+        states[account.account_number] = account
+    return states
+
+
+def _drop_carried_days(account):
+    """
+    Delete the account's daily balance rows dated after its newest transaction and return the latest
+    remaining row, if any. Those rows were written by the nightly rollover and only carry the balance
+    forward; the import writes them again as it replays the account's history.
+    """
+    rows = DailyBalance.objects.filter(account_id=account.pk)
+    if account.last_timestamp is None:
+        rows.delete()
+        return None
+    rows.filter(date__gt=timezone.localdate(account.last_timestamp)).delete()
+    latest = rows.order_by('-date').first()
+    if latest is not None:
+        # Written back with the conflict-updating bulk_create, which needs rows without a primary key.
+        latest.pk = None
+    return latest
+
+
+def _checkpoint(job, kind):
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=job, defaults={'kind': kind})
+    if checkpoint.kind != kind:
+        raise ValueError(f"Import job {job} imports {checkpoint.kind}, not {kind}.")
+    return checkpoint
+
+
+def _advance(checkpoint, records):
+    checkpoint.records += records
+    checkpoint.save(update_fields=['records', 'updated_at'])
+
+
+def _batches(records, batch_size, skipped):
+    """
+    Yield (number of the first record, list of records) for consecutive batches of `records`.
+    """
+    first = skipped + 1
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield first, batch
+        first += len(batch)
+
+
+def _committed_customers(records, batch_size):
+    customers = {}
+    for _, batch in _batches(records, batch_size, 0):
+        # Keyed and valued the way _parse_account normalised them when the records were imported.
+        numbers = {str(record['account_number']).strip(): str(record['customer_id']).strip() for record in batch}
+        for account_number, user_id in Account.objects.filter(account_number__in=numbers).values_list(
+                'account_number', 'user_id'):
+            customers[numbers[account_number]] = user_id
+    return customers
+
+
+def _check_new_account_numbers(rows):
+    numbers = {}
+    for row in rows:
+        if row['account_number'] in numbers:
+            raise ImportValidationError(row['record'], f"Duplicate account number {row['account_number']}.")
+        numbers[row['account_number']] = row['record']
+    existing = Account.objects.filter(account_number__in=numbers).values_list('account_number', flat=True)
+    for account_number in existing:
+        raise ImportValidationError(numbers[account_number], f"Account {account_number} already exists.")
+
+
+def _parse_account(record_number, record):
+    account_type = _text(record_number, record, 'account_type')
+    if account_type not in _ACCOUNT_TYPES:
+        raise ImportValidationError(record_number, f"Unknown account type {account_type}.")
+    opening_balance = _decimal(record_number, record, 'opening_balance')
+    if opening_balance < 0:
+        raise ImportValidationError(record_number, "opening_balance must not be negative.")
+    kyc_verified = record.get('kyc_verified')
+    if not isinstance(kyc_verified, bool):
+        kyc_verified = _BOOLEANS.get(str(kyc_verified or '').strip().lower())
+        if kyc_verified is None:
+            raise ImportValidationError(record_number, f"Invalid kyc_verified {record['kyc_verified']}.")
+    opened_on = timezone.localdate()
+    if record.get('opened_on') not in (None, ''):
+        value = _text(record_number, record, 'opened_on')
+        try:
+            opened_on = date.fromisoformat(value)
+        except ValueError:
+            raise ImportValidationError(record_number, f"Invalid opened_on {value}.")
+        if opened_on > timezone.localdate():
+            raise ImportValidationError(record_number, f"opened_on {value} is in the future.")
+    return {
+        'record': record_number,
+        'account_number': _text(record_number, record, 'account_number'),
+        'account_type': account_type,
+        'opening_balance': opening_balance,
+        'kyc_verified': kyc_verified,
+        'opened_on': opened_on,
+        'customer_id': _text(record_number, record, 'customer_id'),
+        'customer_name': _text(record_number, record, 'customer_name'),
+        'customer_address': _text(record_number, record, 'customer_address'),
+    }
+
+
+def _parse_transaction(record_number, record, now):
+    transaction_type = _text(record_number, record, 'transaction_type')
+    if transaction_type not in _TRANSACTION_TYPES:
+        raise ImportValidationError(record_number, f"Unknown transaction type {transaction_type}.")
+    amount = _decimal(record_number, record, 'amount')
+    if amount <= 0:
+        raise ImportValidationError(record_number, "amount must be positive.")
+    charge = _decimal(record_number, record, 'charge') if record.get('charge') not in (None, '') else Decimal(0)
+    if charge < 0 or charge > amount or (charge and transaction_type != 'withdrawal'):
+        raise ImportValidationError(record_number, "charge must be part of a withdrawal's amount.")
+
+    value = _text(record_number, record, 'timestamp')
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        raise ImportValidationError(record_number, f"Invalid timestamp {value}.")
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    if timestamp > now:
+        raise ImportValidationError(record_number, f"Timestamp {value} is in the future.")
+    return {
+        'record': record_number,
+        'account_number': _text(record_number, record, 'account_number'),
+        'transaction_type': transaction_type,
+        'amount': amount,
+        'charge': charge,
+        'timestamp': timestamp,
+    }
+
+
+def _text(record_number, record, name):
+    value = record.get(name)
+    if value is None or str(value).strip() == '':
+        raise ImportValidationError(record_number, f"Missing {name}.")
+    return str(value).strip()
+
+
+def _decimal(record_number, record, name):
+    value = _text(record_number, record, name)
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ImportValidationError(record_number, f"Invalid {name} {value}.")
+    if not amount.is_finite() or amount.as_tuple().exponent < -2 or abs(amount) > MAX_AMOUNT:
+        raise ImportValidationError(record_number, f"Invalid {name} {value}.")
+    return amount
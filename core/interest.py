@@ -0,0 +1,256 @@
+"""
+Monthly interest accrual for savings accounts.
+
+Interest is simple daily interest on the end-of-day balance: a month's interest is the sum of the account's
+end-of-day balances over the month times `annual_rate / 365`, rounded half up to the cent, and is posted as a
+deposit dated when the accrual runs.
+
+Accounts are processed in id order, `chunk_size` at a time, in one database transaction per chunk. A chunk
+locks its accounts, loads their DailyBalance rows of the month as NumPy arrays of integer cents and computes
+every account's balance-day sum and interest at once. It then writes the InterestAccrual rows, the ledger
+rows, the new balances, today's daily balance rows and this month's counters with one bulk statement each.
+Accounts with an accrual for the month are skipped, so rerunning after an interruption, or for a month that
+is already paid, never credits an account twice. Days before an account's `opened_on` count as zero, and
+accounts opened after the month are not accrued at all.
+
+Interest is not a customer deposit, so the deposit rules are not applied to it.
+"""
+import multiprocessing
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .cache import account_cache
+from .constants import InterestConstant
+from .models import Account, AccountPeriodCounter, DailyBalance, InterestAccrual, RollupDelta, Transaction
+from .periods import month_start, next_month_start
+from .statements import balance_at
+
+
+def _cents(expression):
+    # Rounding in the database keeps REAL-backed decimals (SQLite) from truncating to the cent below.
+    return Cast(Round(expression * 100), BigIntegerField())
+
+
+class Accrual:
+    """
+    The result of an accrual run.
+
+    - accounts: Number of accounts accrued.
+    - credited: Number of those accounts whose interest was not zero and was posted.
+    - interest: Total interest posted.
+    """
+    def __init__(self, accounts=0, credited=0, interest=Decimal('0.00')):
+        self.accounts = accounts
+        self.credited = credited
+        self.interest = interest
+
+    @classmethod
+    def combine(cls, results):
+        results = list(results)
+        return cls(
+            accounts=sum(result.accounts for result in results),
+            credited=sum(result.credited for result in results),
+            interest=sum((result.interest for result in results), Decimal('0.00')),
+        )
+
+
+def accrue_interest(period, account_ids=None, bank_id=None, annual_rate=InterestConstant.ANNUAL_RATE,
+                    chunk_size=InterestConstant.CHUNK_SIZE):
+    """
+    Accrue and post the interest of the month starting on `period` for every savings account without an
+    accrual for that month.
+
+    Parameters:
+    - period: The first day of a month that has ended.
+    - account_ids: Only accrue these accounts.
+    - bank_id: Only accrue the accounts of this bank.
+    - annual_rate: The yearly interest rate, e.g. Decimal('0.035') for 3.5%, with at most
+      InterestConstant.RATE_DECIMAL_PLACES decimal places.
+    - chunk_size: Number of accounts accrued per database transaction.
+
+    Returns:
+    - An Accrual.
+    """
+    if annual_rate != annual_rate.quantize(Decimal(1).scaleb(-InterestConstant.RATE_DECIMAL_PLACES)):
+        # The accrual rows could not record the rate that was paid.
+        raise ValueError(f"annual_rate {annual_rate} has more than {InterestConstant.RATE_DECIMAL_PLACES} "
+                         "decimal places.")
+    accounts = Account.objects.filter(
+        Q(opened_on__isnull=True) | Q(opened_on__lt=next_month_start(period)),
+        account_type__in=InterestConstant.ACCOUNT_TYPES,
+    ).exclude(Exists(InterestAccrual.objects.filter(account=OuterRef('pk'), period=period))).order_by('pk')
+    if account_ids:
+        accounts = accounts.filter(pk__in=account_ids)
+    if bank_id is not None:
+        accounts = accounts.filter(bank_id=bank_id)
+
+    daily = DailyBalance.objects.filter(account=OuterRef('pk')).order_by('-date')
+    counter = AccountPeriodCounter.objects.filter(account=OuterRef('pk'), period=month_start())
+    accounts = accounts.select_for_update().annotate(
+        opening_cents=_cents(balance_at(period)),
+        daily_date=Subquery(daily.values('date')[:1]),
+        daily_opening=Subquery(daily.values('opening_balance')[:1]),
+        daily_cumulative=Subquery(daily.values('cumulative_balance')[:1]),
+        counter_withdrawals=Subquery(counter.values('withdrawal_count')[:1]),
+        counter_deposits=Subquery(counter.values('deposit_total')[:1]),
+    )
+
+    result = Accrual()
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(accounts.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return result
+            _accrue_chunk(chunk, period, annual_rate, result)
+        last_pk = chunk[-1].pk
+
+
+def accrue_banks(period, bank_ids, workers, annual_rate=InterestConstant.ANNUAL_RATE,
+                 chunk_size=InterestConstant.CHUNK_SIZE):
+    """
+    Accrue the accounts of each bank in its own process, `workers` at a time, and combine the results.
+    """
+    # Forked children must not share the parent's database connections.
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.starmap(_accrue_bank, [(period, bank_id, annual_rate, chunk_size) for bank_id in bank_ids])
+    return Accrual.combine(results)
+
+
+def _accrue_bank(period, bank_id, annual_rate, chunk_size):
+    try:
+        return accrue_interest(period, bank_id=bank_id, annual_rate=annual_rate, chunk_size=chunk_size)
+    finally:
+        connections.close_all()
+
+
+def balance_days(account_ids, opening_cents, rows, start, end, opened_days=None):
+    """
+    Return the sum of the end-of-day balances over the days `[start, end)` of each account, in cents.
+
+    Parameters:
+    - account_ids: Sorted int64 array of account ids.
+    - opening_cents: int64 array of each account's balance at the start of `start`, or at its opening.
+    - rows: (account_id, date ordinal, opening_cents, closing_cents) of the accounts' DailyBalance rows dated
+      in `[start, end)`, ordered by account and date.
+    - start, end: The first day of the window and the day after its last day.
+    - opened_days: int64 array of the ordinal of each account's opening day; earlier days count as zero.
+      Defaults to every account being open for the whole window.
+
+    Returns:
+    - An int64 array aligned with `account_ids`.
+    """
+    start_day, end_day = start.toordinal(), end.toordinal()
+    if opened_days is None:
+        opened_days = np.full(len(account_ids), start_day, dtype=np.int64)
+    first_day = np.clip(opened_days, start_day, end_day)
+    # An account without a row in the window held its opening balance every day it was open.
+    totals = opening_cents * (end_day - first_day)
+    if not rows:
+        return totals
+    account, day, opening, closing = np.array(rows, dtype=np.int64).T
+    index = np.searchsorted(account_ids, account)
+    first = np.flatnonzero(np.r_[True, account[1:] != account[:-1]])
+    last = np.r_[account[1:] != account[:-1], True]
+    # A row's closing balance holds until the account's next row, or until the end of the window.
+    held_until = np.where(last, end_day, np.r_[day[1:], end_day])
+    # Before its first row in the window the account held that row's opening balance, from its opening on.
+    totals[index[first]] = opening[first] * np.maximum(day[first] - first_day[index[first]], 0)
+    np.add.at(totals, index, closing * (held_until - day))
+    return totals
+
+
+def interest_cents(balance_day_cents, annual_rate):
+    """
+    Return `balance_day_cents` * `annual_rate` / 365 rounded half up, in exact integer arithmetic.
+    """
+    numerator, denominator = annual_rate.as_integer_ratio()
+    denominator *= InterestConstant.DAYS_PER_YEAR
+    largest = int(np.abs(balance_day_cents).max()) if balance_day_cents.size else 0
+    if largest * numerator + denominator >= 2 ** 63:
+        # A precise rate on a large balance overflows int64; Python integers are exact at any size.
+        balance_day_cents = balance_day_cents.astype(object)
+    return (balance_day_cents * numerator + denominator // 2) // denominator
+
+
+def _accrue_chunk(chunk, period, annual_rate, result):
+    end = next_month_start(period)
+    account_ids = np.array([account.pk for account in chunk], dtype=np.int64)
+    opening_cents = np.array([account.opening_cents for account in chunk], dtype=np.int64)
+    opened_days = np.array([(account.opened_on or period).toordinal() for account in chunk], dtype=np.int64)
+    rows = [
+        (account_id, day.toordinal(), opening, closing)
+        for account_id, day, opening, closing in DailyBalance.objects.filter(
+            account_id__in=account_ids.tolist(), date__gte=period, date__lt=end,
+        ).order_by('account_id', 'date').values_list(
+            'account_id', 'date', _cents(F('opening_balance')), _cents(F('closing_balance')))
+    ]
+    sums = balance_days(account_ids, opening_cents, rows, period, end, opened_days)
+    interest = interest_cents(sums, annual_rate)
+
+    now = timezone.now()
+    today = timezone.localdate(now)
+    accruals = []
+    ledger = []
+    dailies = []
+    counters = []
+    credited = []
+    for account, sum_cents, amount_cents in zip(chunk, sums.tolist(), interest.tolist()):
+        amount = Decimal(amount_cents).scaleb(-2)
+        accruals.append(InterestAccrual(account_id=account.pk, period=period, annual_rate=annual_rate,
+                                        balance_days=Decimal(sum_cents).scaleb(-2), amount=amount,
+                                        accrued_at=now))
+        if not amount_cents:
+            continue
+        opening_balance = account.balance
+        account.balance += amount
+        account.version += 1
+        credited.append(account)
+        ledger.append(Transaction(account_id=account.pk, amount=amount, transaction_type='deposit', timestamp=now,
+                                  available_balance_after_transaction=account.balance))
+        dailies.append(_daily_row(account, opening_balance, today))
+        counters.append(AccountPeriodCounter(account_id=account.pk, period=month_start(now),
+                                             withdrawal_count=account.counter_withdrawals or 0,
+                                             deposit_total=(account.counter_deposits or 0) + amount))
+
+    InterestAccrual.objects.bulk_create(accruals)
+    Transaction.objects.bulk_create(ledger)
+    RollupDelta.record_ledger({account.pk: account for account in credited}, ledger)
+    # Upserts on the primary key and on the daily and counter keys write each table in one statement.
+    Account.objects.bulk_create(credited, update_conflicts=True, unique_fields=['pk'],
+                                update_fields=['balance', 'version'])
+    DailyBalance.objects.bulk_create(dailies, update_conflicts=True, unique_fields=['account', 'date'],
+                                     update_fields=['closing_balance'])
+    AccountPeriodCounter.objects.bulk_create(counters, update_conflicts=True, unique_fields=['account', 'period'],
+                                             update_fields=['withdrawal_count', 'deposit_total'])
+    cache = account_cache()
+    for account in credited:
+        cache.write_through(account)
+
+    result.accounts += len(chunk)
+    result.credited += len(credited)
+    result.interest += sum((entry.amount for entry in ledger), Decimal('0.00'))
+
+
+def _daily_row(account, opening_balance, today):
+    """
+    Return today's DailyBalance row of the account after the interest was credited.
+    """
+    if account.daily_date == today:
+        row = DailyBalance(account_id=account.pk, date=today, opening_balance=account.daily_opening,
+                           cumulative_balance=account.daily_cumulative)
+    elif account.daily_date is not None:
+        # The closing balance of the latest row is the balance before the interest.
+        row = DailyBalance(account_id=account.pk, date=account.daily_date, opening_balance=account.daily_opening,
+                           closing_balance=opening_balance,
+                           cumulative_balance=account.daily_cumulative).carried_to(today)
+    else:
+        row = DailyBalance(account_id=account.pk, date=today, opening_balance=opening_balance, cumulative_balance=0)
+    row.closing_balance = account.balance
+    return row
@@ -0,0 +1,142 @@
+"""
+Group commit of ledger writes.
+
+With the LEDGER_JOURNAL setting enabled, `Account.deposit`/`withdraw` append the operation to an in-process
+journal and wait until it is committed instead of writing it themselves. A single writer thread drains the
+journal: it takes up to MAX_BATCH operations, or whatever arrived within MAX_DELAY_MS of the first one, and
+posts them with `core.batch.apply_operations` inside one database transaction, so a batch costs one commit
+(one fsync on SQLite) instead of one per operation, and one statement per table instead of one per account.
+
+Batches are posted in the order the operations were appended, and `apply_operations` keeps the order of an
+account's operations within a batch, so the operations of an account are applied in order. A rejected
+operation is skipped without affecting the rest of its batch. If the batch transaction fails, its operations
+are retried one at a time so a single failing operation only fails its own caller.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.dispatch import receiver
+
+DEFAULT_LEDGER_JOURNAL = {
+    'ENABLED': False,
+    'MAX_BATCH': 256,
+    'MAX_DELAY_MS': 2,
+}
+
+_STOP = object()
+
+
+class LedgerJournal:
+    def __init__(self, post, MAX_BATCH=256, MAX_DELAY_MS=2):
+        self._post = post
+        self.max_batch = MAX_BATCH
+        self.max_delay = MAX_DELAY_MS / 1000
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, account_id, transaction_type, amount):
+        """
+        Append an operation to the journal and return a Future of its `apply_operations` result.
+        """
+        self._ensure_writer()
+        future = Future()
+        self._queue.put(({'account_id': account_id, 'transaction_type': transaction_type, 'amount': amount},
+                         future))
+        return future
+
+    def post(self, account_id, transaction_type, amount):
+        """
+        Append an operation and wait until it is committed or rejected. Returns its `apply_operations` result;
+        raises the database error if it could not be written.
+        """
+        return self.submit(account_id, transaction_type, amount).result()
+
+    def close(self):
+        """
+        Commit the operations already appended and stop the writer thread. A later submit starts a new one.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None and thread.is_alive():
+                self._queue.put(_STOP)
+                thread.join()
+
+    def _ensure_writer(self):
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._lock:
+            # is_alive() also restarts the writer in a process forked after it was started.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ledger-journal', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                entry = self._queue.get()
+                if entry is _STOP:
+                    return
+                batch = [entry]
+                deadline = time.perf_counter() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        entry = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                    except queue.Empty:
+                        break
+                    if entry is _STOP:
+                        stopping = True
+                        break
+                    batch.append(entry)
+                self._flush(batch)
+        finally:
+            connections.close_all()
+
+    def _flush(self, batch):
+        try:
+            with transaction.atomic():
+                results = self._post([operation for operation, _ in batch])
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+                return
+            for entry in batch:
+                self._flush([entry])
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+@lru_cache(maxsize=None)
+def ledger_journal():
+    """
+    Return the process-wide LedgerJournal configured by the LEDGER_JOURNAL setting, or None when it is disabled.
+    """
+    # core.batch imports the models, which import this module.
+    from .batch import apply_operations
+
+    config = getattr(settings, 'LEDGER_JOURNAL', DEFAULT_LEDGER_JOURNAL)
+    if not config.get('ENABLED'):
+        return None
+    return LedgerJournal(apply_operations, MAX_BATCH=config.get('MAX_BATCH', DEFAULT_LEDGER_JOURNAL['MAX_BATCH']),
+                         MAX_DELAY_MS=config.get('MAX_DELAY_MS', DEFAULT_LEDGER_JOURNAL['MAX_DELAY_MS']))
+
+
+@receiver(setting_changed)
+def reset_ledger_journal(setting, **kwargs):
+    if setting == 'LEDGER_JOURNAL':
+        if ledger_journal.cache_info().currsize and ledger_journal() is not None:
+            ledger_journal().close()
+        ledger_journal.cache_clear()
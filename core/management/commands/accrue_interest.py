@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constants import InterestConstant
+from core.interest import Accrual, accrue_banks, accrue_interest
+from core.models import Bank
+from core.periods import month_start, next_month_start, parse_month
+
+
+def parse_rate(value):
+    try:
+        rate = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    if not 0 <= rate < 1 or rate != rate.quantize(Decimal(1).scaleb(-InterestConstant.RATE_DECIMAL_PLACES)):
+        raise ValueError(value)
+    return rate
+
+
+class Command(BaseCommand):
+    help = ("Accrue a month's interest on savings accounts from their daily balances and post it as deposits. "
+            "Accounts already paid for the month are skipped, so the command can be rerun safely.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=parse_month, default=None,
+                            help="Month to accrue (YYYY-MM). Defaults to the previous month.")
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only accrue this account id. Can be repeated.")
+        parser.add_argument('--bank', type=int, action='append', dest='banks',
+                            help="Only accrue the accounts of this bank id. Can be repeated.")
+        parser.add_argument('--rate', type=parse_rate, default=InterestConstant.ANNUAL_RATE,
+                            help=f"Annual interest rate as a fraction, with at most "
+                                 f"{InterestConstant.RATE_DECIMAL_PLACES} decimal places "
+                                 f"(default {InterestConstant.ANNUAL_RATE}).")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Accrue each bank in its own process, this many at a time. "
+                                 "0 accrues everything in this process.")
+        parser.add_argument('--chunk-size', type=int, default=InterestConstant.CHUNK_SIZE,
+                            help="Number of accounts accrued per database transaction.")
+
+    def handle(self, *args, **options):
+        this_month = month_start()
+        period = options['month'] or (this_month - timedelta(days=1)).replace(day=1)
+        if next_month_start(period) > this_month:
+            raise CommandError(f"{period:%Y-%m} has not ended yet.")
+
+        started = time.perf_counter()
+        bank_ids = options['banks']
+        rate, chunk_size = options['rate'], options['chunk_size']
+        if options['workers'] and not options['accounts']:
+            if not bank_ids:
+                bank_ids = list(Bank.objects.order_by('pk').values_list('pk', flat=True))
+            result = accrue_banks(period, bank_ids, options['workers'], rate, chunk_size)
+        elif bank_ids:
+            result = Accrual.combine(accrue_interest(period, options['accounts'], bank_id, rate, chunk_size)
+                                     for bank_id in bank_ids)
+        else:
+            result = accrue_interest(period, options['accounts'], annual_rate=rate, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Accrued {period:%Y-%m} for {result.accounts} accounts in {elapsed:.2f}s: posted {result.interest} "
+            f"of interest to {result.credited} accounts."))
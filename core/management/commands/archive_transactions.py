@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import archive_cutoff, archive_transactions
+from core.constants import ArchiveConstant
+from core.periods import day_start
+
+
+class Command(BaseCommand):
+    help = ("Move transactions older than a horizon from the hot ledger table to the archive tier and "
+            "update each account's balance checkpoint. Safe to interrupt and rerun.")
+
+    def add_arguments(self, parser):
+        horizon = parser.add_mutually_exclusive_group()
+        horizon.add_argument('--days', type=int, default=ArchiveConstant.HOT_DAYS,
+                             help="Archive transactions older than this many days.")
+        horizon.add_argument('--before', type=date.fromisoformat, default=None,
+                             help="Archive transactions before this day (YYYY-MM-DD).")
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only archive the transactions of this account id. Can be repeated.")
+        parser.add_argument('--batch-size', type=int, default=ArchiveConstant.BATCH_SIZE,
+                            help="Number of transactions moved per database transaction.")
+
+    def handle(self, *args, **options):
+        if options['before'] is not None:
+            cutoff = day_start(options['before'])
+        else:
+            cutoff = archive_cutoff(options['days'])
+        if cutoff > timezone.now():
+            raise CommandError("The archive horizon must not be in the future.")
+
+        moved = archive_transactions(cutoff, options['accounts'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} transactions older than {cutoff.isoformat()}."))
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.benchmarking import create_account, percentile, scratch_database
+from core.models import Transaction
+
+
+class Command(BaseCommand):
+    help = ("Compare requests/sec and latency of the sync views through the WSGI handler with the async views "
+            "through the ASGI handler under concurrency. Runs in-process against a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', choices=('history', 'deposit'), default='history')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--history-size', type=int, default=500,
+                            help="Transactions seeded into the benchmarked account.")
+
+    def handle(self, *args, **options):
+        # Lets the test clients' 'testserver' host through ALLOWED_HOSTS.
+        setup_test_environment()
+        try:
+            self.benchmark(options)
+        finally:
+            teardown_test_environment()
+
+    def benchmark(self, options):
+        with scratch_database():
+            account = create_account(balance=10 ** 6)
+            Transaction.objects.bulk_create(
+                Transaction(account=account, amount=1, transaction_type='deposit',
+                            available_balance_after_transaction=account.balance)
+                for _ in range(options['history_size'])
+            )
+            if options['endpoint'] == 'history':
+                request = ('get', 'transaction_history', {'page_size': 50})
+            else:
+                request = ('post', 'deposit', {'amount': 1})
+            method, name, payload = request
+            sync_url = reverse(name, kwargs={'account_id': account.pk})
+            async_url = reverse(f'async_{name}', kwargs={'account_id': account.pk})
+
+            self.report('wsgi', self.run_wsgi(method, sync_url, payload, options), options)
+            self.report('asgi', self.run_asgi(method, async_url, payload, options), options)
+
+    def run_wsgi(self, method, url, payload, options):
+        local = threading.local()
+
+        def send(_):
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+            started = time.perf_counter()
+            response = self.send(local.client, method, url, payload)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency'], thread_name_prefix='wsgi') as pool:
+            results = list(pool.map(send, range(options['requests'])))
+        return results, time.perf_counter() - started
+
+    def run_asgi(self, method, url, payload, options):
+        async def run():
+            client = AsyncClient(raise_request_exception=False)
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def send():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await self.send(client, method, url, payload)
+                    return time.perf_counter() - started, response.status_code
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(send() for _ in range(options['requests'])))
+            return results, time.perf_counter() - started
+
+        return asyncio.run(run())
+
+    def send(self, client, method, url, payload):
+        if method == 'get':
+            return client.get(url, payload)
+        return client.post(url, payload, content_type='application/json')
+
+    def report(self, label, run, options):
+        results, elapsed = run
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status_code in results if status_code >= 400)
+        self.stdout.write(
+            f"{label}: endpoint={options['endpoint']} requests={len(results)} "
+            f"concurrency={options['concurrency']} rps={len(results) / elapsed:.1f} "
+            f"p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms "
+            f"errors={errors}"
+        )
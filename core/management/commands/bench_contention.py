@@ -0,0 +1,112 @@
+import multiprocessing
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.db.models import Case, Count, F, Sum, When
+
+from core.benchmarking import create_account, scratch_database
+from core.models import Account, Transaction
+
+INITIAL_BALANCE = Decimal('1000000')
+
+
+def hammer(account_id, operations, seed, max_retries):
+    """
+    Post `operations` random deposits/withdrawals against one account.
+    Returns (succeeded, rejected, retries, errors).
+    """
+    rng = random.Random(seed)
+    succeeded = rejected = retries = errors = 0
+    try:
+        for _ in range(operations):
+            amount = rng.randint(1, 100)
+            for attempt in range(max_retries + 1):
+                try:
+                    account = Account.objects.get(pk=account_id)
+                    if rng.random() < 0.5:
+                        ok, _ = account.deposit(amount)
+                    else:
+                        ok, _ = account.withdraw(amount)
+                except OperationalError:
+                    # SQLite reports write-lock contention as "database is locked"; clients retry.
+                    if attempt == max_retries:
+                        errors += 1
+                    else:
+                        retries += 1
+                        time.sleep(0.001 * (attempt + 1))
+                    continue
+                if ok:
+                    succeeded += 1
+                else:
+                    rejected += 1
+                break
+    finally:
+        connection.close()
+    return succeeded, rejected, retries, errors
+
+
+class Command(BaseCommand):
+    help = ("Hammer a single hot account with concurrent deposits and withdrawals and report throughput "
+            "and lost updates. Runs against a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=200, help="Operations per worker.")
+        parser.add_argument('--mode', choices=('threads', 'processes'), default='threads')
+        parser.add_argument('--max-retries', type=int, default=50,
+                            help="Retries per operation on lock contention errors.")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            account = create_account(account_type='regular_saving', balance=INITIAL_BALANCE)
+            jobs = [(account.pk, options['operations'], seed, options['max_retries'])
+                    for seed in range(options['workers'])]
+
+            started = time.perf_counter()
+            results = self.run_workers(jobs, options['mode'])
+            elapsed = time.perf_counter() - started
+
+            self.report(account.pk, results, elapsed, options)
+
+    def run_workers(self, jobs, mode):
+        if mode == 'processes':
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+                return pool.starmap(hammer, jobs)
+
+        results = [None] * len(jobs)
+
+        def run(index):
+            results[index] = hammer(*jobs[index])
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(len(jobs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, account_id, results, elapsed, options):
+        succeeded, rejected, retries, errors = (sum(column) for column in zip(*results))
+        ledger = Transaction.objects.filter(account_id=account_id).aggregate(
+            rows=Count('id'),
+            net=Sum(Case(When(transaction_type='deposit', then=F('amount')), default=-F('amount'))),
+        )
+        balance = Account.objects.values_list('balance', flat=True).get(pk=account_id)
+        expected_balance = INITIAL_BALANCE + (ledger['net'] or 0)
+        lost_writes = succeeded - (ledger['rows'] or 0)
+
+        self.stdout.write(f"mode={options['mode']} workers={options['workers']} "
+                          f"operations/worker={options['operations']} elapsed={elapsed:.2f}s")
+        self.stdout.write(f"succeeded={succeeded} rejected={rejected} retries={retries} errors={errors}")
+        self.stdout.write(f"throughput={succeeded / elapsed:.1f} ops/s")
+        self.stdout.write(f"balance={balance} expected_from_ledger={expected_balance} "
+                          f"lost_balance_updates={balance - expected_balance} lost_ledger_writes={lost_writes}")
+        if balance == expected_balance and lost_writes == 0:
+            self.stdout.write(self.style.SUCCESS("No lost updates."))
+        else:
+            self.stdout.write(self.style.ERROR("Lost updates detected."))
@@ -0,0 +1,170 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from core.benchmarking import create_account, percentile, scratch_database
+from core.constants import BenchmarkConstant, DatabaseConstant
+from core.models import Account, Transaction
+from core.pagination import history_page
+from core.routers import replica_reads
+from core.serializers import TRANSACTION_ROWS
+
+PROFILES = ('legacy', 'wal', 'replica')
+
+
+def parse_profiles(value):
+    profiles = [profile.strip() for profile in value.split(',')]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}. Choose from {', '.join(PROFILES)}.")
+    return profiles
+
+
+class Command(BaseCommand):
+    help = ("Measure read/write concurrency of the database profiles: 'legacy' (rollback journal, deferred "
+            "transactions, Django's defaults), 'wal' (the SQLITE_PRODUCTION OPTIONS) and 'replica' (the same "
+            "OPTIONS with history reads served by a copy of the database). Writer threads post deposits while reader "
+            "threads page through transaction history; reports throughput, latency and lock errors per profile.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=parse_profiles, default=list(PROFILES),
+                            help=f"Comma-separated profiles to run (default {','.join(PROFILES)}).")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds each profile runs.")
+        parser.add_argument('--writers', type=int, default=4, help="Number of deposit threads.")
+        parser.add_argument('--readers', type=int, default=4, help="Number of history threads.")
+        parser.add_argument('--accounts', type=int, default=20, help="Number of accounts.")
+        parser.add_argument('--ledger', type=int, default=1000, help="Transactions seeded per account.")
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError("bench_database compares SQLite profiles.")
+        results = {}
+        configured = dict(connections[DEFAULT_DB_ALIAS].settings_dict['OPTIONS'])
+        for profile in options['profiles']:
+            results[profile] = self.run_profile(profile, configured, options)
+            self.report(profile, results[profile])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def run_profile(self, profile, configured, options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        replica_path = None
+        with scratch_database():
+            # The connections of every thread are created from this settings dict.
+            production = settings.SQLITE_PRODUCTION['OPTIONS']
+            connection.settings_dict['OPTIONS'] = {} if profile == 'legacy' else dict(production)
+            try:
+                connections.close_all()
+                if profile == 'legacy':
+                    with connection.cursor() as cursor:
+                        cursor.execute('PRAGMA journal_mode=DELETE')
+                account_ids = self.seed(options['accounts'], options['ledger'])
+                if profile == 'replica':
+                    replica_path = self.create_replica(connection)
+                return self.hammer(account_ids, profile == 'replica', options)
+            finally:
+                connections.close_all()
+                connection.settings_dict['OPTIONS'] = configured
+                if replica_path:
+                    del connections.settings[DatabaseConstant.REPLICA_ALIAS]
+                    os.remove(replica_path)
+
+    def seed(self, accounts, ledger):
+        account_ids = []
+        for _ in range(accounts):
+            account = create_account(balance=Decimal('1000000'))
+            Transaction.objects.bulk_create(
+                [Transaction(account=account, amount=1, transaction_type='deposit',
+                             available_balance_after_transaction=account.balance - ledger + index + 1)
+                 for index in range(ledger)], batch_size=BenchmarkConstant.SEED_BATCH_SIZE)
+            account_ids.append(account.pk)
+        return account_ids
+
+    def create_replica(self, connection):
+        fd, path = tempfile.mkstemp(prefix='bench-replica-', suffix='.sqlite3')
+        os.close(fd)
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        connections.settings[DatabaseConstant.REPLICA_ALIAS] = dict(connection.settings_dict, NAME=path)
+        return path
+
+    def hammer(self, account_ids, use_replica, options):
+        deadline = time.perf_counter() + options['duration']
+        samples = {'write': [], 'read': []}
+        errors = {'write': 0, 'read': 0}
+        lock = threading.Lock()
+
+        def worker(kind, seed):
+            rng = random.Random(seed)
+            latencies = []
+            failed = 0
+            accounts = list(Account.objects.in_bulk(account_ids).values())
+            try:
+                while time.perf_counter() < deadline:
+                    account = rng.choice(accounts)
+                    started = time.perf_counter()
+                    try:
+                        if kind == 'write':
+                            account.deposit(1)
+                        elif use_replica:
+                            with replica_reads():
+                                self.read_history(account)
+                        else:
+                            self.read_history(account)
+                    except OperationalError:
+                        failed += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                samples[kind].extend(latencies)
+                errors[kind] += failed
+
+        threads = [threading.Thread(target=worker, args=('write', index)) for index in range(options['writers'])]
+        threads += [threading.Thread(target=worker, args=('read', 1000 + index))
+                    for index in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = {}
+        for kind in ('write', 'read'):
+            latencies = sorted(latency * 1000 for latency in samples[kind])
+            result[kind] = {
+                'ops': len(latencies),
+                'ops_per_s': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'errors': errors[kind],
+            }
+        return result
+
+    @staticmethod
+    def read_history(account):
+        rows, _ = history_page(account, {'page_size': BenchmarkConstant.PAGE_SIZE}, TRANSACTION_ROWS.columns)
+        return TRANSACTION_ROWS.rows(rows)
+
+    def report(self, profile, result):
+        for kind in ('write', 'read'):
+            stats = result[kind]
+            self.stdout.write(f"{profile:<8} {kind:<6} {stats['ops_per_s']:>9.1f} ops/s  p50={stats['p50_ms']:.2f}ms "
+                              f"p99={stats['p99_ms']:.2f}ms errors={stats['errors']}")
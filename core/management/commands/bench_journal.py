@@ -0,0 +1,111 @@
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test.utils import override_settings
+
+from core.benchmarking import create_account, percentile, scratch_database
+from core.journal import DEFAULT_LEDGER_JOURNAL, ledger_journal
+from core.models import Account, Transaction
+
+MODES = ('inline', 'journal')
+
+
+class Command(BaseCommand):
+    help = ("Compare deposit/withdrawal throughput with every operation committing on its own ('inline') and "
+            "with group commit through the ledger journal ('journal'). Writer threads post random operations "
+            "against a pool of accounts; reports ops/sec, p50/p99 latency, commits and errors per mode.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated modes ({','.join(MODES)}).")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds each mode runs.")
+        parser.add_argument('--writers', type=int, default=16, help="Number of writer threads.")
+        parser.add_argument('--accounts', type=int, default=50, help="Number of accounts.")
+        parser.add_argument('--max-batch', type=int, default=None, help="Journal MAX_BATCH (default from settings).")
+        parser.add_argument('--max-delay-ms', type=float, default=None,
+                            help="Journal MAX_DELAY_MS (default from settings).")
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        configured = getattr(settings, 'LEDGER_JOURNAL', DEFAULT_LEDGER_JOURNAL)
+        journal_config = dict(configured, ENABLED=True)
+        if options['max_batch'] is not None:
+            journal_config['MAX_BATCH'] = options['max_batch']
+        if options['max_delay_ms'] is not None:
+            journal_config['MAX_DELAY_MS'] = options['max_delay_ms']
+
+        results = {}
+        for mode in options['modes'].split(','):
+            config = journal_config if mode == 'journal' else dict(configured, ENABLED=False)
+            with scratch_database(), override_settings(LEDGER_JOURNAL=config):
+                # Savings accounts have no monthly withdrawal limit, so the operations stay allowed as the
+                # journal's throughput grows instead of turning into cheap rejections.
+                account_ids = [create_account(balance=Decimal('1000000')).pk for _ in range(options['accounts'])]
+                results[mode] = self.hammer(account_ids, options)
+                journal = ledger_journal()
+                if journal is not None:
+                    journal.close()
+                    results[mode]['commits'] = journal.batches
+                results[mode]['ledger_rows'] = Transaction.objects.count()
+            self.report(mode, results[mode])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def hammer(self, account_ids, options):
+        deadline = time.perf_counter() + options['duration']
+        latencies = []
+        counts = {'posted': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            samples = []
+            posted = rejected = errors = 0
+            accounts = list(Account.objects.in_bulk(account_ids).values())
+            try:
+                while time.perf_counter() < deadline:
+                    account = rng.choice(accounts)
+                    started = time.perf_counter()
+                    try:
+                        if rng.random() < 0.5:
+                            ok, _ = account.deposit(rng.randint(1, 100))
+                        else:
+                            ok, _ = account.withdraw(rng.randint(1, 100))
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    samples.append(time.perf_counter() - started)
+                    if ok:
+                        posted += 1
+                    else:
+                        rejected += 1
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(samples)
+                counts['posted'] += posted
+                counts['rejected'] += rejected
+                counts['errors'] += errors
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency in latencies)
+        return dict(counts, ops_per_s=round(len(latencies) / elapsed, 1), commits=counts['posted'],
+                    p50_ms=round(percentile(latencies, 50), 3), p99_ms=round(percentile(latencies, 99), 3))
+
+    def report(self, mode, result):
+        self.stdout.write(f"{mode:<8} {result['ops_per_s']:>9.1f} ops/s  p50={result['p50_ms']:.2f}ms "
+                          f"p99={result['p99_ms']:.2f}ms posted={result['posted']} rejected={result['rejected']} "
+                          f"errors={result['errors']} commits={result['commits']} ledger_rows={result['ledger_rows']}")
@@ -0,0 +1,154 @@
+import json
+import platform
+import sys
+from decimal import Decimal
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarking import create_account, find_regressions, measure, scratch_database, summarize
+from core.constants import AccountConstants, BenchmarkConstant
+from core.models import Account, RuleContext, Transaction
+from core.pagination import encode_cursor, history_page
+from core.serializers import TRANSACTION_ROWS
+from core.strategies import DEPOSIT_STRATEGIES, DEFAULT_DEPOSIT_STRATEGY, WITHDRAWAL_STRATEGIES
+
+INITIAL_BALANCE = Decimal('1000000')
+
+
+def parse_scales(value):
+    try:
+        scales = [int(scale) for scale in value.split(',')]
+    except ValueError:
+        raise CommandError(f"Invalid --scales: {value}")
+    if not scales or min(scales) < 1:
+        raise CommandError(f"Invalid --scales: {value}")
+    return scales
+
+
+class Command(BaseCommand):
+    help = ("Time the model-level hot paths (deposit, withdraw, rule checks, history serialization) for every "
+            "account type at several ledger sizes. Runs against a scratch database and writes the results as "
+            "JSON; with --baseline, fails if a median got slower than --threshold and --min-delta-ms.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=parse_scales, default=BenchmarkConstant.SCALES,
+                            help="Comma-separated numbers of transactions seeded per account, e.g. 10,1000,100000.")
+        parser.add_argument('--repeat', type=int, default=BenchmarkConstant.REPEAT,
+                            help="Timed calls per benchmark.")
+        parser.add_argument('--output', default=None, help="Write the JSON results to this file.")
+        parser.add_argument('--baseline', default=None, help="JSON results of a previous run to compare with.")
+        parser.add_argument('--threshold', type=float, default=BenchmarkConstant.REGRESSION_THRESHOLD,
+                            help="Relative slowdown of a median that counts as a regression, e.g. 0.2 for 20%%.")
+        parser.add_argument('--min-delta-ms', type=float, default=BenchmarkConstant.REGRESSION_MIN_DELTA_MS,
+                            help="Ignore slowdowns smaller than this many milliseconds.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                report = json.load(baseline_file)
+            min_repeat = BenchmarkConstant.MIN_COMPARE_REPEAT
+            if min(options['repeat'], report['meta']['repeat']) < min_repeat:
+                raise CommandError(f"Comparing with a baseline needs --repeat {min_repeat} or more, in both runs.")
+            baseline = report['results']
+
+        results = {}
+        with scratch_database():
+            benchmarks = []
+            for scale in options['scales']:
+                for account_type, _ in AccountConstants.ACCOUNT_TYPES:
+                    account = self.seed(account_type, scale)
+                    for name, function, rollback, number in self.benchmarks(account):
+                        benchmarks.append((f"{scale}/{account_type}/{name}", function, rollback, number))
+            # Take the samples of every benchmark in turns, so a slow spell of the machine spreads over all of
+            # them instead of shifting the median of whichever benchmark was running.
+            durations = {key: [] for key, _, _, _ in benchmarks}
+            for _ in range(options['repeat']):
+                for key, function, rollback, number in benchmarks:
+                    durations[key].extend(measure(function, 1, rollback, number))
+            for key, _, _, _ in benchmarks:
+                results[key] = summarize(sorted(durations[key]))
+                self.stdout.write(f"{key:<45} median={results[key]['median_ms']:.4f}ms "
+                                  f"p95={results[key]['p95_ms']:.4f}ms")
+            vendor = connection.vendor
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': vendor,
+                'repeat': options['repeat'],
+                'scales': options['scales'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        else:
+            json.dump(report, sys.stdout, indent=2, sort_keys=True)
+            self.stdout.write('')
+
+        if baseline is not None:
+            self.compare(results, baseline, options['threshold'], options['min_delta_ms'])
+
+    def seed(self, account_type, transactions):
+        """
+        Create an account whose ledger already holds `transactions` rows. The monthly counters are left
+        empty, so the rules allow the benchmarked operations however large the ledger is.
+        """
+        account = create_account(account_type=account_type, balance=INITIAL_BALANCE)
+        batch = []
+        for index in range(transactions):
+            batch.append(Transaction(account=account, amount=1, transaction_type='deposit',
+                                     available_balance_after_transaction=INITIAL_BALANCE - transactions + index + 1))
+            if len(batch) >= BenchmarkConstant.SEED_BATCH_SIZE:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        return account
+
+    def benchmarks(self, account):
+        """
+        Yield (name, function, rollback, number) for every benchmark of an account. Writes are rolled back
+        after each call so the monthly limits are never reached; the in-memory rule checks are timed
+        `BenchmarkConstant.INNER_LOOP` calls at a time.
+        """
+        account_type = account.account_type
+        context = RuleContext.load(RuleContext.annotate(Account.objects.filter(pk=account.pk)))[account.pk]
+        withdrawal_strategy = WITHDRAWAL_STRATEGIES[account_type]
+        deposit_strategy = DEPOSIT_STRATEGIES.get(account_type, DEFAULT_DEPOSIT_STRATEGY)
+        ledger = Transaction.objects.filter(account=account).order_by('id').values_list('timestamp', 'pk')
+        # A cursor into the middle of the ledger, for a page that needs a deep index seek.
+        middle_cursor = encode_cursor(*ledger[ledger.count() // 2])
+
+        def history(cursor=None):
+            params = {'page_size': BenchmarkConstant.PAGE_SIZE}
+            if cursor:
+                params['cursor'] = cursor
+            rows, _ = history_page(account, params, TRANSACTION_ROWS.columns)
+            return TRANSACTION_ROWS.rows(rows)
+
+        inner_loop = BenchmarkConstant.INNER_LOOP
+        yield 'deposit', lambda: account.deposit(1), True, 1
+        yield 'withdraw', lambda: account.withdraw(1), True, 1
+        yield 'rule_context', lambda: RuleContext.load(
+            RuleContext.annotate(Account.objects.filter(pk=account.pk))), False, 1
+        yield 'withdrawal_is_allowed', lambda: withdrawal_strategy.is_allowed(account, 1, context), False, inner_loop
+        yield 'deposit_is_allowed', lambda: deposit_strategy.is_allowed(account, 1, context), False, inner_loop
+        yield 'history_first_page', history, False, 1
+        yield 'history_deep_page', lambda: history(middle_cursor), False, 1
+
+    def compare(self, results, baseline, threshold, min_delta_ms):
+        regressions = find_regressions(results, baseline, threshold, min_delta_ms)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {threshold:.0%} of the baseline."))
+            return
+        for name, previous, current in regressions:
+            self.stdout.write(self.style.ERROR(f"{name}: {previous:.3f}ms -> {current:.3f}ms"))
+        raise CommandError(f"{len(regressions)} benchmarks regressed by more than {threshold:.0%}.")
@@ -0,0 +1,73 @@
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarking import create_account, measure, scratch_database, summarize
+from core.constants import BenchmarkConstant
+from core.models import Transaction
+from core.serializers import TRANSACTION_ROWS, TransactionSerializer
+
+INITIAL_BALANCE = Decimal('1000000')
+
+
+class Command(BaseCommand):
+    help = ("Compare the DRF TransactionSerializer with the values_list fast path of the history endpoint on "
+            "pages of growing size: time to fetch, serialize and render each page, and the CPU per row saved. "
+            "Checks that both paths render byte-identical responses.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='50,500,5000',
+                            help="Comma-separated numbers of ledger rows per page.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed samples per benchmark.")
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['rows'].split(',')]
+        except ValueError:
+            raise CommandError(f"Invalid --rows: {options['rows']}")
+        renderer = JSONRenderer()
+        results = {}
+        with scratch_database():
+            account = create_account(balance=INITIAL_BALANCE)
+            Transaction.objects.bulk_create([
+                Transaction(account=account, amount=Decimal(index % 1000) + Decimal('0.25'),
+                            transaction_type='deposit', available_balance_after_transaction=INITIAL_BALANCE + index)
+                for index in range(max(sizes))
+            ], batch_size=BenchmarkConstant.SEED_BATCH_SIZE)
+            ledger = Transaction.objects.filter(account=account).order_by('-timestamp', '-id')
+
+            for size in sizes:
+                instances = list(ledger[:size])
+                tuples = list(ledger.values_list(*TRANSACTION_ROWS.columns)[:size])
+                drf_data = TransactionSerializer(instances, many=True).data
+                fast_data = TRANSACTION_ROWS.rows(tuples)
+                if renderer.render(drf_data) != renderer.render(fast_data):
+                    raise CommandError(f"The fast path rendered {size} rows differently from DRF.")
+
+                stages = {
+                    'drf_fetch': lambda: list(ledger[:size]),
+                    'fast_fetch': lambda: list(ledger.values_list(*TRANSACTION_ROWS.columns)[:size]),
+                    'drf_serialize': lambda: TransactionSerializer(instances, many=True).data,
+                    'fast_serialize': lambda: TRANSACTION_ROWS.rows(tuples),
+                    'render': lambda: renderer.render(fast_data),
+                }
+                results[size] = {name: summarize(measure(function, options['repeat']))
+                                 for name, function in stages.items()}
+                self.report(size, results[size])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def report(self, size, result):
+        def per_row_us(*names):
+            return sum(result[name]['median_ms'] for name in names) * 1000 / size
+
+        drf = per_row_us('drf_fetch', 'drf_serialize', 'render')
+        fast = per_row_us('fast_fetch', 'fast_serialize', 'render')
+        self.stdout.write(
+            f"{size:>6} rows  per row: fetch {per_row_us('drf_fetch'):.1f} -> {per_row_us('fast_fetch'):.1f}us, "
+            f"serialize {per_row_us('drf_serialize'):.1f} -> {per_row_us('fast_serialize'):.1f}us, "
+            f"render {per_row_us('render'):.1f}us, total {drf:.1f} -> {fast:.1f}us ({drf / fast:.1f}x)")
@@ -0,0 +1,116 @@
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.db.models import Sum
+
+from core.benchmarking import create_account, percentile, scratch_database
+from core.models import Account, Transaction
+from core.transfers import post_transfers
+
+MODES = ('chained', 'transfer', 'batch')
+
+
+class Command(BaseCommand):
+    help = ("Benchmark concurrent cross-transfers between a few hot accounts: every thread moves money both "
+            "ways between random pairs, so opposite transfers lock the same accounts at the same time. "
+            "'chained' is a withdraw() followed by a deposit(), 'transfer' is Account.transfer and 'batch' posts "
+            "--batch-size transfers per post_transfers call. Reports transfers/sec, p50/p99 latency per call, "
+            "deadlock and lock errors, and checks that the total balance, plus the charges paid, is conserved.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES), help=f"Comma-separated modes ({','.join(MODES)}).")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds each mode runs.")
+        parser.add_argument('--threads', type=int, default=8, help="Number of threads posting transfers.")
+        parser.add_argument('--accounts', type=int, default=4, help="Number of hot accounts.")
+        parser.add_argument('--batch-size', type=int, default=50, help="Transfers per call in the 'batch' mode.")
+        parser.add_argument('--output', default=None, help="Also write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in options['modes'].split(','):
+            with scratch_database():
+                # Savings accounts have no withdrawal limit, only a charge once the free withdrawals are used up.
+                account_ids = [create_account(balance=Decimal('1000000')).pk for _ in range(options['accounts'])]
+                total_before = Account.objects.aggregate(total=Sum('balance'))['total']
+                results[mode] = self.hammer(mode, account_ids, options)
+                total_after = Account.objects.aggregate(total=Sum('balance'))['total']
+                charges = Transaction.objects.aggregate(total=Sum('charge'))['total'] or 0
+                results[mode]['conserved'] = total_after + charges == total_before
+                results[mode]['ledger_rows'] = Transaction.objects.count()
+            self.report(mode, results[mode])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def hammer(self, mode, account_ids, options):
+        deadline = time.perf_counter() + options['duration']
+        latencies = []
+        counts = {'posted': 0, 'rejected': 0, 'deadlocks': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            samples = []
+            local = dict.fromkeys(counts, 0)
+            accounts = Account.objects.in_bulk(account_ids)
+            try:
+                while time.perf_counter() < deadline:
+                    size = options['batch_size'] if mode == 'batch' else 1
+                    pairs = [rng.sample(account_ids, 2) for _ in range(size)]
+                    started = time.perf_counter()
+                    try:
+                        outcomes = self.post(mode, accounts, pairs, rng)
+                    except OperationalError as error:
+                        local['deadlocks' if 'deadlock' in str(error).lower() else 'errors'] += 1
+                        continue
+                    samples.append(time.perf_counter() - started)
+                    local['posted'] += sum(outcomes)
+                    local['rejected'] += len(outcomes) - sum(outcomes)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(samples)
+                for key, value in local.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency in latencies)
+        return dict(counts, transfers_per_s=round(counts['posted'] / elapsed, 1),
+                    p50_ms=round(percentile(latencies, 50), 3), p99_ms=round(percentile(latencies, 99), 3))
+
+    def post(self, mode, accounts, pairs, rng):
+        """
+        Post one call's worth of transfers between the given (source_id, destination_id) pairs and return
+        whether each was posted.
+        """
+        amounts = [rng.randint(1, 100) for _ in pairs]
+        if mode == 'batch':
+            results = post_transfers([{'source_id': source_id, 'destination_id': destination_id, 'amount': amount}
+                                      for (source_id, destination_id), amount in zip(pairs, amounts)])
+            return [result['status'] == 'posted' for result in results]
+        (source_id, destination_id), = pairs
+        source, destination = accounts[source_id], accounts[destination_id]
+        if mode == 'transfer':
+            return [source.transfer(destination, amounts[0])[0]]
+        if not source.withdraw(amounts[0])[0]:
+            return [False]
+        # Two requests, two transactions: a failure here would leave the money withdrawn but not deposited.
+        return [destination.deposit(amounts[0])[0]]
+
+    def report(self, mode, result):
+        self.stdout.write(f"{mode:<9} {result['transfers_per_s']:>9.1f} transfers/s  p50={result['p50_ms']:.2f}ms "
+                          f"p99={result['p99_ms']:.2f}ms posted={result['posted']} rejected={result['rejected']} "
+                          f"deadlocks={result['deadlocks']} errors={result['errors']} "
+                          f"ledger_rows={result['ledger_rows']} conserved={result['conserved']}")
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constants import StatementConstant
+from core.periods import month_start, next_month_start, parse_month
+from core.statements import close_period
+
+
+class Command(BaseCommand):
+    help = ("Close a month: write one statement per account with its opening and closing balance, deposit, "
+            "withdrawal and fee totals. Resumes where an interrupted run stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=parse_month, default=None,
+                            help="Month to close (YYYY-MM). Defaults to the previous month.")
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only close the statements of this account id. Can be repeated.")
+        parser.add_argument('--batch-size', type=int, default=StatementConstant.BATCH_SIZE,
+                            help="Number of accounts closed per database transaction.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Delete and recompute the month's existing statements.")
+
+    def handle(self, *args, **options):
+        this_month = month_start()
+        period = options['month'] or (this_month - timedelta(days=1)).replace(day=1)
+        if next_month_start(period) > this_month:
+            raise CommandError(f"{period:%Y-%m} has not ended yet.")
+
+        written = close_period(period, options['accounts'], options['batch_size'], options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f"Closed {period:%Y-%m}: wrote {written} statements."))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.constants import RollupConstant
+from core.rollups import compact_rollups, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ("Fold the pending rollup deltas into the per-bank and per-user rollups. Run it periodically, "
+            "e.g. every minute, so reads only add a few pending deltas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RollupConstant.BATCH_SIZE,
+                            help="Number of deltas folded per database transaction.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute every rollup from the accounts and the ledger instead.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['rebuild']:
+            banks = rebuild_rollups()
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt the rollups of {banks} banks in {time.perf_counter() - started:.2f}s."))
+            return
+        compacted = compact_rollups(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {compacted} rollup deltas in {time.perf_counter() - started:.2f}s."))
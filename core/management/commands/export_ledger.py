@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constants import ExportConstant
+from core.exports import export_stream, ledger_rows
+from core.models import Account, Bank
+
+
+class Command(BaseCommand):
+    help = "Stream the ledger of an account or of a whole bank to a file or stdout as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--account', type=int, help="Export the ledger of this account id.")
+        scope.add_argument('--bank', type=int, help="Export the ledgers of every account of this bank id.")
+        parser.add_argument('--format', choices=ExportConstant.FORMATS, default='ndjson', dest='file_format')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+        parser.add_argument('--output', default='-', help="Output file path, '-' for stdout.")
+        parser.add_argument('--chunk-size', type=int, default=ExportConstant.CHUNK_SIZE,
+                            help="Number of rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        if options['account'] is not None and not Account.objects.filter(pk=options['account']).exists():
+            raise CommandError(f"Account {options['account']} not found.")
+        if options['bank'] is not None and not Bank.objects.filter(pk=options['bank']).exists():
+            raise CommandError(f"Bank {options['bank']} not found.")
+
+        rows = ledger_rows(account_id=options['account'], bank_id=options['bank'],
+                           chunk_size=options['chunk_size'])
+        chunks = export_stream(rows, options['file_format'], options['gzip'])
+        if options['output'] == '-':
+            self.write_chunks(chunks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write_chunks(chunks, output)
+
+    def write_chunks(self, chunks, output):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constants import ImportConstant
+from core.importer import ImportValidationError, detect_format, import_accounts, import_transactions, job_name, \
+    read_records
+from core.models import Bank
+
+
+class Command(BaseCommand):
+    help = ("Bulk import legacy accounts or transactions from a CSV or NDJSON file. Transactions are replayed "
+            "in file order to derive each row's balance and the accounts' balances, counters and daily "
+            "balances. Progress is checkpointed per batch, so rerunning an interrupted import resumes it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['accounts', 'transactions'], help="What the file contains.")
+        parser.add_argument('path', help="The CSV (with a header row) or NDJSON file to import.")
+        parser.add_argument('--bank', type=int, default=None,
+                            help="Id of the bank the imported accounts belong to. Required for accounts.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help="File format. Defaults to the one implied by the file extension.")
+        parser.add_argument('--job', default=None,
+                            help="Name of the import checkpoint. Defaults to the kind, path and size of the file.")
+        parser.add_argument('--batch-size', type=int, default=ImportConstant.BATCH_SIZE,
+                            help="Number of records imported per database transaction.")
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        file_format = options['format'] or detect_format(path)
+        if file_format is None:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+        try:
+            job = options['job'] or job_name(kind, path)
+        except OSError as error:
+            raise CommandError(str(error))
+        records = read_records(path, file_format)
+
+        started = time.perf_counter()
+        try:
+            if kind == 'accounts':
+                if options['bank'] is None:
+                    raise CommandError("--bank is required to import accounts.")
+                try:
+                    bank = Bank.objects.get(pk=options['bank'])
+                except Bank.DoesNotExist:
+                    raise CommandError(f"Bank {options['bank']} does not exist.")
+                imported = import_accounts(records, bank, job, options['batch_size'])
+            else:
+                imported = import_transactions(records, job, options['batch_size'])
+        except ImportValidationError as error:
+            raise CommandError(f"{error} The batches before it were imported; fix the file and rerun to resume.")
+        except ValueError as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - started
+
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} {kind} in {elapsed:.1f}s ({rate:.0f} records/s) as job {job}."))
@@ -0,0 +1,285 @@
+import bisect
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.benchmarking import percentile, scratch_database
+from core.constants import AccountConstants, LoadTestConstant
+
+ENDPOINTS = ('create_account', 'deposit', 'withdraw', 'history', 'update_kyc')
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded.
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def parse_mix(value):
+    """
+    Parse 'deposit=40,withdraw=25,...' into {endpoint: weight}.
+    """
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f"Unknown endpoint in --mix: {name}. Choose from {', '.join(ENDPOINTS)}.")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f"Invalid weight in --mix: {part}")
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one positive weight.")
+    return mix
+
+
+class InProcessTransport:
+    """
+    Sends requests through Django's test client, one client per thread, into the full middleware stack.
+    """
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, payload):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(raise_request_exception=False)
+        client = self.local.client
+        if method == 'get':
+            response = client.get(path, payload)
+        else:
+            response = getattr(client, method)(path, payload, content_type='application/json')
+        # The client records exceptions through a process-wide signal, so another thread's exception
+        # can show up on this response; only trust it for server errors.
+        exc_info = getattr(response, 'exc_info', None)
+        if exc_info and response.status_code >= 500:
+            return response.status_code, None, f"{exc_info[0].__name__}: {exc_info[1]}"
+        return response.status_code, _json(response.content), None
+
+
+class HttpTransport:
+    """
+    Sends requests to a running server over HTTP.
+    """
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload):
+        url = self.base_url + path
+        data = None
+        if method == 'get':
+            url += '?' + urllib.parse.urlencode(payload)
+        else:
+            data = json.dumps(payload).encode()
+        request = urllib.request.Request(url, data=data, method=method.upper(),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, _json(response.read()), None
+        except urllib.error.HTTPError as error:
+            return error.code, _json(error.read()), None
+        except (urllib.error.URLError, OSError) as error:
+            return 0, None, type(error).__name__
+
+
+def _json(content):
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+def failure_reason(status_code, body, exception):
+    if exception:
+        return exception
+    if isinstance(body, dict):
+        if 'error' in body:
+            return str(body['error'])
+        # Serializer validation errors: report the offending fields.
+        return 'invalid ' + ', '.join(sorted(body))
+    return f"HTTP {status_code}"
+
+
+class Command(BaseCommand):
+    help = ("Drive a mix of create_account/deposit/withdraw/history/update_kyc requests through the URLconf "
+            "with concurrent workers and skewed account popularity, then report throughput, per-endpoint "
+            "latency percentiles and histograms, and failures by reason. Runs in-process against a scratch "
+            "database unless --url points at a running server.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None,
+                            help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+                                 "Defaults to an in-process run against a scratch database.")
+        parser.add_argument('--requests', type=int, default=LoadTestConstant.REQUESTS,
+                            help="Total number of requests, ignored with --duration.")
+        parser.add_argument('--duration', type=float, default=None, help="Run for this many seconds instead.")
+        parser.add_argument('--workers', type=int, default=LoadTestConstant.WORKERS,
+                            help="Number of concurrent workers.")
+        parser.add_argument('--accounts', type=int, default=LoadTestConstant.ACCOUNTS,
+                            help="Number of accounts created before the run.")
+        parser.add_argument('--mix', type=parse_mix, default=parse_mix(LoadTestConstant.MIX),
+                            help=f"Relative weights per endpoint (default {LoadTestConstant.MIX}).")
+        parser.add_argument('--zipf', type=float, default=LoadTestConstant.ZIPF_EXPONENT,
+                            help="Exponent of the Zipf distribution of account popularity; 0 is uniform.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Per-request timeout with --url.")
+        parser.add_argument('--output', default=None, help="Also write the report as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if options['url']:
+            self.run(HttpTransport(options['url'], options['timeout']), options)
+            return
+        # Lets the test client's 'testserver' host through ALLOWED_HOSTS.
+        setup_test_environment()
+        # Server errors are counted in the report; don't log a traceback for each one.
+        request_logger = logging.getLogger('django.request')
+        request_logger_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with scratch_database():
+                self.run(InProcessTransport(), options)
+        finally:
+            request_logger.setLevel(request_logger_level)
+            teardown_test_environment()
+
+    def run(self, transport, options):
+        run_id = uuid.uuid4().hex[:8]
+        account_ids, owner = self.seed(transport, options['accounts'], run_id)
+        # Cumulative Zipf weights: the account of rank r is picked with probability proportional to 1 / r^s.
+        ranks = range(1, len(account_ids) + 1)
+        popularity = list(itertools.accumulate(1 / rank ** options['zipf'] for rank in ranks))
+        endpoints, weights = zip(*((name, weight) for name, weight in options['mix'].items() if weight > 0))
+        cumulative_weights = list(itertools.accumulate(weights))
+
+        samples = []
+        samples_lock = threading.Lock()
+        remaining = itertools.count()
+        deadline = time.perf_counter() + options['duration'] if options['duration'] else None
+
+        def worker(index):
+            rng = random.Random(options['seed'] * 1000 + index)
+            local_samples = []
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        break
+                elif next(remaining) >= options['requests']:
+                    break
+                endpoint = rng.choices(endpoints, cum_weights=cumulative_weights)[0]
+                account_id = account_ids[bisect.bisect(popularity, rng.random() * popularity[-1])]
+                method, path, payload = self.build_request(endpoint, account_id, owner, rng, run_id)
+                started = time.perf_counter()
+                status_code, body, exception = transport.request(method, path, payload)
+                latency = time.perf_counter() - started
+                reason = None if 200 <= status_code < 300 else failure_reason(status_code, body, exception)
+                local_samples.append((endpoint, latency, status_code, reason))
+            with samples_lock:
+                samples.extend(local_samples)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = self.summarize(samples, elapsed, options)
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def seed(self, transport, count, run_id):
+        """
+        Create a bank, a user and `count` accounts of every type through the API.
+        Returns the account ids and the {'user', 'bank'} ids that own them.
+        """
+        status_code, bank, exception = transport.request('post', reverse('create_bank'),
+                                                         {'name': f'Load {run_id}', 'location': 'Load'})
+        if status_code != 201:
+            raise CommandError(f"Could not create a bank: {failure_reason(status_code, bank, exception)}")
+        _, user, _ = transport.request('post', reverse('create_user'),
+                                       {'name': f'Load {run_id}', 'address': 'Load'})
+        account_types = itertools.cycle(account_type for account_type, _ in AccountConstants.ACCOUNT_TYPES)
+        account_ids = []
+        for index in range(count):
+            status_code, account, exception = transport.request('post', reverse('create_account'), {
+                'account_number': f'LOAD-{run_id}-{index}', 'account_type': next(account_types),
+                'balance': LoadTestConstant.INITIAL_BALANCE, 'kyc_verified': True,
+                'user': user['id'], 'bank': bank['id'],
+            })
+            if status_code != 201:
+                reason = failure_reason(status_code, account, exception)
+                raise CommandError(f"Could not create an account: {reason}")
+            account_ids.append(account['id'])
+        return account_ids, {'user': user['id'], 'bank': bank['id']}
+
+    def build_request(self, endpoint, account_id, owner, rng, run_id):
+        if endpoint == 'deposit':
+            return 'post', reverse('deposit', kwargs={'account_id': account_id}), {'amount': rng.randint(1, 500)}
+        if endpoint == 'withdraw':
+            return 'post', reverse('withdraw', kwargs={'account_id': account_id}), {'amount': rng.randint(1, 500)}
+        if endpoint == 'history':
+            return 'get', reverse('transaction_history', kwargs={'account_id': account_id}), {'page_size': 50}
+        if endpoint == 'update_kyc':
+            return ('patch', reverse('update_kyc_status', kwargs={'account_id': account_id}),
+                    {'kyc_verified': rng.random() < 0.9})
+        return 'post', reverse('create_account'), {
+            'account_number': f'LOAD-{run_id}-{uuid.uuid4().hex}',
+            'account_type': rng.choice(AccountConstants.ACCOUNT_TYPES)[0],
+            'balance': LoadTestConstant.INITIAL_BALANCE, 'user': owner['user'], 'bank': owner['bank'],
+        }
+
+    def summarize(self, samples, elapsed, options):
+        by_endpoint = defaultdict(list)
+        for sample in samples:
+            by_endpoint[sample[0]].append(sample)
+
+        endpoints = {}
+        for endpoint, endpoint_samples in sorted(by_endpoint.items()):
+            latencies = sorted(latency * 1000 for _, latency, _, _ in endpoint_samples)
+            histogram = Counter(bisect.bisect(HISTOGRAM_BUCKETS, latency) for latency in latencies)
+            endpoints[endpoint] = {
+                'requests': len(endpoint_samples),
+                'rps': round(len(endpoint_samples) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'statuses': dict(Counter(str(status_code) for _, _, status_code, _ in endpoint_samples)),
+                'failures': dict(Counter(reason for _, _, _, reason in endpoint_samples if reason).most_common()),
+                'histogram': [histogram.get(index, 0) for index in range(len(HISTOGRAM_BUCKETS) + 1)],
+            }
+        return {
+            'requests': len(samples),
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+            'workers': options['workers'],
+            'accounts': options['accounts'],
+            'zipf': options['zipf'],
+            'histogram_buckets_ms': list(HISTOGRAM_BUCKETS),
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"requests={report['requests']} elapsed={report['elapsed_s']:.2f}s "
+                          f"throughput={report['rps']:.1f} req/s workers={report['workers']}")
+        labels = [f"<{bound}ms" for bound in HISTOGRAM_BUCKETS] + [f">={HISTOGRAM_BUCKETS[-1]}ms"]
+        for endpoint, stats in report['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<15} n={stats['requests']:<6} rps={stats['rps']:<8.1f} p50={stats['p50_ms']:.1f}ms "
+                f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms statuses={stats['statuses']}")
+            buckets = zip(labels, stats['histogram'])
+            self.stdout.write('    ' + ' '.join(f"{label}:{count}" for label, count in buckets if count))
+            for reason, count in stats['failures'].items():
+                self.stdout.write(self.style.WARNING(f"    {count:>6} x {reason}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.constants import IdempotencyConstant
+from core.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key responses. Run periodically, e.g. hourly from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=IdempotencyConstant.PURGE_BATCH_SIZE,
+                            help="Number of keys deleted per query.")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency keys."))
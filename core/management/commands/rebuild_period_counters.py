@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth
+
+from core.archive import LEDGER_MODELS
+from core.models import AccountPeriodCounter
+from core.periods import month_bounds_of, parse_month
+
+
+class Command(BaseCommand):
+    help = ("Recompute the per-account monthly withdrawal/deposit counters from the transaction ledger, "
+            "including archived transactions.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only rebuild the counters of this account id. Can be repeated.")
+        parser.add_argument('--month', type=parse_month, default=None,
+                            help="Only rebuild the counters of this month (YYYY-MM).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of counter rows inserted per query.")
+
+    def handle(self, *args, **options):
+        counters = AccountPeriodCounter.objects.all()
+        if options['accounts']:
+            counters = counters.filter(account_id__in=options['accounts'])
+        if options['month']:
+            counters = counters.filter(period=options['month'])
+
+        # A month can straddle the archive horizon, so both tiers are aggregated and summed.
+        totals = {}
+        for model in LEDGER_MODELS:
+            for row in self.monthly_totals(model, options['accounts'], options['month']).iterator():
+                key = (row['account_id'], row['period'])
+                withdrawal_count, deposit_total = totals.get(key, (0, 0))
+                totals[key] = (withdrawal_count + row['withdrawal_count'],
+                               deposit_total + (row['deposit_total'] or 0))
+
+        created = 0
+        with transaction.atomic():
+            counters.delete()
+            batch = []
+            for (account_id, period), (withdrawal_count, deposit_total) in totals.items():
+                batch.append(AccountPeriodCounter(
+                    account_id=account_id,
+                    period=period,
+                    withdrawal_count=withdrawal_count,
+                    deposit_total=deposit_total,
+                ))
+                if len(batch) >= options['batch_size']:
+                    created += len(AccountPeriodCounter.objects.bulk_create(batch))
+                    batch = []
+            created += len(AccountPeriodCounter.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} period counters."))
+
+    def monthly_totals(self, model, account_ids, month):
+        transactions = model.objects.all()
+        if account_ids:
+            transactions = transactions.filter(account_id__in=account_ids)
+        if month:
+            transactions = transactions.in_range(*month_bounds_of(month))
+        return transactions.annotate(
+            period=TruncMonth('timestamp', output_field=models.DateField()),
+        ).values('account_id', 'period').annotate(
+            withdrawal_count=models.Count('id', filter=models.Q(transaction_type='withdrawal')),
+            deposit_total=models.Sum('amount', filter=models.Q(transaction_type='deposit')),
+        ).order_by()
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.constants import ReconcileConstant
+from core.models import Bank
+from core.reconcile import Reconciliation, reconcile, reconcile_banks
+
+
+class Command(BaseCommand):
+    help = ("Recompute every account's running balance from the ledger and report rows and account balances "
+            "that drift from it.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only reconcile this account id. Can be repeated.")
+        parser.add_argument('--bank', type=int, action='append', dest='banks',
+                            help="Only reconcile the accounts of this bank id. Can be repeated.")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Reconcile each bank in its own process, this many at a time. "
+                                 "0 reconciles everything in this process.")
+        parser.add_argument('--chunk-size', type=int, default=ReconcileConstant.CHUNK_SIZE,
+                            help="Number of ledger rows loaded into memory at a time.")
+        parser.add_argument('--limit', type=int, default=ReconcileConstant.REPORT_LIMIT,
+                            help="Maximum number of drifting accounts listed per section.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        bank_ids = options['banks']
+        if options['workers'] and not options['accounts']:
+            if not bank_ids:
+                bank_ids = list(Bank.objects.order_by('pk').values_list('pk', flat=True))
+            result = reconcile_banks(bank_ids, options['workers'], options['chunk_size'])
+        elif bank_ids:
+            result = Reconciliation.combine(
+                reconcile(options['accounts'], bank_id, options['chunk_size']) for bank_id in bank_ids)
+        else:
+            result = reconcile(options['accounts'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Checked {result.rows} ledger rows of {result.accounts} accounts in {elapsed:.2f}s.")
+        if result.clean:
+            self.stdout.write(self.style.SUCCESS("No drift found."))
+            return
+        self.report("Rows whose balance after transaction drifts from the running balance",
+                    result.row_drift, options['limit'])
+        self.report("Accounts whose balance drifts from the ledger", result.balance_drift, options['limit'])
+
+    def report(self, title, drift, limit):
+        if drift.empty:
+            return
+        self.stdout.write(self.style.ERROR(f"{title}: {len(drift)} accounts"))
+        self.stdout.write(drift.head(limit).to_string(index=False))
+        if len(drift) > limit:
+            self.stdout.write(f"... and {len(drift) - limit} more")
@@ -0,0 +1,101 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from core.archive import ledger_values
+from core.models import Account, DailyBalance
+
+
+class Command(BaseCommand):
+    help = ("Carry every account's balance forward into a daily balance row for the given day. "
+            "Run nightly so the 90-day average balance never has to extrapolate over long gaps.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help="Day to roll over to (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Drop the daily balance rows and recompute them from the transaction ledger, "
+                                 "including archived transactions.")
+        parser.add_argument('--account', type=int, action='append', dest='accounts',
+                            help="Only process this account id. Can be repeated.")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Number of accounts processed per query.")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            created = self.rebuild(options['accounts'], options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily balance rows."))
+            return
+        day = options['date'] or timezone.localdate()
+        created = self.rollover(day, options['accounts'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled {created} accounts over to {day}."))
+
+    def rollover(self, day, account_ids, batch_size):
+        latest = DailyBalance.objects.filter(account=OuterRef('pk'), date__lte=day).order_by('-date')
+        accounts = Account.objects.order_by('pk').annotate(
+            last_date=Subquery(latest.values('date')[:1]),
+            last_opening=Subquery(latest.values('opening_balance')[:1]),
+            last_closing=Subquery(latest.values('closing_balance')[:1]),
+            last_cumulative=Subquery(latest.values('cumulative_balance')[:1]),
+        ).values_list('pk', 'balance', 'last_date', 'last_opening', 'last_closing', 'last_cumulative')
+        if account_ids:
+            accounts = accounts.filter(pk__in=account_ids)
+
+        created = 0
+        last_pk = 0
+        while True:
+            batch = list(accounts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return created
+            last_pk = batch[-1][0]
+            rows = []
+            for pk, balance, last_date, last_opening, last_closing, last_cumulative in batch:
+                if last_date == day:
+                    continue
+                if last_date is None:
+                    rows.append(DailyBalance(account_id=pk, date=day, opening_balance=balance,
+                                             closing_balance=balance, cumulative_balance=0))
+                else:
+                    previous = DailyBalance(account_id=pk, date=last_date, opening_balance=last_opening,
+                                            closing_balance=last_closing, cumulative_balance=last_cumulative)
+                    rows.append(previous.carried_to(day))
+            # ignore_conflicts keeps the job safe to run while deposits are writing today's rows.
+            DailyBalance.objects.bulk_create(rows, ignore_conflicts=True)
+            created += len(rows)
+
+    def rebuild(self, account_ids, batch_size):
+        balances = DailyBalance.objects.all()
+        filters = {}
+        if account_ids:
+            filters['account_id__in'] = account_ids
+            balances = balances.filter(account_id__in=account_ids)
+        transactions = ledger_values(
+            ('account_id', 'timestamp', 'transaction_type', 'amount', 'available_balance_after_transaction'),
+            chunk_size=batch_size, **filters)
+
+        created = 0
+        rows = []
+        current = None
+        with transaction.atomic():
+            balances.delete()
+            for account_id, timestamp, transaction_type, amount, balance_after in transactions:
+                day = timezone.localdate(timestamp)
+                if current is None or current.account_id != account_id:
+                    signed_amount = amount if transaction_type == 'deposit' else -amount
+                    current = DailyBalance(account_id=account_id, date=day,
+                                           opening_balance=balance_after - signed_amount,
+                                           closing_balance=balance_after, cumulative_balance=0)
+                    rows.append(current)
+                elif current.date != day:
+                    current = current.carried_to(day)
+                    rows.append(current)
+                current.closing_balance = balance_after
+                if len(rows) > batch_size:
+                    # Keep the row still being accumulated for the next batch.
+                    created += len(DailyBalance.objects.bulk_create(rows[:-1]))
+                    rows = rows[-1:]
+            created += len(DailyBalance.objects.bulk_create(rows))
+        return created
@@ -0,0 +1,110 @@
+import contextlib
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.constants import TransferConstant
+from core.importer import detect_format, read_records
+from core.models import Account
+from core.transfers import post_transfers
+
+CENT = Decimal('0.01')
+RESULT_FIELDS = ('record', 'source_account', 'destination_account', 'amount', 'reference', 'status', 'reason',
+                 'transfer_id')
+
+
+class Command(BaseCommand):
+    help = ("Post the transfers of a settlement file: a CSV (with a header row) or NDJSON file of records with "
+            "source_account, destination_account (account numbers), amount and an optional reference. Transfers "
+            "are posted in file order, --batch-size per database transaction; a non-empty reference is posted "
+            "at most once, so rerunning an interrupted file skips the transfers it already posted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="The settlement file.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help="File format. Defaults to the one implied by the file extension.")
+        parser.add_argument('--atomic', action='store_true',
+                            help="Post the whole file in one database transaction, only if every transfer is "
+                                 "allowed.")
+        parser.add_argument('--batch-size', type=int, default=TransferConstant.BATCH_SIZE,
+                            help="Number of transfers posted per database transaction.")
+        parser.add_argument('--output', default=None, help="Write the result of every transfer to this CSV file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or detect_format(path)
+        if file_format is None:
+            raise CommandError(f"Cannot tell the format of {path}; pass --format.")
+        records = read_records(path, file_format)
+        # The atomic mode needs every transfer of the file in one call.
+        batch_size = None if options['atomic'] else options['batch_size']
+        counts = {'posted': 0, 'rejected': 0, 'rolled_back': 0}
+
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                writer = None
+                if options['output']:
+                    writer = csv.DictWriter(stack.enter_context(open(options['output'], 'w', newline='')),
+                                            RESULT_FIELDS)
+                    writer.writeheader()
+                settled = 0
+                while chunk := list(islice(records, batch_size)):
+                    for result in self.settle(chunk, settled, options['atomic']):
+                        counts[result['status']] += 1
+                        if result['status'] != 'posted':
+                            self.stderr.write(f"Record {result['record']}: {result['status']}: {result['reason']}")
+                        if writer:
+                            writer.writerow(result)
+                    settled += len(chunk)
+        except OSError as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {counts['posted']} of {total} transfers ({counts['rejected']} rejected, "
+            f"{counts['rolled_back']} rolled back) in {elapsed:.1f}s ({rate:.0f} transfers/s)."))
+
+    def settle(self, records, settled, atomic):
+        """
+        Post a chunk of settlement records, in one database transaction, and return their results with the
+        fields and the 1-based number of each record.
+        """
+        numbers = {record.get(key) for record in records for key in ('source_account', 'destination_account')}
+        account_ids = dict(Account.objects.filter(account_number__in=numbers - {None}).values_list(
+            'account_number', 'pk'))
+        transfers = [{
+            'source_id': account_ids.get(record.get('source_account')),
+            'destination_id': account_ids.get(record.get('destination_account')),
+            'amount': _amount(record.get('amount')),
+            'reference': str(record.get('reference') or '').strip(),
+        } for record in records]
+        results = post_transfers(transfers, atomic=atomic, batch_size=len(transfers))
+        return [{
+            'record': settled + index + 1,
+            'source_account': record.get('source_account'),
+            'destination_account': record.get('destination_account'),
+            'amount': record.get('amount'),
+            'reference': transfer['reference'],
+            'status': result['status'],
+            'reason': result['reason'],
+            'transfer_id': result['transfer_id'],
+        } for index, (record, transfer, result) in enumerate(zip(records, transfers, results))]
+
+
+def _amount(value):
+    """
+    Parse an amount with at most two decimal places; anything else is None and rejected as an invalid amount.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+        if amount != amount.quantize(CENT):
+            return None
+    except InvalidOperation:
+        return None
+    return amount
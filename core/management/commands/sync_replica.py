@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.constants import DatabaseConstant
+
+
+class Command(BaseCommand):
+    help = ("Copy the primary SQLite database into the read replica file with SQLite's online backup, once or "
+            "every --interval seconds. Writers are not blocked while the copy runs.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Copy again every this many seconds until interrupted.")
+        parser.add_argument('--pages', type=int, default=1024,
+                            help="Database pages copied per step; the source is unlocked between steps.")
+
+    def handle(self, *args, **options):
+        if DatabaseConstant.REPLICA_ALIAS not in connections.settings:
+            raise CommandError("No replica database is configured; set BANKING_DB_REPLICA.")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("sync_replica only copies SQLite databases; use the database's own replication.")
+        replica = connections.settings[DatabaseConstant.REPLICA_ALIAS]
+
+        while True:
+            started = time.perf_counter()
+            primary.ensure_connection()
+            target = sqlite3.connect(replica['NAME'], timeout=replica['OPTIONS'].get('timeout', 5))
+            try:
+                primary.connection.backup(target, pages=options['pages'])
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f"Copied {primary.settings_dict['NAME']} to {replica['NAME']} "
+                f"in {time.perf_counter() - started:.2f}s."))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
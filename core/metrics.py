@@ -0,0 +1,276 @@
+"""
+In-process performance metrics, exposed in the Prometheus text format at /metrics.
+
+Every thread records into its own shard, a plain dict only that thread writes to, so recording takes no
+lock; a scrape sums the shards. A scrape may see an observation's bucket before its sum, which Prometheus
+tolerates. When a thread is gone its shard is folded into the retired totals, so counters never go backwards
+and a server that starts a thread per request does not keep a shard per request.
+
+Database queries are counted and timed by an execute wrapper installed on every connection when it is
+created; `query_stats` reads the current thread's totals before and after a block.
+"""
+import bisect
+import collections
+import functools
+import itertools
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from .constants import MetricsConstant
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self._local = threading.local()
+        self._shards = {}
+        self._keys = itertools.count()
+        # Keys of the shards whose thread is gone. Appended to by weakref finalizers, which may run in any
+        # thread, even one holding `_lock`, so they only append and the shards are retired under the lock.
+        self._finished = collections.deque()
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            key = next(self._keys)
+            with self._lock:
+                self._retire_finished()
+                self._shards[key] = shard
+            weakref.finalize(threading.current_thread(), self._finished.append, key)
+        return shard
+
+    def collect(self):
+        """
+        Return {metric name: {label values: summed values}} over every shard and the retired totals.
+        """
+        with self._lock:
+            self._retire_finished()
+            shards = list(self._shards.values())
+            totals = {metric.name: {} for metric in self.metrics}
+            _merge(totals, self._retired)
+        for shard in shards:
+            _merge(totals, shard)
+        return totals
+
+    def clear(self):
+        with self._lock:
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+    def _retire_finished(self):
+        while self._finished:
+            shard = self._shards.pop(self._finished.popleft(), None)
+            for series, values in (shard or {}).items():
+                retired = self._retired.get(series)
+                if retired is None:
+                    self._retired[series] = values
+                else:
+                    for index, value in enumerate(values):
+                        retired[index] += value
+
+    def exposition(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        totals = self.collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, values in sorted(totals[metric.name].items()):
+                lines.extend(metric.samples(dict(zip(metric.labelnames, labels)), values))
+        return '\n'.join(lines) + '\n'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.register(self)
+
+    def inc(self, labels, amount=1):
+        shard = self.registry.shard()
+        values = shard.get((self.name, labels))
+        if values is None:
+            values = shard[self.name, labels] = [0]
+        values[0] += amount
+
+    def samples(self, labels, values):
+        yield f"{self.name}{_labels(labels)} {_number(values[0])}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets=MetricsConstant.REQUEST_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def observe(self, labels, value):
+        shard = self.registry.shard()
+        values = shard.get((self.name, labels))
+        if values is None:
+            # One count per bucket plus the +Inf bucket, then the sum.
+            values = shard[self.name, labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def samples(self, labels, values):
+        cumulative = 0
+        for bound, count in zip([repr(float(bound)) for bound in self.buckets] + ['+Inf'], values):
+            cumulative += count
+            yield f"{self.name}_bucket{_labels(dict(labels, le=bound))} {cumulative}"
+        yield f"{self.name}_sum{_labels(labels)} {_number(values[-1])}"
+        yield f"{self.name}_count{_labels(labels)} {cumulative}"
+
+
+def _merge(totals, shard):
+    for (name, labels), values in list(shard.items()):
+        merged = totals[name].get(labels)
+        if merged is None:
+            totals[name][labels] = list(values)
+        else:
+            for index, value in enumerate(values):
+                merged[index] += value
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = Histogram(REGISTRY, 'banking_http_request_duration_seconds',
+                             "Time to handle a request, by view, method and status.",
+                             ('view', 'method', 'status'))
+REQUEST_QUERIES = Counter(REGISTRY, 'banking_http_request_db_queries_total',
+                          "Database queries run by requests, by view.", ('view',))
+REQUEST_DB_SECONDS = Counter(REGISTRY, 'banking_http_request_db_seconds_total',
+                             "Time spent in database queries by requests, by view.", ('view',))
+OPERATION_DURATION = Histogram(REGISTRY, 'banking_account_operation_duration_seconds',
+                               "Time of Account.deposit/withdraw, by account type and outcome.",
+                               ('operation', 'account_type', 'outcome'))
+OPERATION_QUERIES = Counter(REGISTRY, 'banking_account_operation_db_queries_total',
+                            "Database queries run by Account.deposit/withdraw, by account type.",
+                            ('operation', 'account_type'))
+OPERATION_DB_SECONDS = Counter(REGISTRY, 'banking_account_operation_db_seconds_total',
+                               "Time spent in database queries by Account.deposit/withdraw, by account type.",
+                               ('operation', 'account_type'))
+RULE_DURATION = Histogram(REGISTRY, 'banking_rule_check_duration_seconds',
+                          "Time of a strategy's is_allowed check, by strategy, account type and outcome.",
+                          ('strategy', 'account_type', 'outcome'), buckets=MetricsConstant.RULE_BUCKETS)
+
+
+class QueryStats:
+    """
+    Number of database queries and seconds spent in them, filled in when a `query_stats` block exits.
+    """
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+class _QueryCounter(threading.local):
+    queries = 0
+    seconds = 0.0
+
+
+_query_counter = _QueryCounter()
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper adding every query and its duration to the current thread's totals.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _query_counter.seconds += time.perf_counter() - started
+        _query_counter.queries += 1
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    connection_created receiver: wrap every new connection with `count_queries`, once.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@contextmanager
+def query_stats():
+    """
+    Count and time the queries the current thread runs in the block, on every database alias.
+    """
+    stats = QueryStats()
+    queries, seconds = _query_counter.queries, _query_counter.seconds
+    try:
+        yield stats
+    finally:
+        stats.queries = _query_counter.queries - queries
+        stats.seconds = _query_counter.seconds - seconds
+
+
+def instrument_operation(operation):
+    """
+    Decorate an Account method returning (allowed, reason) to record its latency, outcome and queries.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(account, *args, **kwargs):
+            outcome = 'error'
+            started = time.perf_counter()
+            try:
+                with query_stats() as stats:
+                    result = method(account, *args, **kwargs)
+                outcome = 'allowed' if result[0] else 'denied'
+                return result
+            finally:
+                labels = (operation, account.account_type)
+                OPERATION_DURATION.observe(labels + (outcome,), time.perf_counter() - started)
+                OPERATION_QUERIES.inc(labels, stats.queries)
+                OPERATION_DB_SECONDS.inc(labels, stats.seconds)
+        return wrapper
+    return decorator
+
+
+def check_rule(strategy, account, amount, context):
+    """
+    Call `strategy.is_allowed(account, amount, context)` and record how long it took.
+    """
+    started = time.perf_counter()
+    allowed, reason = strategy.is_allowed(account, amount, context)
+    RULE_DURATION.observe((type(strategy).__name__, account.account_type, 'allowed' if allowed else 'denied'),
+                          time.perf_counter() - started)
+    return allowed, reason
@@ -0,0 +1,86 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .constants import DatabaseConstant
+from .metrics import REQUEST_DB_SECONDS, REQUEST_DURATION, REQUEST_QUERIES, query_stats
+from .routers import replica_configured, replica_reads
+
+
+class MetricsMiddleware:
+    """
+    Record the latency of every request by view, method and status, and the number and time of the
+    database queries it ran. Async views run their queries in other threads, so only their latency is recorded.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with query_stats() as stats:
+            response = self.get_response(request)
+        view = self.record(request, response, started)
+        REQUEST_QUERIES.inc((view,), stats.queries)
+        REQUEST_DB_SECONDS.inc((view,), stats.seconds)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, started)
+        return response
+
+    @staticmethod
+    def record(request, response, started):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUEST_DURATION.observe((view, request.method, str(response.status_code)), time.perf_counter() - started)
+        return view
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve the reads of safe requests from the read replica (see core.routers). A successful unsafe request
+    sets a short-lived cookie that keeps the client's reads on the primary, so it sees its own writes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.reads_from_replica(request):
+            with replica_reads():
+                return self.get_response(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        if self.reads_from_replica(request):
+            with replica_reads():
+                return await self.get_response(request)
+        return self.pin(request, await self.get_response(request))
+
+    @staticmethod
+    def reads_from_replica(request):
+        return request.method in DatabaseConstant.SAFE_METHODS and \
+            DatabaseConstant.PIN_COOKIE not in request.COOKIES and replica_configured()
+
+    @staticmethod
+    def pin(request, response):
+        if request.method not in DatabaseConstant.SAFE_METHODS and response.status_code < 400 and \
+                replica_configured():
+            response.set_cookie(DatabaseConstant.PIN_COOKIE, '1', max_age=DatabaseConstant.PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-18 03:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the month the counters belong to.')),
+                ('withdrawal_count', models.PositiveIntegerField(default=0)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_counters', to='core.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='accountperiodcounter',
+            constraint=models.UniqueConstraint(fields=('account', 'period'), name='unique_account_period_counter'),
+        ),
+    ]
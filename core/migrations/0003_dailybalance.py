@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-18 03:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_accountperiodcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('closing_balance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('cumulative_balance', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='core.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailybalance',
+            constraint=models.UniqueConstraint(fields=('account', 'date'), name='unique_account_daily_balance'),
+        ),
+    ]
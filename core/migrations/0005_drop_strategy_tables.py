@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-18 03:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_transaction_ledger_indexes'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='DefaultDeposit',
+        ),
+        migrations.DeleteModel(
+            name='RegularSavingWithdrawal',
+        ),
+        migrations.DeleteModel(
+            name='StudentDeposit',
+        ),
+        migrations.DeleteModel(
+            name='StudentWithdrawal',
+        ),
+        migrations.DeleteModel(
+            name='ZeroBalanceWithdrawal',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-18 03:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_through', models.DateTimeField()),
+                ('last_transaction_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('archived_count', models.PositiveBigIntegerField(default=0)),
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoint', to='core.account')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('transaction_type', models.CharField(choices=[('deposit', 'Deposit'), ('withdrawal', 'Withdrawal')], max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('available_balance_after_transaction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('account', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='core.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'timestamp'], name='archive_account_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 03:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_ledger_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='charge',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='charge',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='MonthlyStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('opening_balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('deposit_count', models.PositiveIntegerField(default=0)),
+                ('withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('withdrawal_count', models.PositiveIntegerField(default=0)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('closed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statements', to='core.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='monthlystatement',
+            constraint=models.UniqueConstraint(fields=('account', 'period'), name='unique_account_statement'),
+        ),
+    ]
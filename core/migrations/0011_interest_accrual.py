@@ -0,0 +1,31 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestAccrual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('balance_days', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('annual_rate', models.DecimalField(decimal_places=5, max_digits=7)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('accrued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_accruals', to='core.account')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='interestaccrual',
+            constraint=models.UniqueConstraint(fields=('account', 'period'), name='unique_account_interest_accrual'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_interest_accrual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankRollup',
+            fields=[
+                ('accounts', models.BigIntegerField(default=0)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_count', models.BigIntegerField(default=0)),
+                ('withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('withdrawal_count', models.BigIntegerField(default=0)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('bank', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='core.bank')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserRollup',
+            fields=[
+                ('accounts', models.BigIntegerField(default=0)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_count', models.BigIntegerField(default=0)),
+                ('withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('withdrawal_count', models.BigIntegerField(default=0)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup', serialize=False, to='core.user')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accounts', models.BigIntegerField(default=0)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('deposit_count', models.BigIntegerField(default=0)),
+                ('withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('withdrawal_count', models.BigIntegerField(default=0)),
+                ('fee_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollup_deltas', to='core.bank')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollup_deltas', to='core.user')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
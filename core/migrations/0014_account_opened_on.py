@@ -0,0 +1,26 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_transfer'),
+    ]
+
+    operations = [
+        # Added without the default first, so existing accounts keep a null (unknown) opening day instead of
+        # the day of the migration.
+        migrations.AddField(
+            model_name='account',
+            name='opened_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='account',
+            name='opened_on',
+            field=models.DateField(blank=True, default=django.utils.timezone.localdate, null=True),
+        ),
+    ]
@@ -1,8 +1,16 @@
-from datetime import datetime, timedelta
-from django.db.models import Avg
-from django.db import models
-from .constants import AccountConstants, WithdrawalConstant, StudentAccountWithdrawalConstant, \
-    SavingAccountWithdrawalConstant, DepositConstant, StudentAccountDepositConstant
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import F, FilteredRelation, OuterRef, Q, Subquery
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from .cache import account_cache
+from .journal import ledger_journal
+from .metrics import check_rule, instrument_operation
+from .periods import month_start
+from .constants import (AccountConstants, BatchConstant, WithdrawalConstant, SavingAccountWithdrawalConstant,
+                        TransferConstant)
+from .strategies import get_deposit_strategy, get_withdrawal_strategy
 
 
 class Bank(models.Model):
@@ -26,6 +34,10 @@ class Account(models.Model):
     account_type = models.CharField(max_length=20, choices=AccountConstants.ACCOUNT_TYPES)
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     kyc_verified = models.BooleanField(default=False)
+    # Incremented by every balance or KYC write; lets the account cache tell fresh entries from stale ones.
+    version = models.PositiveBigIntegerField(default=0)
+    # Interest is only paid from this day on. Null for accounts opened before it was recorded.
+    opened_on = models.DateField(null=True, blank=True, default=timezone.localdate)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='accounts')
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE, related_name='accounts')
 
@@ -36,202 +48,674 @@ class Account(models.Model):
         return self.balance
 
     def update_kyc_status(self, kyc_verified):
-        self.kyc_verified = kyc_verified
-        self.save()
-
+        with transaction.atomic():
+            Account.objects.filter(pk=self.pk).update(kyc_verified=kyc_verified, version=F('version') + 1)
+            self._refresh_versioned_fields()
+            account_cache().write_through(self)
+
+    async def aupdate_kyc_status(self, kyc_verified):
+        cache = account_cache()
+        cache.invalidate(self.pk)
+        # Autocommitted, so the entry can be stored right away; a reader that filled the entry in between
+        # holds an older version and is replaced.
+        await Account.objects.filter(pk=self.pk).aupdate(kyc_verified=kyc_verified, version=F('version') + 1)
+        self.balance, self.kyc_verified, self.version = await Account.objects.values_list(
+            'balance', 'kyc_verified', 'version').aget(pk=self.pk)
+        cache.store(self)
+
+    @instrument_operation('deposit')
     def deposit(self, amount):
-        strategy = self._get_deposit_strategy()
-        deposit_allowed, reason = strategy.is_allowed(self, amount)
-        if deposit_allowed:
-            self.balance += amount
-            self.save()
-            Transaction.objects.create(account=self, amount=amount, transaction_type='deposit',
-                                       available_balance_after_transaction=self.balance)
-            return True, ''
-        return False, reason
+        return self._perform('deposit', amount)
 
+    @instrument_operation('withdrawal')
     def withdraw(self, amount):
+        return self._perform('withdrawal', amount)
+
+    @instrument_operation('transfer')
+    def transfer(self, destination, amount, reference=''):
+        """
+        Move `amount` from this account to `destination` in one database transaction.
+
+        Parameters:
+        - destination: The Account receiving the money.
+        - amount: The amount requested by the client. A withdrawal charge is taken from this account on top of it.
+        - reference: Optional client reference; a non-empty reference is posted at most once.
+
+        Returns:
+        - A tuple (allowed, reason). When allowed, the balances of both accounts are updated.
+        """
+        from .transfers import post_transfers
+
+        result, = post_transfers([{'source_id': self.pk, 'destination_id': destination.pk, 'amount': amount,
+                                   'reference': reference}])
+        if result['status'] != 'posted':
+            return False, result['reason']
+        self.balance, destination.balance = result['source_balance'], result['destination_balance']
+        return True, ''
+
+    def check_operation(self, transaction_type, amount, context):
+        """
+        Evaluate the account's rules for a deposit or withdrawal without writing anything.
+
+        Parameters:
+        - transaction_type: 'deposit' or 'withdrawal'.
+        - amount: The amount requested by the client.
+        - context: The RuleContext of the account.
+
+        Returns:
+        - A tuple (allowed, reason, ledger_amount), where ledger_amount is the amount to write to the ledger,
+          including any withdrawal charge.
+        """
+        if transaction_type == 'deposit':
+            deposit_allowed, reason = check_rule(self._get_deposit_strategy(), self, amount, context)
+            return deposit_allowed, reason, amount
+
         strategy = self._get_withdrawal_strategy()
-        withdrawal_allowed, reason = strategy.is_allowed(self, amount)
-        if withdrawal_allowed:
-            withdrawal_charge = 0
-            if self.account_type == 'regular_saving':
-                withdrawal_charge = strategy.calculate_withdrawal_charge(self)
-
-            total_withdrawal_amount = amount + withdrawal_charge
-            if self.balance >= total_withdrawal_amount:
-                self.balance -= total_withdrawal_amount
-                self.save()
-                Transaction.objects.create(account=self, amount=total_withdrawal_amount, transaction_type='withdrawal',
-                                           available_balance_after_transaction=self.balance)
-                return True, ''
-            else:
-                reason = WithdrawalConstant.FAILURE_REASONS["INSUFFICIENT_BALANCE"]
-        return False, reason
+        withdrawal_allowed, reason = check_rule(strategy, self, amount, context)
+        if not withdrawal_allowed:
+            return False, reason, amount
+
+        total_withdrawal_amount = amount + strategy.calculate_withdrawal_charge(self, context)
+        if self.balance < total_withdrawal_amount:
+            return False, WithdrawalConstant.FAILURE_REASONS["INSUFFICIENT_BALANCE"], total_withdrawal_amount
+        return True, '', total_withdrawal_amount
+
+    def _perform(self, transaction_type, amount):
+        journal = ledger_journal()
+        # The journal commits in its own transaction, so callers inside a transaction write inline instead.
+        if journal is not None and not transaction.get_connection().in_atomic_block:
+            result = journal.post(self.pk, transaction_type, amount)
+            if result['status'] != 'posted':
+                return False, result['reason']
+            self.balance = result['updated_balance']
+            return True, ''
+
+        for attempt in range(BatchConstant.MAX_STALE_RETRIES):
+            with transaction.atomic():
+                context = self._lock_for_update()
+                allowed, reason, ledger_amount = self.check_operation(transaction_type, amount, context)
+                if not allowed:
+                    return False, reason
+                if self._post_transaction(transaction_type, ledger_amount, charge=ledger_amount - amount):
+                    return True, ''
+        return False, BatchConstant.FAILURE_REASONS["ACCOUNT_BUSY"]
+
+    def _lock_for_update(self):
+        """
+        Lock the account row for the rest of the surrounding transaction, reload the fields the rules read
+        and return its RuleContext. Concurrent requests on the same account are then evaluated one after
+        the other.
+        """
+        locked = RuleContext.annotate(Account.objects.select_for_update(of=('self',))).get(pk=self.pk)
+        self.balance, self.kyc_verified, self.version = locked.balance, locked.kyc_verified, locked.version
+        return RuleContext.load([locked])[self.pk]
+
+    def _post_transaction(self, transaction_type, amount, charge=0):
+        """
+        Move the balance and write the ledger row for an allowed deposit or withdrawal.
+        `amount` includes the withdrawal `charge`, which is recorded on the ledger row for statements.
+        Must run inside the transaction holding the account lock, after `_lock_for_update`. The balance
+        is written with a compare-and-set on the locked version, so the new balance and version follow
+        from the locked values and a withdrawal never overdraws the account even on backends where
+        select_for_update() is a no-op. Returns False if a concurrent write changed the account.
+        """
+        delta = amount if transaction_type == 'deposit' else -amount
+        if not Account.objects.filter(pk=self.pk, version=self.version).update(balance=self.balance + delta,
+                                                                                version=self.version + 1):
+            return False
+
+        self.balance += delta
+        self.version += 1
+        account_cache().write_through(self)
+        row = Transaction.objects.create(account=self, amount=amount, charge=charge,
+                                         transaction_type=transaction_type,
+                                         available_balance_after_transaction=self.balance)
+        AccountPeriodCounter.record(self, transaction_type, amount)
+        RollupDelta.record_ledger({self.pk: self}, [row])
+        DailyBalance.record(self, self.balance - delta, self.balance)
+        return True
+
+    def _refresh_versioned_fields(self):
+        self.balance, self.kyc_verified, self.version = Account.objects.values_list(
+            'balance', 'kyc_verified', 'version').get(pk=self.pk)
 
     def _get_withdrawal_strategy(self):
-        withdrawal_strategies = {
-            'zero_balance': ZeroBalanceWithdrawal(),
-            'student': StudentWithdrawal(),
-            'regular_saving': RegularSavingWithdrawal(),
-        }
-        return withdrawal_strategies.get(self.account_type)
+        return get_withdrawal_strategy(self.account_type)
 
     def _get_deposit_strategy(self):
-        deposit_strategies = {
-            'student': StudentDeposit(),
-        }
-        return deposit_strategies.get(self.account_type, DefaultDeposit())
+        return get_deposit_strategy(self.account_type)
 
 
-class WithdrawalStrategy(models.Model):
+class RuleContext:
     """
-    Abstract base class for withdrawal strategies.
-    Subclasses must implement the `is_allowed` method.
+    The state the rule strategies read besides the account itself: this month's counters and the
+    90-day average balance. The counters are joined to the locked account row (see `annotate`) and the
+    daily balance rows are read with one more query (see `load`), once per operation or once for every
+    account of a batch. The context is then advanced in memory with `record` as operations are applied.
     """
-    class Meta:
-        abstract = True
+    AVERAGE_BALANCE_DAYS = SavingAccountWithdrawalConstant.AVERAGE_BALANCE_DAYS
+
+    def __init__(self, withdrawal_count=0, deposit_total=0, average_balance=0, average_days=AVERAGE_BALANCE_DAYS,
+                 latest=None):
+        self.withdrawal_count = withdrawal_count
+        self.deposit_total = deposit_total
+        self.average_balance = average_balance
+        # The number of days averaged: fewer than AVERAGE_BALANCE_DAYS for a recently opened account.
+        self.average_days = average_days
+        # The account's latest DailyBalance row on or before today, if any.
+        self.latest = latest
+
+    @staticmethod
+    def annotate(accounts):
+        """
+        Annotate an Account queryset with the running month's counter row, joined on its key. Lock with
+        `select_for_update(of=('self',))`: the counter row is on the nullable side of the join.
+        """
+        counter = FilteredRelation('period_counters', condition=Q(period_counters__period=month_start()))
+        return accounts.annotate(rule_counter=counter, rule_withdrawal_count=F('rule_counter__withdrawal_count'),
+                                 rule_deposit_total=F('rule_counter__deposit_total'))
 
-    def is_allowed(self, account, amount):
+    @classmethod
+    def load(cls, accounts):
+        """
+        Return the context of each account loaded through `annotate`, keyed by primary key.
+        One query reads the daily balance rows bounding the average balance window of every account: the
+        latest row, the latest row on or before the window start and the first row, each fetched once.
         """
-        Check if a withdrawal is allowed for the given account and amount.
+        accounts = list(accounts)
+        account_ids = [account.pk for account in accounts]
+        today = timezone.localdate()
+        window_start = today - timedelta(days=cls.AVERAGE_BALANCE_DAYS - 1)
+
+        daily_balances = DailyBalance.objects.filter(account=OuterRef('pk'))
+        keys = Account.objects.filter(pk__in=account_ids)
+        bounds = Q()
+        for rows in (daily_balances.filter(date__lte=today).order_by('-date'),
+                     daily_balances.filter(date__lte=window_start).order_by('-date'),
+                     daily_balances.order_by('date')):
+            bounds |= Q(pk__in=keys.values(row=Subquery(rows.values('pk')[:1])))
+        rows = {}
+        for row in DailyBalance.objects.filter(bounds).order_by('date'):
+            rows.setdefault(row.account_id, []).append(row)
+
+        contexts = {}
+        for account in accounts:
+            account_rows = rows.get(account.pk, [])
+            latest = next((row for row in reversed(account_rows) if row.date <= today), None)
+            if latest is None:
+                # No recorded balance change: the current balance was held for the whole window.
+                anchor = None
+                average_balance = account.balance
+            else:
+                # Without a row before the window, extrapolate back from the account's first row.
+                anchor = next((row for row in reversed(account_rows) if row.date <= window_start), account_rows[0])
+                average_balance = DailyBalance.window_average(latest, anchor, today, cls.AVERAGE_BALANCE_DAYS,
+                                                              account.opened_on)
+            window_start_day = DailyBalance.window_start(anchor, today, cls.AVERAGE_BALANCE_DAYS, account.opened_on)
+            contexts[account.pk] = cls(account.rule_withdrawal_count or 0, account.rule_deposit_total or 0,
+                                       average_balance,
+                                       (today - window_start_day).days + 1, latest)
+        return contexts
+
+    def record(self, transaction_type, amount):
+        """
+        Account for an operation applied after the context was loaded.
+        """
+        if transaction_type == 'withdrawal':
+            self.withdrawal_count += 1
+            delta = -amount
+        else:
+            self.deposit_total += amount
+            delta = amount
+        # Today's closing balance is one of the averaged days.
+        self.average_balance += Decimal(delta) / self.average_days
+
+
+class TransactionQuerySet(models.QuerySet):
+    def in_range(self, start, end):
+        """
+        Restrict to transactions in the half-open `[start, end)` datetime range (see core.periods).
+        """
+        return self.filter(timestamp__gte=start, timestamp__lt=end)
 
-        Parameters:
-        - account: The Account instance for the withdrawal.
-        - amount: The amount to be withdrawn.
 
-        Returns:
-        - A tuple containing a boolean value indicating if the withdrawal is allowed,
-          and a reason string if the withdrawal is not allowed.
-        """
-        raise NotImplementedError("Subclasses must implement this method.")
+class Transaction(models.Model):
+    TRANSACTION_TYPES = (
+        ('deposit', 'Deposit'),
+        ('withdrawal', 'Withdrawal'),
+    )
 
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # The part of a withdrawal's amount that is a charge rather than money paid out.
+    charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
+    # A default rather than auto_now_add, so bulk imports can keep the original timestamps.
+    timestamp = models.DateTimeField(default=timezone.now)
+    available_balance_after_transaction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = TransactionQuerySet.as_manager()
 
-class ZeroBalanceWithdrawal(WithdrawalStrategy, WithdrawalConstant):
+    class Meta:
+        indexes = [
+            # Per-account rule and period queries: account + type + timestamp range.
+            models.Index(fields=['account', 'transaction_type', 'timestamp'], name='txn_account_type_ts_idx'),
+            # Per-account history ordered by time.
+            models.Index(fields=['account', 'timestamp'], name='txn_account_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} - {self.amount}"
+
+
+class ArchivedTransaction(models.Model):
     """
-    Withdrawal strategy for accounts with zero balance.
-    Allows only a limited number of withdrawals per month.
+    Cold tier of the ledger: transactions moved out of Transaction by the `archive_transactions` command.
+    Rows keep their original id, so `(timestamp, id)` history cursors stay valid across both tiers.
+    Only the (account, timestamp) index is kept; the rules read materialized counters, not this table.
     """
-    def is_allowed(self, account, amount):
-        withdrawal_count = account.transactions.filter(
-            transaction_type='withdrawal',
-            timestamp__month=datetime.now().month,
-        ).count()
-        if withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
-            return False, self.FAILURE_REASONS["MONTHLY_WITHDRAWAL_LIMIT_BREACHED"]
-        return True, ''
+    id = models.BigIntegerField(primary_key=True)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='archived_transactions',
+                                db_index=False)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    timestamp = models.DateTimeField()
+    available_balance_after_transaction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = TransactionQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'timestamp'], name='archive_account_ts_idx'),
+        ]
 
-class StudentWithdrawal(WithdrawalStrategy, StudentAccountWithdrawalConstant):
+    def __str__(self):
+        return f"{self.transaction_type} - {self.amount}"
+
+
+class Transfer(models.Model):
     """
-    Withdrawal strategy for student accounts.
-    Allows only a limited number of withdrawals per month and enforces a minimum account balance.
+    A move of money from one account to another, posted as a withdrawal from the source and a deposit into the
+    destination in the same database transaction (see core.transfers). The ids of the two ledger rows are
+    plain integers rather than foreign keys, because archiving moves the rows to ArchivedTransaction.
     """
-    def is_allowed(self, account, amount):
-        withdrawal_count = account.transactions.filter(
-            transaction_type='withdrawal',
-            timestamp__month=datetime.now().month,
-        ).count()
+    source = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='outgoing_transfers')
+    destination = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='incoming_transfers')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Withdrawal charge paid by the source on top of `amount`.
+    charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Client reference, e.g. the line id of a settlement file. A non-empty reference is posted at most once.
+    reference = models.CharField(max_length=TransferConstant.MAX_REFERENCE_LENGTH, blank=True, default='')
+    withdrawal_id = models.BigIntegerField()
+    deposit_id = models.BigIntegerField()
+    timestamp = models.DateTimeField(default=timezone.now)
 
-        if withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
-            return False, self.FAILURE_REASONS["MONTHLY_WITHDRAWAL_LIMIT_BREACHED"]
-        elif account.balance - amount < self.MIN_ACCOUNT_BALANCE:
-            return False, self.FAILURE_REASONS["MIN_ACCOUNT_BALANCE_BREACHED"]
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reference'], condition=~models.Q(reference=''),
+                                    name='unique_transfer_reference'),
+        ]
 
-        return True, ''
+    def __str__(self):
+        return f"{self.source_id} -> {self.destination_id} - {self.amount}"
 
 
-class RegularSavingWithdrawal(WithdrawalStrategy, SavingAccountWithdrawalConstant):
+class BalanceCheckpoint(models.Model):
     """
-    Withdrawal strategy for regular saving accounts.
-    Allows a limited number of free withdrawals per month and enforces a minimum average balance over the last 90 days.
+    The balance of an account right after its newest archived transaction. Every transaction of the account
+    up to `archived_through` is in ArchivedTransaction, every later one in Transaction.
     """
-    def is_allowed(self, account, amount):
-        # Check if the account has a minimum average balance of 5000 rupees over the last 90 days
-        last_90_days = datetime.now() - timedelta(days=90)
-        average_balance = account.transactions.filter(
-            timestamp__gte=last_90_days,
-        ).aggregate(avg_balance=Avg('available_balance_after_transaction'))['avg_balance']
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name='balance_checkpoint')
+    archived_through = models.DateTimeField()
+    last_transaction_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    archived_count = models.PositiveBigIntegerField(default=0)
 
-        if average_balance and average_balance < self.AVERAGE_BALANCE:
-            return False, self.FAILURE_REASONS["MIN_ACCOUNT_BALANCE_BREACHED"]
+    def __str__(self):
+        return f"{self.account_id} - {self.archived_through} - {self.balance}"
 
-        return True, ''
 
-    def calculate_withdrawal_charge(self, account):
-        withdrawal_count = account.transactions.filter(
-            transaction_type='withdrawal',
-            timestamp__month=datetime.now().month,
-        ).count()
-        if withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
-            return self.EXTRA_WITHDRAWAL_CHARGE
-        return 0
+class AccountPeriodCounter(models.Model):
+    """
+    Running monthly totals for an account.
+    Updated by Account.deposit/withdraw in the same DB transaction as the ledger write, so the
+    monthly rules read a single row instead of scanning the account's transactions.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='period_counters')
+    period = models.DateField(help_text="First day of the month the counters belong to.")
+    withdrawal_count = models.PositiveIntegerField(default=0)
+    deposit_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'period'], name='unique_account_period_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.period:%Y-%m}"
+
+    @staticmethod
+    def period_for(moment=None):
+        """
+        Return the period key (first day of the month, local time) for the given moment, default now.
+        """
+        return month_start(moment)
+
+    @classmethod
+    def current(cls, account):
+        """
+        Return the counters of the running month for the account.
+        An unsaved, zeroed instance is returned when the account has no activity this month.
+        """
+        period = cls.period_for()
+        counter = cls.objects.filter(account=account, period=period).first()
+        return counter or cls(account=account, period=period)
 
+    @classmethod
+    def record(cls, account, transaction_type, amount):
+        """
+        Add a freshly written transaction to the running month's counters.
+        Must be called inside the transaction that wrote the ledger row.
+        """
+        if transaction_type == 'withdrawal':
+            cls.add(account, withdrawal_count=1)
+        else:
+            cls.add(account, deposit_total=amount)
 
-class DepositStrategy(models.Model):
+    @classmethod
+    def add(cls, account, withdrawal_count=0, deposit_total=0):
+        """
+        Add already aggregated amounts to the running month's counters.
+        Must be called inside the transaction that wrote the ledger rows.
+        """
+        period = cls.period_for()
+        changes = {'withdrawal_count': F('withdrawal_count') + withdrawal_count,
+                   'deposit_total': F('deposit_total') + deposit_total}
+        if cls.objects.filter(account=account, period=period).update(**changes):
+            return
+        _, created = cls.objects.get_or_create(account=account, period=period, defaults={
+            'withdrawal_count': withdrawal_count, 'deposit_total': deposit_total})
+        if not created:
+            cls.objects.filter(account=account, period=period).update(**changes)
+
+
+class DailyBalance(models.Model):
     """
-    Abstract base class for deposit strategies.
-    Subclasses must implement the `is_allowed` method.
+    End-of-day balance of an account together with a running balance-day sum.
+    `cumulative_balance` is the sum of the closing balances of every tracked day before `date`, so the
+    balance sum over any window is the difference of two rows and the time-weighted average balance is
+    a constant-time lookup. A row is written on each day the balance changes and by the nightly rollover.
     """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    opening_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    closing_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cumulative_balance = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
     class Meta:
-        abstract = True
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='unique_account_daily_balance'),
+        ]
 
-    def is_allowed(self, account, amount):
+    def __str__(self):
+        return f"{self.account_id} - {self.date} - {self.closing_balance}"
+
+    def cumulative_at(self, day):
+        """
+        Return the balance-day sum of all days before `day`, extrapolated from this row.
+        Days after the row carry its closing balance; days before it carry its opening balance.
         """
-        Check if a deposit is allowed for the given account and amount.
+        if day >= self.date:
+            return self.cumulative_balance + self.closing_balance * (day - self.date).days
+        return self.cumulative_balance - self.opening_balance * (self.date - day).days
 
-        Parameters:
-        - account: The Account instance for the deposit.
-        - amount: The amount to be deposited.
+    def carried_to(self, day):
+        """
+        Return an unsaved row for a later `day` on which the balance did not change.
+        """
+        return DailyBalance(account_id=self.account_id, date=day, opening_balance=self.closing_balance,
+                            closing_balance=self.closing_balance, cumulative_balance=self.cumulative_at(day))
 
-        Returns:
-        - A tuple containing a boolean value indicating if the deposit is allowed,
-          and a reason string if the deposit is not allowed.
+    @classmethod
+    def record(cls, account, opening_balance, closing_balance, day=None):
+        """
+        Record a balance change of the account on `day` (default today).
+        Must be called inside the transaction that wrote the ledger row.
+        """
+        day = day or timezone.localdate()
+        updated = cls.objects.filter(account=account, date=day).update(closing_balance=closing_balance)
+        if updated:
+            return
+        previous = cls.objects.filter(account=account, date__lt=day).order_by('-date').first()
+        cumulative_balance = previous.cumulative_at(day) if previous else 0
+        cls.objects.create(account=account, date=day, opening_balance=opening_balance,
+                           closing_balance=closing_balance, cumulative_balance=cumulative_balance)
+
+    @classmethod
+    def average_balance(cls, account, days, today=None):
+        """
+        Return the time-weighted average balance of the account over the last `days` days, including today,
+        or over the days since it was opened if that is fewer.
+        An account without any recorded change has held its current balance the whole time.
         """
-        raise NotImplementedError("Subclasses must implement this method.")
+        today = today or timezone.localdate()
+        window_start = today - timedelta(days=days - 1)
+        rows = cls.objects.filter(account=account)
+
+        latest = rows.filter(date__lte=today).order_by('-date').first()
+        if latest is None:
+            return account.balance
+        anchor = rows.filter(date__lte=window_start).order_by('-date').first() or rows.order_by('date').first()
+        return cls.window_average(latest, anchor, today, days, account.opened_on)
+
+    @staticmethod
+    def window_start(anchor, today, days, opened_on=None):
+        """
+        Return the first day averaged over a window of `days` days ending today: the window start, or the day
+        the account was opened if later. An account without an opening day is averaged from its first row.
+        """
+        first_day = opened_on if opened_on is not None else getattr(anchor, 'date', None)
+        start = today - timedelta(days=days - 1)
+        if first_day is not None:
+            start = max(start, min(first_day, today))
+        return start
+
+    @classmethod
+    def window_average(cls, latest, anchor, today, days, opened_on=None):
+        """
+        Return the average balance over the days from `window_start` through today, given the latest row on or
+        before today and the latest row on or before the window start (or the first row if there is none).
+        """
+        start = cls.window_start(anchor, today, days, opened_on)
+        window_sum = latest.cumulative_at(today + timedelta(days=1)) - anchor.cumulative_at(start)
+        return window_sum / ((today - start).days + 1)
 
 
-class DefaultDeposit(DepositStrategy, DepositConstant):
-    def is_allowed(self, account, amount):
-        if amount <= self.DEPOSIT_LIMIT_WITHOUT_KYC:
-            return True, ''
-        elif account.kyc_verified:
-            return True, ''
-        return False, self.FAILURE_REASONS["KYC_LIMIT_BREACHED"]
+class IdempotencyKey(models.Model):
+    """
+    The stored response of a deposit or withdrawal sent with an Idempotency-Key header (see core.idempotency).
+    """
+    key = models.CharField(max_length=255, primary_key=True)
+    # SHA-256 of the request the key was first used for; a retry must match it.
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=JSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} - {self.status_code}"
 
 
-class StudentDeposit(DepositStrategy, StudentAccountDepositConstant):
+class MonthlyStatement(models.Model):
     """
-    Deposit strategy for student accounts.
-    Limits the total deposit amount in a month.
+    Summary of an account's ledger for one closed month, written by the `close_period` command.
+    `closing_balance` = `opening_balance` + `deposit_total` - `withdrawal_total` - `fee_total`.
     """
-    def is_allowed(self, account, amount):
-        # Check if the total deposit amount in this month exceeds the monthly limit (10,000 rupees)
-        today = datetime.now()
-        first_day_of_month = today.replace(day=1)
-        total_deposit_this_month = account.transactions.filter(
-            transaction_type='deposit',
-            timestamp__gte=first_day_of_month,
-            timestamp__lte=today
-        ).aggregate(total_deposit=models.Sum('amount'))['total_deposit'] or 0
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='statements')
+    # First day of the month.
+    period = models.DateField()
+    opening_balance = models.DecimalField(max_digits=10, decimal_places=2)
+    closing_balance = models.DecimalField(max_digits=10, decimal_places=2)
+    deposit_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    deposit_count = models.PositiveIntegerField(default=0)
+    # Money paid out by withdrawals, excluding their charges.
+    withdrawal_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    withdrawal_count = models.PositiveIntegerField(default=0)
+    fee_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    closed_at = models.DateTimeField(default=timezone.now)
 
-        if total_deposit_this_month + amount > self.MONTHLY_DEPOSIT_LIMIT:
-            return False, self.FAILURE_REASONS["MONTHLY_DEPOSIT_LIMIT_BREACHED"]
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'period'], name='unique_account_statement'),
+        ]
 
-        return True, ''
+    def __str__(self):
+        return f"{self.account_id} - {self.period} - {self.closing_balance}"
 
 
-class Transaction(models.Model):
-    TRANSACTION_TYPES = (
-        ('deposit', 'Deposit'),
-        ('withdrawal', 'Withdrawal'),
+class InterestAccrual(models.Model):
+    """
+    Interest of an account for one closed month, written by the `accrue_interest` command.
+    `balance_days` is the sum of the account's end-of-day balances over the month, and `amount` is
+    `balance_days` * `annual_rate` / 365 rounded half up to the cent. A non-zero amount was posted to the
+    ledger as a deposit in the same database transaction as this row.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='interest_accruals')
+    # First day of the month.
+    period = models.DateField()
+    balance_days = models.DecimalField(max_digits=20, decimal_places=2)
+    annual_rate = models.DecimalField(max_digits=7, decimal_places=5)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    accrued_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'period'], name='unique_account_interest_accrual'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.period} - {self.amount}"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a resumable bulk import job (see core.importer).
+    `records` counts the input records already committed, advanced in the same database transaction
+    as each imported batch.
+    """
+    KINDS = (
+        ('accounts', 'Accounts'),
+        ('transactions', 'Transactions'),
     )
 
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions')
-    amount = models.DecimalField(max_digits=10, decimal_places=2)
-    transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
-    timestamp = models.DateTimeField(auto_now_add=True)
-    available_balance_after_transaction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    name = models.CharField(max_length=255, unique=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    records = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.transaction_type} - {self.amount}"
+        return f"{self.name} - {self.records}"
+
+
+class RollupTotals(models.Model):
+    """
+    Totals of a set of accounts: how many there are, their balance, and the volumes of their ledger.
+    """
+    accounts = models.BigIntegerField(default=0)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    deposit_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    deposit_count = models.BigIntegerField(default=0)
+    # Money paid out by withdrawals, excluding their charges.
+    withdrawal_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    withdrawal_count = models.BigIntegerField(default=0)
+    fee_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    MEASURES = ('accounts', 'balance', 'deposit_total', 'deposit_count', 'withdrawal_total', 'withdrawal_count',
+                'fee_total')
+
+    class Meta:
+        abstract = True
+
+    def add(self, totals):
+        """
+        Add a dict (or object) of measures to these totals; measures missing from a dict count as zero.
+        """
+        for name in self.MEASURES:
+            value = totals.get(name) if isinstance(totals, dict) else getattr(totals, name)
+            setattr(self, name, getattr(self, name) + (value or 0))
+
+
+class BankRollup(RollupTotals):
+    """
+    Compacted totals of a bank's accounts, maintained by the `compact_rollups` command (see core.rollups).
+    """
+    bank = models.OneToOneField(Bank, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.bank_id} - {self.accounts} - {self.balance}"
+
+
+class UserRollup(RollupTotals):
+    """
+    Compacted totals of a user's accounts, maintained by the `compact_rollups` command (see core.rollups).
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='rollup')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.accounts} - {self.balance}"
+
+
+class RollupDelta(RollupTotals):
+    """
+    A change to the totals of a bank and of a user, appended in the same database transaction as the ledger or
+    account write it describes. Writers only insert, so concurrent writes to accounts of the same bank never
+    contend on a shared row; `compact_rollups` folds the deltas into BankRollup and UserRollup and deletes them.
+    """
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, related_name='rollup_deltas')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rollup_deltas')
+
+    def __str__(self):
+        return f"{self.bank_id} - {self.user_id} - {self.balance}"
+
+    @classmethod
+    def record_ledger(cls, accounts, rows):
+        """
+        Append the deltas of freshly written ledger rows, one per (bank, user) pair.
+        `accounts` maps the account_id of every row to its account.
+        """
+        deltas = {}
+        for row in rows:
+            account = accounts[row.account_id]
+            delta = deltas.get((account.bank_id, account.user_id))
+            if delta is None:
+                delta = deltas[account.bank_id, account.user_id] = cls(bank_id=account.bank_id,
+                                                                       user_id=account.user_id)
+            if row.transaction_type == 'deposit':
+                delta.balance += row.amount
+                delta.deposit_total += row.amount
+                delta.deposit_count += 1
+            else:
+                delta.balance -= row.amount
+                delta.withdrawal_total += row.amount - row.charge
+                delta.withdrawal_count += 1
+                delta.fee_total += row.charge
+        cls.objects.bulk_create(deltas.values())
+
+    @classmethod
+    def record_accounts(cls, accounts):
+        """
+        Append the deltas of freshly created accounts, one per (bank, user) pair.
+        """
+        deltas = {}
+        for account in accounts:
+            delta = deltas.get((account.bank_id, account.user_id))
+            if delta is None:
+                delta = deltas[account.bank_id, account.user_id] = cls(bank_id=account.bank_id,
+                                                                       user_id=account.user_id)
+            delta.accounts += 1
+            delta.balance += account.balance
+        cls.objects.bulk_create(deltas.values())
@@ -0,0 +1,239 @@
+"""
+Keyset (cursor) pagination over the ledger ordered by `(timestamp, id)`, newest first.
+
+A page is fetched with an index range seek that starts right after the previous page's last row,
+so deep pages cost the same as the first one, unlike OFFSET pagination. Archived transactions keep their
+ids and are all older than the account's hot transactions, so `history_page` continues a page into the
+archive tier once the hot tier is exhausted, with the same cursors.
+
+Pagination is opt-in: a history request without `page_size` or `cursor` gets the whole history as a plain
+list, the response format that predates pagination (see `history_rows`).
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .constants import HistoryConstant
+from .models import ArchivedTransaction, Transaction
+from .periods import day_start
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidHistoryParameter(ValueError):
+    """
+    A transaction history query parameter is malformed. The message is meant for the client.
+    """
+
+
+def encode_cursor(timestamp, pk):
+    raw = f"{timestamp.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Return the `(timestamp, id)` position encoded in a cursor, raising InvalidCursor if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        timestamp, pk = raw.split('|')
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(value)
+    if not isinstance(timestamp, datetime):
+        raise InvalidCursor(value)
+    return timestamp, pk
+
+
+def after_cursor(queryset, cursor):
+    """
+    Restrict a queryset ordered by `(-timestamp, -id)` to the rows after the cursor position.
+    """
+    timestamp, pk = cursor
+    # The redundant `timestamp <= ...` bound lets the database seek the (account, timestamp) index
+    # instead of filtering every newer row.
+    return queryset.filter(timestamp__lte=timestamp).filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp,
+                                                                                            pk__lt=pk))
+
+
+def keyset_page(queryset, page_size, cursor=None, fields=None):
+    """
+    Return `(rows, next_cursor)` for the page after `cursor` (the first page when None).
+    `next_cursor` is None on the last page. With `fields`, rows are `values_list` tuples of those fields,
+    which must include 'timestamp' and 'id'.
+    """
+    queryset = _page_query(queryset, cursor, fields)
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], encode_cursor(*row_position(rows[page_size - 1], fields))
+
+
+async def akeyset_page(queryset, page_size, cursor=None, fields=None):
+    """
+    Async version of `keyset_page`.
+    """
+    queryset = _page_query(queryset, cursor, fields)
+    rows = [row async for row in queryset[:page_size + 1]]
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], encode_cursor(*row_position(rows[page_size - 1], fields))
+
+
+def _page_query(queryset, cursor, fields):
+    queryset = queryset.order_by('-timestamp', '-id')
+    if cursor is not None:
+        queryset = after_cursor(queryset, cursor)
+    if fields is not None:
+        queryset = queryset.values_list(*fields)
+    return queryset
+
+
+def row_position(row, fields=None):
+    """
+    Return the `(timestamp, id)` position of a page row: a model instance, or a tuple of `fields`.
+    """
+    if fields is None:
+        return row.timestamp, row.pk
+    return row[fields.index('timestamp')], row[fields.index('id')]
+
+
+def is_paginated(params):
+    """
+    Return whether a history request asked for keyset pages, by passing `page_size` or `cursor`.
+    """
+    return 'page_size' in params or 'cursor' in params
+
+
+def history_rows(account, params, fields=None):
+    """
+    Return the whole transaction history of an account matching the `from`, `to` and `transaction_type`
+    parameters, newest first, across both ledger tiers. Rows are model instances, or tuples of `fields`.
+    Raises InvalidHistoryParameter if a parameter is malformed.
+    """
+    rows = []
+    for model in (Transaction, ArchivedTransaction):
+        transactions, _, _ = history_query(account, params, model=model)
+        rows.extend(_page_query(transactions, None, fields))
+    return rows
+
+
+async def ahistory_rows(account, params, fields=None):
+    """
+    Async version of `history_rows`.
+    """
+    rows = []
+    for model in (Transaction, ArchivedTransaction):
+        transactions, _, _ = history_query(account, params, model=model)
+        rows.extend([row async for row in _page_query(transactions, None, fields)])
+    return rows
+
+
+def history_page(account, params, fields=None):
+    """
+    Return `(rows, next_cursor)` for a page of the transaction history of an account, across both ledger tiers.
+    Rows are model instances, or tuples of `fields` (see `keyset_page`).
+    Raises InvalidHistoryParameter if a parameter is malformed.
+    """
+    transactions, page_size, cursor = history_query(account, params)
+    rows, next_cursor = keyset_page(transactions, page_size, cursor, fields)
+    if next_cursor is not None:
+        return rows, next_cursor
+
+    archived, _, _ = history_query(account, params, model=ArchivedTransaction)
+    position = row_position(rows[-1], fields) if rows else cursor
+    if len(rows) < page_size:
+        more, next_cursor = keyset_page(archived, page_size - len(rows), position, fields)
+        return rows + more, next_cursor
+    if after_cursor(archived, position).exists():
+        next_cursor = encode_cursor(*position)
+    return rows, next_cursor
+
+
+async def ahistory_page(account, params, fields=None):
+    """
+    Async version of `history_page`.
+    """
+    transactions, page_size, cursor = history_query(account, params)
+    rows, next_cursor = await akeyset_page(transactions, page_size, cursor, fields)
+    if next_cursor is not None:
+        return rows, next_cursor
+
+    archived, _, _ = history_query(account, params, model=ArchivedTransaction)
+    position = row_position(rows[-1], fields) if rows else cursor
+    if len(rows) < page_size:
+        more, next_cursor = await akeyset_page(archived, page_size - len(rows), position, fields)
+        return rows + more, next_cursor
+    if await after_cursor(archived, position).aexists():
+        next_cursor = encode_cursor(*position)
+    return rows, next_cursor
+
+
+def history_query(account, params, model=Transaction):
+    """
+    Build the transaction history query of an account from the request query parameters.
+
+    Parameters:
+    - account: The Account (or its id) whose history is requested.
+    - params: The query parameters: page_size, cursor, from, to and transaction_type.
+    - model: The ledger tier to query, Transaction or ArchivedTransaction.
+
+    Returns:
+    - A tuple (transactions, page_size, cursor) to pass to `keyset_page`.
+      Raises InvalidHistoryParameter if a parameter is malformed.
+    """
+    transactions = model.objects.filter(account=account)
+    try:
+        page_size = int(params.get('page_size', HistoryConstant.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = 0
+    if page_size <= 0:
+        raise InvalidHistoryParameter(HistoryConstant.FAILURE_REASONS["INVALID_PAGE_SIZE"])
+    page_size = min(page_size, HistoryConstant.MAX_PAGE_SIZE)
+
+    transaction_type = params.get('transaction_type')
+    if transaction_type is not None:
+        if transaction_type not in dict(Transaction.TRANSACTION_TYPES):
+            raise InvalidHistoryParameter(HistoryConstant.FAILURE_REASONS["INVALID_TRANSACTION_TYPE"])
+        transactions = transactions.filter(transaction_type=transaction_type)
+
+    try:
+        start = _parse_bound(params.get('from'), end=False)
+        end = _parse_bound(params.get('to'), end=True)
+    except ValueError:
+        raise InvalidHistoryParameter(HistoryConstant.FAILURE_REASONS["INVALID_DATE"])
+    if start is not None:
+        transactions = transactions.filter(timestamp__gte=start)
+    if end is not None:
+        transactions = transactions.filter(timestamp__lt=end)
+
+    cursor = params.get('cursor')
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        raise InvalidHistoryParameter(HistoryConstant.FAILURE_REASONS["INVALID_CURSOR"])
+    return transactions, page_size, cursor
+
+
+def _parse_bound(value, end):
+    """
+    Parse a `from`/`to` query parameter into an aware datetime. A bare date means the start of that day,
+    or the start of the next day for the exclusive `to` bound.
+    """
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is not None:
+        return day_start(day + timedelta(days=1) if end else day)
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(value)
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
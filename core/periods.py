@@ -0,0 +1,52 @@
+"""
+Reporting periods as timezone-aware, half-open datetime ranges.
+
+Filtering on `timestamp__gte=start, timestamp__lt=end` can use the ledger indexes, unlike
+`timestamp__month=...` which extracts the month from every row (and ignores the year).
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def parse_month(value):
+    """
+    Parse a YYYY-MM string into the first day of that month, raising ValueError if it is malformed.
+    """
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def month_start(moment=None):
+    """
+    Return the first day of the month containing `moment` (default now), in local time.
+    """
+    return timezone.localdate(moment).replace(day=1)
+
+
+def next_month_start(day):
+    """
+    Return the first day of the month following the month of `day`.
+    """
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def day_start(day):
+    """
+    Return the aware datetime of local midnight at the start of `day`.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def month_bounds(moment=None):
+    """
+    Return the `[start, end)` datetimes of the month containing `moment` (default now).
+    """
+    first_day = month_start(moment)
+    return day_start(first_day), day_start(next_month_start(first_day))
+
+
+def month_bounds_of(period):
+    """
+    Return the `[start, end)` datetimes of the month whose first day is `period`.
+    """
+    return day_start(period), day_start(next_month_start(period))
@@ -0,0 +1,190 @@
+"""
+Vectorized reconciliation of the ledger against account balances.
+
+Ledger rows of both tiers are streamed in (account, timestamp, id) order, `chunk_size` rows at a time, with
+amounts converted to signed integer cents by the database. Each chunk becomes NumPy arrays, and the running
+balance of every account is a cumulative sum over its slice of the chunk. Each row's expected balance is
+compared with its `available_balance_after_transaction`, and each account's final ledger balance with
+`Account.balance`. An account's opening balance is inferred from its first row. The running balance of the
+account split by a chunk boundary is carried into the next chunk, so memory is bounded by the chunk size
+plus the size of the drift report.
+"""
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+from django.db import connections
+from django.db.models import BigIntegerField, Case, F, When
+from django.db.models.functions import Cast, Round
+
+from .archive import ledger_values
+from .constants import ReconcileConstant
+from .models import Account
+
+ROW_DRIFT_COLUMNS = ['account_id', 'drifting_rows', 'first_transaction_id', 'max_drift_cents']
+BALANCE_DRIFT_COLUMNS = ['account_id', 'ledger_balance_cents', 'account_balance_cents', 'drift_cents']
+
+
+def _cents(field):
+    # Rounding in the database keeps REAL-backed decimals (SQLite) from truncating to the cent below.
+    return Cast(Round(F(field) * 100), BigIntegerField())
+
+
+class Reconciliation:
+    """
+    The result of a reconciliation run.
+
+    - rows, accounts: Number of ledger rows and accounts checked.
+    - row_drift: Per account, the rows whose recorded balance differs from the running ledger balance.
+    - balance_drift: Accounts whose balance differs from their final ledger balance.
+    """
+    def __init__(self, rows=0, accounts=0, row_drift=None, balance_drift=None):
+        self.rows = rows
+        self.accounts = accounts
+        self.row_drift = row_drift if row_drift is not None else pd.DataFrame(columns=ROW_DRIFT_COLUMNS)
+        self.balance_drift = (balance_drift if balance_drift is not None
+                              else pd.DataFrame(columns=BALANCE_DRIFT_COLUMNS))
+
+    @property
+    def clean(self):
+        return self.row_drift.empty and self.balance_drift.empty
+
+    @classmethod
+    def combine(cls, results):
+        results = list(results)
+        row_drifts = [result.row_drift for result in results if not result.row_drift.empty]
+        balance_drifts = [result.balance_drift for result in results if not result.balance_drift.empty]
+        return cls(
+            rows=sum(result.rows for result in results),
+            accounts=sum(result.accounts for result in results),
+            row_drift=pd.concat(row_drifts, ignore_index=True) if row_drifts else None,
+            balance_drift=pd.concat(balance_drifts, ignore_index=True) if balance_drifts else None,
+        )
+
+
+def reconcile(account_ids=None, bank_id=None, chunk_size=ReconcileConstant.CHUNK_SIZE):
+    """
+    Reconcile the ledger of the given accounts, of one bank, or of every account.
+    Returns a Reconciliation.
+    """
+    filters = {}
+    if account_ids:
+        filters['account_id__in'] = account_ids
+    if bank_id is not None:
+        filters['account__bank_id'] = bank_id
+    rows = ledger_values(
+        ('account_id', 'id', 'signed_cents', 'after_cents'),
+        chunk_size=chunk_size,
+        annotations={
+            'signed_cents': Case(When(transaction_type='deposit', then=_cents('amount')),
+                                 default=-_cents('amount')),
+            'after_cents': _cents('available_balance_after_transaction'),
+        },
+        **filters,
+    )
+
+    result = Reconciliation()
+    row_drifts = []
+    balance_drifts = []
+    carry = None
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            carry = _reconcile_chunk(chunk, carry, False, result, row_drifts, balance_drifts, bank_id)
+            chunk = []
+    if chunk or carry is not None:
+        _reconcile_chunk(chunk, carry, True, result, row_drifts, balance_drifts, bank_id)
+
+    if row_drifts:
+        # An account split across chunks has one partial entry per chunk.
+        result.row_drift = pd.concat(row_drifts, ignore_index=True).groupby('account_id', as_index=False).agg(
+            drifting_rows=('drifting_rows', 'sum'),
+            first_transaction_id=('first_transaction_id', 'first'),
+            max_drift_cents=('max_drift_cents', 'max'),
+        )[ROW_DRIFT_COLUMNS]
+    if balance_drifts:
+        result.balance_drift = pd.concat(balance_drifts, ignore_index=True)
+    return result
+
+
+def reconcile_banks(bank_ids, workers, chunk_size=ReconcileConstant.CHUNK_SIZE):
+    """
+    Reconcile each bank in its own process, `workers` at a time, and combine the results.
+    """
+    # Forked children must not share the parent's database connections.
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.starmap(_reconcile_bank, [(bank_id, chunk_size) for bank_id in bank_ids])
+    return Reconciliation.combine(results)
+
+
+def _reconcile_bank(bank_id, chunk_size):
+    try:
+        return reconcile(bank_id=bank_id, chunk_size=chunk_size)
+    finally:
+        connections.close_all()
+
+
+def _reconcile_chunk(chunk, carry, last, result, row_drifts, balance_drifts, bank_id):
+    """
+    Check one chunk of (account_id, id, signed_cents, after_cents) rows and return the
+    (account_id, balance_cents) to carry into the next chunk.
+    """
+    if chunk:
+        account, pk, signed, after = np.array(chunk, dtype=np.int64).T
+    else:
+        account = pk = signed = after = np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, account[1:] != account[:-1]]) if len(account) else np.empty(0, dtype=int)
+    lengths = np.diff(np.r_[starts, len(account)])
+
+    opening = after[starts] - signed[starts]
+    if carry is not None and len(account) and account[0] == carry[0]:
+        opening[0] = carry[1]
+    totals = np.cumsum(signed)
+    expected = totals + np.repeat(opening - (totals[starts] - signed[starts]), lengths)
+    drift = after - expected
+
+    result.rows += len(account)
+    drifting = drift != 0
+    if drifting.any():
+        frame = pd.DataFrame({'account_id': account[drifting], 'transaction_id': pk[drifting],
+                              'drift': np.abs(drift[drifting])})
+        row_drifts.append(frame.groupby('account_id', as_index=False, sort=False).agg(
+            drifting_rows=('transaction_id', 'size'),
+            first_transaction_id=('transaction_id', 'first'),
+            max_drift_cents=('drift', 'max'),
+        ))
+
+    final_accounts = account[starts]
+    final_balances = expected[np.r_[starts[1:], len(account)] - 1] if len(account) else expected
+    if carry is not None and (not len(account) or account[0] != carry[0]):
+        # The carried account ended exactly at the previous chunk boundary.
+        final_accounts = np.r_[carry[0], final_accounts]
+        final_balances = np.r_[carry[1], final_balances]
+    next_carry = None
+    if not last and len(final_accounts):
+        next_carry = (final_accounts[-1], final_balances[-1])
+        final_accounts, final_balances = final_accounts[:-1], final_balances[:-1]
+    if len(final_accounts):
+        result.accounts += len(final_accounts)
+        drifted = _balance_drift(final_accounts, final_balances, bank_id)
+        if not drifted.empty:
+            balance_drifts.append(drifted)
+    return next_carry
+
+
+def _balance_drift(account_ids, ledger_balances, bank_id):
+    # Load only the chunk's accounts: with sparse ids, an id range could hold far more accounts than the chunk.
+    records = []
+    for start in range(0, len(account_ids), ReconcileConstant.ACCOUNT_BATCH_SIZE):
+        accounts = Account.objects.filter(
+            pk__in=account_ids[start:start + ReconcileConstant.ACCOUNT_BATCH_SIZE].tolist())
+        if bank_id is not None:
+            accounts = accounts.filter(bank_id=bank_id)
+        records.extend(accounts.annotate(balance_cents=_cents('balance')).values_list('pk', 'balance_cents'))
+    balances = pd.DataFrame.from_records(records, columns=['account_id', 'account_balance_cents'])
+    ledger = pd.DataFrame({'account_id': account_ids, 'ledger_balance_cents': ledger_balances})
+    merged = ledger.merge(balances, on='account_id', how='inner')
+    merged['drift_cents'] = merged['account_balance_cents'] - merged['ledger_balance_cents']
+    return merged.loc[merged['drift_cents'] != 0, BALANCE_DRIFT_COLUMNS]
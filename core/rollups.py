@@ -0,0 +1,114 @@
+"""
+Per-bank and per-user rollups of account counts, balances and ledger volumes.
+
+Every write that changes the totals appends a RollupDelta in its own database transaction: account creation,
+`Account.deposit`/`withdraw`, batches, imports and interest. `compact_rollups` periodically folds the deltas
+into one BankRollup row per bank and one UserRollup row per user and deletes them, `batch_size` deltas per
+database transaction. Reads add the deltas not compacted yet to the compacted rows, so they are always up to
+date and cost O(banks + pending deltas), never a scan of the accounts or the ledger.
+
+Run one compaction at a time. Changes that bypass the ledger methods (deleting accounts, editing balances by
+hand) are not tracked; `compact_rollups --rebuild` recomputes every rollup from the accounts and both ledger
+tiers.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .archive import LEDGER_MODELS
+from .constants import RollupConstant
+from .models import Account, Bank, BankRollup, RollupDelta, RollupTotals, UserRollup
+
+_MEASURES = {name: Sum(name) for name in RollupTotals.MEASURES}
+_LEDGER_TOTALS = {
+    'deposit_total': Sum('amount', filter=Q(transaction_type='deposit')),
+    'deposit_count': Count('id', filter=Q(transaction_type='deposit')),
+    'withdrawal_total': Sum(F('amount') - F('charge'), filter=Q(transaction_type='withdrawal')),
+    'withdrawal_count': Count('id', filter=Q(transaction_type='withdrawal')),
+    'fee_total': Sum('charge', filter=Q(transaction_type='withdrawal')),
+}
+
+
+def compact_rollups(batch_size=RollupConstant.BATCH_SIZE):
+    """
+    Fold every pending RollupDelta into the bank and user rollups. Returns the number of deltas folded.
+    """
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            deltas = list(RollupDelta.objects.order_by('pk')[:batch_size])
+            if not deltas:
+                return compacted
+            _fold(BankRollup, 'bank_id', deltas)
+            _fold(UserRollup, 'user_id', deltas)
+            # Deleting by id rather than by id range keeps deltas committed out of id order for the next run.
+            RollupDelta.objects.filter(pk__in=[delta.pk for delta in deltas]).delete()
+        compacted += len(deltas)
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup from the accounts and the ledger, and drop the pending deltas they include.
+    Returns the number of bank rollups written.
+    """
+    with transaction.atomic():
+        RollupDelta.objects.all().delete()
+        _rebuild(UserRollup, 'user_id')
+        return _rebuild(BankRollup, 'bank_id')
+
+
+def bank_rollups(bank_ids=None):
+    """
+    Return the up-to-date, unsaved BankRollup of every bank (or of the given banks), in bank id order.
+    Banks without accounts have zero totals.
+    """
+    banks = Bank.objects.order_by('pk')
+    if bank_ids is not None:
+        banks = banks.filter(pk__in=bank_ids)
+    return _current(BankRollup, 'bank_id', banks.values_list('pk', flat=True))
+
+
+def user_rollups(user_ids):
+    """
+    Return the up-to-date, unsaved UserRollup of the given users, in user id order.
+    """
+    return _current(UserRollup, 'user_id', sorted(user_ids))
+
+
+def _current(model, key, ids):
+    ids = list(ids)
+    rollups = model.objects.in_bulk(ids)
+    pending = RollupDelta.objects.filter(**{f'{key}__in': ids}).values(key).annotate(**_MEASURES).order_by()
+    current = {pk: model(**{key: pk}) for pk in ids}
+    for pk, rollup in rollups.items():
+        current[pk] = rollup
+    for row in pending:
+        current[row[key]].add(row)
+    return list(current.values())
+
+
+def _rebuild(model, key):
+    model.objects.all().delete()
+    rollups = {}
+    for row in Account.objects.values(key).annotate(accounts=Count('id'), balance=Sum('balance')).order_by():
+        rollups.setdefault(row[key], model(**{key: row[key]})).add(row)
+    for ledger in LEDGER_MODELS:
+        for row in ledger.objects.values(f'account__{key}').annotate(**_LEDGER_TOTALS).order_by():
+            rollup = rollups.setdefault(row[f'account__{key}'], model(**{key: row[f'account__{key}']}))
+            rollup.add(row)
+    model.objects.bulk_create(rollups.values())
+    return len(rollups)
+
+
+def _fold(model, key, deltas):
+    totals = {}
+    for delta in deltas:
+        totals.setdefault(getattr(delta, key), model(**{key: getattr(delta, key)})).add(delta)
+    now = timezone.now()
+    existing = model.objects.select_for_update().in_bulk(list(totals))
+    for pk, rollup in totals.items():
+        if pk in existing:
+            rollup.add(existing[pk])
+        rollup.updated_at = now
+    model.objects.bulk_create(totals.values(), update_conflicts=True, unique_fields=[key.removesuffix('_id')],
+                              update_fields=list(RollupTotals.MEASURES) + ['updated_at'])
@@ -0,0 +1,51 @@
+"""
+Read-replica routing.
+
+Inside a `replica_reads()` block, reads of the core app's models go to the REPLICA_ALIAS database when it
+is configured; everything else, and every write, uses the primary. ReplicaRoutingMiddleware opens the
+block for safe (read-only) requests. A replica lags behind the primary, so reads that must see the latest
+writes (e.g. account cache fills) ask for the primary explicitly.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .constants import DatabaseConstant
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return DatabaseConstant.REPLICA_ALIAS in connections.settings
+
+
+@contextmanager
+def replica_reads():
+    """
+    Route the core app's reads in the block (including in sync_to_async threads) to the replica.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'core' and _replica_reads.get() and replica_configured():
+            return DatabaseConstant.REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance that was read from the replica still writes to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so objects read from either may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary (see the sync_replica command), never migrated itself.
+        return db != DatabaseConstant.REPLICA_ALIAS
@@ -1,11 +1,17 @@
-from rest_framework import serializers
-from .models import Account, Transaction, Bank, User
+import decimal
+from functools import cached_property
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .constants import BatchConstant, TransferConstant
+from .models import Account, MonthlyStatement, Transaction, Bank, User, BankRollup, UserRollup
 
 
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
         fields = '__all__'
+        read_only_fields = ('version', 'opened_on')
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -14,6 +20,24 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class MonthlyStatementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MonthlyStatement
+        exclude = ('id',)
+
+
+class BankRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BankRollup
+        fields = '__all__'
+
+
+class UserRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserRollup
+        fields = '__all__'
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -24,3 +48,154 @@ class BankSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bank
         fields = '__all__'
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    account_id = serializers.IntegerField()
+    transaction_type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPES)
+    amount = serializers.IntegerField(min_value=1)
+
+
+class TransactionBatchSerializer(serializers.Serializer):
+    atomic = serializers.BooleanField(default=False)
+    operations = serializers.ListField(child=BatchOperationSerializer(), allow_empty=False,
+                                       max_length=BatchConstant.MAX_OPERATIONS)
+
+
+class TransferSerializer(serializers.Serializer):
+    destination_id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
+    reference = serializers.CharField(max_length=TransferConstant.MAX_REFERENCE_LENGTH, allow_blank=True, default='')
+
+
+class BatchTransferSerializer(TransferSerializer):
+    source_id = serializers.IntegerField()
+
+
+class TransferBatchSerializer(serializers.Serializer):
+    atomic = serializers.BooleanField(default=False)
+    transfers = serializers.ListField(child=BatchTransferSerializer(), allow_empty=False,
+                                      max_length=BatchConstant.MAX_OPERATIONS)
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path of a ModelSerializer, for rows fetched as tuples with `values_list(*self.columns)`.
+
+    DRF builds each row by looking every field up on a model instance and calling its `to_representation`.
+    Here the serializer's fields are compiled once into one converter per column and applied to plain tuples;
+    `rows` returns exactly what `serializer_class(instances, many=True).data` would. Ids, foreign keys, text,
+    choices and booleans are already in their JSON form and pass through, decimals are quantized with a
+    precompiled context and datetimes are formatted like DRF's ISO 8601 output. Other fields fall back to
+    their own `to_representation`.
+    """
+    PASS_THROUGH = (serializers.IntegerField, serializers.CharField, serializers.ChoiceField,
+                    serializers.BooleanField, serializers.PrimaryKeyRelatedField)
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def columns(self):
+        """
+        The model attribute of each field, in the serializer's field order.
+        """
+        model = self.serializer_class.Meta.model
+        return tuple(model._meta.get_field(field.source).attname for field in self._fields)
+
+    @cached_property
+    def field_names(self):
+        """
+        The name of each field in the representation, in the serializer's field order.
+        """
+        return tuple(field.field_name for field in self._fields)
+
+    @cached_property
+    def _fields(self):
+        fields = list(self.serializer_class().fields.values())
+        for field in fields:
+            plain_key = type(field) is serializers.PrimaryKeyRelatedField and field.pk_field is None
+            if not plain_key and isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField,
+                                                    serializers.BaseSerializer)):
+                raise TypeError(f"{self.serializer_class.__name__}.{field.field_name} is not a column")
+        return fields
+
+    @cached_property
+    def _converters(self):
+        converters = []
+        for index, field in enumerate(self._fields):
+            if type(field) in self.PASS_THROUGH:
+                continue
+            if type(field) is serializers.DecimalField and self._plain_decimal(field):
+                context = decimal.getcontext().copy()
+                if field.max_digits is not None:
+                    context.prec = field.max_digits
+                exponent = decimal.Decimal('.1') ** field.decimal_places
+                converters.append((index, 'decimal', (exponent, field.rounding, context)))
+            elif type(field) is serializers.DateTimeField and \
+                    str(getattr(field, 'format', api_settings.DATETIME_FORMAT)).lower() == ISO_8601:
+                converters.append((index, 'datetime', field))
+            else:
+                converters.append((index, 'field', field))
+        return converters
+
+    @staticmethod
+    def _plain_decimal(field):
+        return (field.decimal_places is not None and not field.localize and
+                getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING))
+
+    def rows(self, tuples):
+        """
+        Return the representation of every row, as a list of dicts in the serializer's field order.
+        """
+        return list(self.iter_rows(tuples))
+
+    def iter_rows(self, tuples):
+        """
+        Yield the representation of every row as `rows` does, one at a time, for streams of any length.
+        """
+        names = self.field_names
+        converters = [(index, self._converter(kind, argument)) for index, kind, argument in self._converters]
+        for values in tuples:
+            values = list(values)
+            for index, convert in converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = convert(value)
+            yield dict(zip(names, values))
+
+    def row(self, instance):
+        """
+        Return the representation of a single model instance.
+        """
+        return self.rows([tuple(getattr(instance, column) for column in self.columns)])[0]
+
+    @staticmethod
+    def _converter(kind, argument):
+        if kind == 'decimal':
+            exponent, rounding, context = argument
+
+            def convert(value):
+                if not isinstance(value, decimal.Decimal):
+                    value = decimal.Decimal(str(value).strip())
+                return '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+            return convert
+        if kind == 'datetime':
+            # DRF looks the current timezone up for every value; it cannot change while a page is serialized.
+            field_timezone = argument.timezone if hasattr(argument, 'timezone') else argument.default_timezone()
+            if field_timezone is None:
+                return argument.to_representation
+
+            def convert(value):
+                if timezone.is_aware(value):
+                    value = value.astimezone(field_timezone)
+                else:
+                    value = timezone.make_aware(value, field_timezone)
+                value = value.isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return convert
+        return argument.to_representation
+
+
+TRANSACTION_ROWS = ValuesSerializer(TransactionSerializer)
+ACCOUNT_ROWS = ValuesSerializer(AccountSerializer)
@@ -0,0 +1,12 @@
+from .cache import account_cache
+from .models import RollupDelta
+
+
+def invalidate_cached_account(sender, instance, **kwargs):
+    # Saves outside the ledger methods (admin, serializers, scripts) do not bump `version`, so drop the entry.
+    account_cache().invalidate(instance.pk)
+
+
+def record_created_account(sender, instance, created, **kwargs):
+    if created:
+        RollupDelta.record_accounts([instance])
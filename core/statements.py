@@ -0,0 +1,101 @@
+"""
+Period close: one MonthlyStatement row per account per month.
+
+Accounts are processed in id order, `batch_size` at a time. Each batch costs one query for the account
+balances, one aggregate per ledger tier over an account id range, and one bulk insert, all in a single
+database transaction. A batch is either fully written or not at all, and accounts that already have a
+statement for the period are skipped, so an interrupted or per-account close is completed by the next run.
+Accounts opened after the month get no statement for it.
+
+Opening and closing balances come from the DailyBalance rows, which every ledger write maintains.
+"""
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .archive import LEDGER_MODELS
+from .constants import StatementConstant
+from .models import Account, DailyBalance, MonthlyStatement
+from .periods import month_bounds_of, next_month_start
+
+_TOTALS = {
+    'deposit_total': Sum('amount', filter=Q(transaction_type='deposit')),
+    'deposit_count': Count('id', filter=Q(transaction_type='deposit')),
+    'withdrawal_total': Sum(F('amount') - F('charge'), filter=Q(transaction_type='withdrawal')),
+    'withdrawal_count': Count('id', filter=Q(transaction_type='withdrawal')),
+    'fee_total': Sum('charge', filter=Q(transaction_type='withdrawal')),
+}
+
+
+def balance_at(day):
+    """
+    Return an expression for an account's balance at the start of `day`: the closing balance of its
+    last daily row before `day`, else the opening balance of its first row after it, else its balance.
+    """
+    money = DecimalField(max_digits=10, decimal_places=2)
+    rows = DailyBalance.objects.filter(account=OuterRef('pk'))
+    return Coalesce(
+        Subquery(rows.filter(date__lt=day).order_by('-date').values('closing_balance')[:1], output_field=money),
+        Subquery(rows.filter(date__gte=day).order_by('date').values('opening_balance')[:1], output_field=money),
+        F('balance'),
+    )
+
+
+def close_period(period, account_ids=None, batch_size=StatementConstant.BATCH_SIZE, rebuild=False):
+    """
+    Write the statements of the month starting on `period` for every account that was open during the month
+    and does not have one yet.
+
+    Parameters:
+    - period: The first day of the month to close.
+    - account_ids: Only close these accounts.
+    - batch_size: Number of accounts closed per database transaction.
+    - rebuild: Delete the month's existing statements first.
+
+    Returns:
+    - The number of statements written.
+    """
+    accounts = Account.objects.order_by('pk')
+    statements = MonthlyStatement.objects.filter(period=period)
+    if account_ids:
+        accounts = accounts.filter(pk__in=account_ids)
+        statements = statements.filter(account_id__in=account_ids)
+    if rebuild:
+        statements.delete()
+
+    accounts = accounts.filter(
+        Q(opened_on__isnull=True) | Q(opened_on__lt=next_month_start(period)),
+    ).exclude(
+        Exists(MonthlyStatement.objects.filter(account=OuterRef('pk'), period=period)),
+    ).annotate(
+        opening=balance_at(period),
+        closing=balance_at(next_month_start(period)),
+    ).values_list('pk', 'opening', 'closing')
+    written = last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(accounts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return written
+            totals = _ledger_totals(period, batch[0][0], batch[-1][0], account_ids)
+            MonthlyStatement.objects.bulk_create([
+                MonthlyStatement(account_id=pk, period=period, opening_balance=opening, closing_balance=closing,
+                                 **totals.get(pk, {}))
+                for pk, opening, closing in batch
+            ], ignore_conflicts=True)
+        written += len(batch)
+        last_pk = batch[-1][0]
+
+
+def _ledger_totals(period, first_pk, last_pk, account_ids):
+    totals = {}
+    for model in LEDGER_MODELS:
+        rows = model.objects.in_range(*month_bounds_of(period)).filter(account_id__gte=first_pk,
+                                                                       account_id__lte=last_pk)
+        if account_ids:
+            rows = rows.filter(account_id__in=account_ids)
+        for row in rows.values('account_id').annotate(**_TOTALS).order_by():
+            account_totals = totals.setdefault(row.pop('account_id'), dict.fromkeys(_TOTALS, 0))
+            for name, value in row.items():
+                account_totals[name] += value or 0
+    return totals
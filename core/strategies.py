@@ -0,0 +1,147 @@
+"""
+Withdrawal and deposit rules per account type.
+
+Strategies are stateless singletons looked up by `account_type` in the registries at the bottom of
+this module. Supporting a new account type only needs an entry there (plus its choice in
+AccountConstants.ACCOUNT_TYPES).
+"""
+from .constants import WithdrawalConstant, StudentAccountWithdrawalConstant, SavingAccountWithdrawalConstant, \
+    DepositConstant, StudentAccountDepositConstant
+
+
+class WithdrawalStrategy:
+    """
+    Abstract base class for withdrawal strategies.
+    Subclasses must implement the `is_allowed` method.
+    Strategies are stateless: one instance per account type is shared through WITHDRAWAL_STRATEGIES.
+    """
+
+    def is_allowed(self, account, amount, context):
+        """
+        Check if a withdrawal is allowed for the given account and amount.
+
+        Parameters:
+        - account: The Account instance for the withdrawal.
+        - amount: The amount to be withdrawn.
+        - context: The RuleContext of the account (monthly counters and average balance).
+
+        Returns:
+        - A tuple containing a boolean value indicating if the withdrawal is allowed,
+          and a reason string if the withdrawal is not allowed.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def calculate_withdrawal_charge(self, account, context):
+        """
+        Return the charge added to an allowed withdrawal. Free unless a subclass says otherwise.
+        """
+        return 0
+
+
+class ZeroBalanceWithdrawal(WithdrawalStrategy, WithdrawalConstant):
+    """
+    Withdrawal strategy for accounts with zero balance.
+    Allows only a limited number of withdrawals per month.
+    """
+    def is_allowed(self, account, amount, context):
+        if context.withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
+            return False, self.FAILURE_REASONS["MONTHLY_WITHDRAWAL_LIMIT_BREACHED"]
+        return True, ''
+
+
+class StudentWithdrawal(WithdrawalStrategy, StudentAccountWithdrawalConstant):
+    """
+    Withdrawal strategy for student accounts.
+    Allows only a limited number of withdrawals per month and enforces a minimum account balance.
+    """
+    def is_allowed(self, account, amount, context):
+        if context.withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
+            return False, self.FAILURE_REASONS["MONTHLY_WITHDRAWAL_LIMIT_BREACHED"]
+        elif account.balance - amount < self.MIN_ACCOUNT_BALANCE:
+            return False, self.FAILURE_REASONS["MIN_ACCOUNT_BALANCE_BREACHED"]
+
+        return True, ''
+
+
+class RegularSavingWithdrawal(WithdrawalStrategy, SavingAccountWithdrawalConstant):
+    """
+    Withdrawal strategy for regular saving accounts.
+    Allows a limited number of free withdrawals per month and enforces a minimum average balance over the last 90 days.
+    """
+    def is_allowed(self, account, amount, context):
+        # Check if the account has a minimum time-weighted average balance of 5000 rupees over the last 90 days
+        if context.average_balance < self.AVERAGE_BALANCE:
+            return False, self.FAILURE_REASONS["MIN_ACCOUNT_BALANCE_BREACHED"]
+
+        return True, ''
+
+    def calculate_withdrawal_charge(self, account, context):
+        if context.withdrawal_count >= self.MONTHLY_WITHDRAWAL_LIMIT:
+            return self.EXTRA_WITHDRAWAL_CHARGE
+        return 0
+
+
+class DepositStrategy:
+    """
+    Abstract base class for deposit strategies.
+    Subclasses must implement the `is_allowed` method.
+    Strategies are stateless: one instance per account type is shared through DEPOSIT_STRATEGIES.
+    """
+
+    def is_allowed(self, account, amount, context):
+        """
+        Check if a deposit is allowed for the given account and amount.
+
+        Parameters:
+        - account: The Account instance for the deposit.
+        - amount: The amount to be deposited.
+        - context: The RuleContext of the account (monthly counters and average balance).
+
+        Returns:
+        - A tuple containing a boolean value indicating if the deposit is allowed,
+          and a reason string if the deposit is not allowed.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+
+class DefaultDeposit(DepositStrategy, DepositConstant):
+    def is_allowed(self, account, amount, context):
+        if amount <= self.DEPOSIT_LIMIT_WITHOUT_KYC:
+            return True, ''
+        elif account.kyc_verified:
+            return True, ''
+        return False, self.FAILURE_REASONS["KYC_LIMIT_BREACHED"]
+
+
+class StudentDeposit(DepositStrategy, StudentAccountDepositConstant):
+    """
+    Deposit strategy for student accounts.
+    Limits the total deposit amount in a month.
+    """
+    def is_allowed(self, account, amount, context):
+        # Check if the total deposit amount in this month exceeds the monthly limit (10,000 rupees)
+        if context.deposit_total + amount > self.MONTHLY_DEPOSIT_LIMIT:
+            return False, self.FAILURE_REASONS["MONTHLY_DEPOSIT_LIMIT_BREACHED"]
+
+        return True, ''
+
+
+WITHDRAWAL_STRATEGIES = {
+    'zero_balance': ZeroBalanceWithdrawal(),
+    'student': StudentWithdrawal(),
+    'regular_saving': RegularSavingWithdrawal(),
+}
+
+DEPOSIT_STRATEGIES = {
+    'student': StudentDeposit(),
+}
+
+DEFAULT_DEPOSIT_STRATEGY = DefaultDeposit()
+
+
+def get_withdrawal_strategy(account_type):
+    return WITHDRAWAL_STRATEGIES[account_type]
+
+
+def get_deposit_strategy(account_type):
+    return DEPOSIT_STRATEGIES.get(account_type, DEFAULT_DEPOSIT_STRATEGY)
@@ -0,0 +1,158 @@
+from decimal import Decimal
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from ..cache import DjangoCacheBackend, LRUBackend, account_cache, cached_account
+from ..models import Account, Bank, User
+
+LOCMEM_ACCOUNT_CACHE = {
+    'BACKEND': 'core.cache.DjangoCacheBackend',
+    'OPTIONS': {'CACHE_ALIAS': 'accounts'},
+}
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'accounts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'accounts-test'},
+}
+
+
+class LRUBackendTestCase(TestCase):
+    def test_evicts_least_recently_used(self):
+        backend = LRUBackend(MAX_ENTRIES=2)
+        backend.add(1, {'version': 0})
+        backend.add(2, {'version': 0})
+        backend.get(1)
+        backend.add(3, {'version': 0})
+        self.assertIsNone(backend.get(2))
+        self.assertIsNotNone(backend.get(1))
+        self.assertEqual(backend.evictions, 1)
+
+    def test_never_replaces_newer_entry(self):
+        backend = LRUBackend()
+        backend.set_if_newer(1, {'version': 2})
+        backend.set_if_newer(1, {'version': 1})
+        backend.add(1, {'version': 0})
+        self.assertEqual(backend.get(1), {'version': 2})
+
+    def test_entries_expire(self):
+        backend = LRUBackend(TIMEOUT=5)
+        with mock.patch('core.cache.time.monotonic', return_value=100):
+            backend.add(1, {'version': 3})
+        with mock.patch('core.cache.time.monotonic', return_value=104.9):
+            self.assertEqual(backend.get(1), {'version': 3})
+        with mock.patch('core.cache.time.monotonic', return_value=105):
+            self.assertIsNone(backend.get(1))
+            # An expired entry is gone, so it no longer keeps any other version out.
+            backend.set_if_newer(1, {'version': 2})
+            self.assertEqual(backend.get(1), {'version': 2})
+
+    def test_only_accepted_for_a_single_process(self):
+        with override_settings(ACCOUNT_CACHE={'BACKEND': 'core.cache.LRUBackend'}):
+            with self.assertRaises(ImproperlyConfigured):
+                account_cache()
+        with override_settings(ACCOUNT_CACHE={'BACKEND': 'core.cache.LRUBackend', 'SINGLE_PROCESS': True}):
+            self.assertIsInstance(account_cache().backend, LRUBackend)
+
+    def test_default_is_shared_between_processes(self):
+        backend = account_cache().backend
+        self.assertIsInstance(backend, DjangoCacheBackend)
+        self.assertNotIn('LocMemCache', type(backend.cache).__name__)
+
+
+class AccountCacheTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            user=self.user,
+            bank=self.bank
+        )
+
+    def _stats_delta(self, before):
+        after = account_cache().stats()
+        return {name: after[name] - before[name] for name in ('hits', 'misses')}
+
+    def test_counts_hits_and_misses(self):
+        before = account_cache().stats()
+        cached_account(self.account.id)
+        with self.assertNumQueries(0):
+            account = cached_account(self.account.id)
+        self.assertEqual(self._stats_delta(before), {'hits': 1, 'misses': 1})
+        self.assertEqual(account.balance, 10000)
+        self.assertEqual(account.bank_id, self.bank.id)
+
+    def test_missing_account_raises(self):
+        with self.assertRaises(Account.DoesNotExist):
+            cached_account(9999)
+
+    def test_deposit_and_withdraw_write_through_on_commit(self):
+        cached_account(self.account.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.account.deposit(5000), (True, ''))
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_account(self.account.id).balance, 15000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.account.withdraw(1000), (True, ''))
+        account = cached_account(self.account.id)
+        self.assertEqual(account.balance, 14000)
+        self.assertEqual(account.version, 2)
+
+    def test_entry_is_dropped_before_commit(self):
+        cached_account(self.account.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.account.deposit(5000)
+        # Until the write commits, readers go to the database.
+        self.assertEqual(cached_account(self.account.id).balance, 15000)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cached_account(self.account.id).version, 1)
+
+    def test_stale_fill_does_not_overwrite_write(self):
+        stale = Account.objects.get(pk=self.account.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.deposit(5000)
+        account_cache().store(stale)
+        self.assertEqual(cached_account(self.account.id).balance, 15000)
+
+    def test_update_kyc_status_writes_through(self):
+        cached_account(self.account.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.update_kyc_status(True)
+        with self.assertNumQueries(0):
+            self.assertTrue(cached_account(self.account.id).kyc_verified)
+        self.account.refresh_from_db()
+        self.assertTrue(self.account.kyc_verified)
+        self.assertEqual(self.account.version, 1)
+
+    def test_save_invalidates(self):
+        cached_account(self.account.id)
+        self.account.balance = Decimal(42)
+        self.account.save()
+        self.assertEqual(cached_account(self.account.id).balance, 42)
+
+    def test_account_detail_view(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.deposit(500)
+        response = self.client.get(reverse('account_detail', kwargs={'account_id': self.account.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['balance'], '10500.00')
+        self.assertEqual(response.data['version'], 1)
+
+        response = self.client.get(reverse('account_detail', kwargs={'account_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(CACHES=LOCMEM_CACHES, ACCOUNT_CACHE=LOCMEM_ACCOUNT_CACHE)
+    def test_django_cache_backend(self):
+        cached_account(self.account.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.account.deposit(5000)
+        before = account_cache().stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_account(self.account.id).balance, 15000)
+        self.assertEqual(self._stats_delta(before), {'hits': 1, 'misses': 0})
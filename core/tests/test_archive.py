@@ -0,0 +1,97 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ..archive import archive_transactions
+from ..cache import account_cache
+from ..models import AccountPeriodCounter, ArchivedTransaction, Account, BalanceCheckpoint, Bank, DailyBalance, \
+    Transaction, User
+
+
+class LedgerArchiveTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            user=self.user,
+            bank=self.bank
+        )
+        self.now = timezone.now()
+        # One deposit a day for ten days, the oldest first.
+        for days_ago in range(9, -1, -1):
+            self.account.deposit(100)
+            Transaction.objects.filter(pk=Transaction.objects.latest('id').pk).update(
+                timestamp=self.now - timedelta(days=days_ago))
+        self.cutoff = self.now - timedelta(days=4, hours=12)
+
+    def history_ids(self, url_name='transaction_history', **params):
+        url = reverse(url_name, kwargs={'account_id': self.account.id})
+        ids = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), int(params.get('page_size', 50)))
+            ids.extend(row['id'] for row in body['results'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_moves_old_rows_and_checkpoints_balance(self):
+        all_ids = list(Transaction.objects.order_by('timestamp').values_list('id', flat=True))
+        self.assertEqual(archive_transactions(self.cutoff, batch_size=2), 5)
+        self.assertEqual(list(ArchivedTransaction.objects.order_by('timestamp').values_list('id', flat=True)),
+                         all_ids[:5])
+        self.assertEqual(list(Transaction.objects.order_by('timestamp').values_list('id', flat=True)), all_ids[5:])
+
+        checkpoint = BalanceCheckpoint.objects.get(account=self.account)
+        self.assertEqual(checkpoint.balance, 10500)
+        self.assertEqual(checkpoint.last_transaction_id, all_ids[4])
+        self.assertEqual(checkpoint.archived_count, 5)
+        self.assertEqual(archive_transactions(self.cutoff), 0)
+
+    def test_history_reads_across_tiers(self):
+        expected = self.history_ids(page_size=3)
+        archive_transactions(self.cutoff)
+        for page_size in (1, 3, 5, 50):
+            self.assertEqual(self.history_ids(page_size=page_size), expected)
+            self.assertEqual(self.history_ids('async_transaction_history', page_size=page_size), expected)
+
+        old = self.history_ids(page_size=2, to=(self.now - timedelta(days=7)).date().isoformat())
+        self.assertEqual(old, expected[-3:])
+
+        for url_name in ('transaction_history', 'async_transaction_history'):
+            response = self.client.get(reverse(url_name, kwargs={'account_id': self.account.id}))
+            self.assertEqual([row['id'] for row in response.json()], expected)
+
+    def test_exports_and_rebuilds_cover_both_tiers(self):
+        url = reverse('export_account_ledger', kwargs={'account_id': self.account.id})
+        before = b''.join(self.client.get(url).streaming_content)
+        counters = list(AccountPeriodCounter.objects.values_list('period', 'deposit_total'))
+        archive_transactions(self.cutoff)
+        self.assertEqual(b''.join(self.client.get(url).streaming_content), before)
+        self.assertEqual(len(before.splitlines()), 10)
+        self.assertEqual(json.loads(before.splitlines()[0])['available_balance_after_transaction'], '10100.00')
+
+        call_command('rebuild_period_counters', stdout=StringIO())
+        self.assertEqual(list(AccountPeriodCounter.objects.values_list('period', 'deposit_total')), counters)
+        call_command('rollover_daily_balances', '--rebuild', stdout=StringIO())
+        self.assertEqual(DailyBalance.objects.count(), 10)
+        self.assertEqual(DailyBalance.objects.order_by('date').first().opening_balance, 10000)
+
+    def test_command(self):
+        out = StringIO()
+        # The horizon is the start of the day five days ago, so the deposit made five days ago stays hot.
+        call_command('archive_transactions', '--days', '5', stdout=out)
+        self.assertIn("Archived 4 transactions", out.getvalue())
+        self.assertEqual(Transaction.objects.count(), 6)
@@ -0,0 +1,86 @@
+import json
+from django.test import TestCase, AsyncClient, Client
+from django.urls import reverse
+from rest_framework import status
+from ..cache import account_cache
+from ..models import Account, Bank, Transaction, User
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.async_client = AsyncClient()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            user=self.user,
+            bank=self.bank
+        )
+
+    async def test_deposit_and_withdraw(self):
+        response = await self.async_client.post(reverse('async_deposit', kwargs={'account_id': self.account.id}),
+                                                {"amount": 5000}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"message": "Deposit successful", "updated_balance": 15000.0})
+
+        response = await self.async_client.post(reverse('async_withdraw', kwargs={'account_id': self.account.id}),
+                                                {"amount": 20000}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['error'], 'Withdrawal failed because Insufficient balance in your account')
+
+        await self.account.arefresh_from_db()
+        self.assertEqual(self.account.balance, 15000)
+
+    async def test_errors(self):
+        response = await self.async_client.post(reverse('async_withdraw', kwargs={'account_id': 9999}),
+                                                {"amount": 10}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"error": "Account not found"})
+
+        response = await self.async_client.post(reverse('async_deposit', kwargs={'account_id': self.account.id}),
+                                                {"amount": 0}, content_type='application/json')
+        self.assertEqual(response.json(), {"error": "Invalid deposit amount"})
+
+        response = await self.async_client.get(reverse('async_deposit', kwargs={'account_id': self.account.id}))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_responses_match_sync_views(self):
+        for name in ('deposit', 'withdraw'):
+            sync_response = self.client.post(reverse(name, kwargs={'account_id': self.account.id}),
+                                             {"amount": 100}, content_type='application/json')
+            async_response = self.client.post(reverse(f'async_{name}', kwargs={'account_id': self.account.id}),
+                                              {"amount": 100}, content_type='application/json')
+            sync_body, async_body = sync_response.json(), async_response.json()
+            self.assertEqual(sync_body['message'], async_body['message'])
+            self.assertEqual(type(sync_body['updated_balance']), type(async_body['updated_balance']))
+
+        for index in range(3):
+            Transaction.objects.create(account=self.account, amount=index + 1, transaction_type='deposit')
+        params = {'page_size': 2}
+        sync_response = self.client.get(reverse('transaction_history', kwargs={'account_id': self.account.id}), params)
+        async_response = self.client.get(reverse('async_transaction_history', kwargs={'account_id': self.account.id}),
+                                         params)
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(sync_response.content), json.loads(async_response.content))
+
+    async def test_update_kyc_status(self):
+        url = reverse('async_update_kyc_status', kwargs={'account_id': self.account.id})
+        response = await self.async_client.patch(url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.async_client.patch(url, {"kyc_verified": True}, content_type='application/json')
+        self.assertEqual(response.json(), {"message": "KYC status updated successfully"})
+        await self.account.arefresh_from_db()
+        self.assertTrue(self.account.kyc_verified)
+
+    async def test_update_kyc_status_refreshes_the_cached_account(self):
+        cache = account_cache()
+        cache.clear()
+        self.assertFalse((await cache.aget(self.account.id)).kyc_verified)
+        await self.account.aupdate_kyc_status(True)
+        self.assertEqual(self.account.version, 1)
+        cached = await cache.aget(self.account.id)
+        self.assertEqual((cached.kyc_verified, cached.version), (True, 1))
@@ -0,0 +1,115 @@
+import json
+from datetime import timedelta
+from django.test import TestCase, Client
+from django.urls import reverse
+from rest_framework import status
+from django.utils import timezone
+from ..batch import apply_operations, post_operations
+from ..models import Account, AccountPeriodCounter, Bank, DailyBalance, Transaction, User
+
+
+class TransactionBatchTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.saving = self.create_account('S1', 'regular_saving', 10000)
+        self.student = self.create_account('S2', 'student', 5000)
+
+    def create_account(self, account_number, account_type, balance):
+        return Account.objects.create(
+            account_number=account_number,
+            account_type=account_type,
+            balance=balance,
+            # Opened long enough ago that the whole 90-day window is averaged.
+            opened_on=timezone.localdate() - timedelta(days=365),
+            user=self.user,
+            bank=self.bank
+        )
+
+    def post_batch(self, operations, atomic=False):
+        return self.client.post(reverse('transaction_batch'), json.dumps({"operations": operations, "atomic": atomic}),
+                                content_type='application/json')
+
+    def test_per_item_results(self):
+        response = self.post_batch([
+            {"account_id": self.saving.id, "transaction_type": "deposit", "amount": 1000},
+            {"account_id": self.student.id, "transaction_type": "deposit", "amount": 20000},
+            {"account_id": self.saving.id, "transaction_type": "withdrawal", "amount": 500},
+            {"account_id": 9999, "transaction_type": "deposit", "amount": 100},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['posted', 'rejected', 'posted', 'rejected'])
+        self.assertEqual(results[1]['reason'], 'Monthly deposit limit is exceeded.')
+        self.assertEqual(results[2]['updated_balance'], 10500)
+        self.assertEqual(results[3]['reason'], 'Account not found')
+        self.assertTrue(response.data['committed'])
+
+        self.saving.refresh_from_db()
+        self.assertEqual(self.saving.balance, 10500)
+        self.assertEqual(
+            list(Transaction.objects.filter(account=self.saving).order_by('id').values_list(
+                'transaction_type', 'available_balance_after_transaction')),
+            [('deposit', 11000), ('withdrawal', 10500)],
+        )
+        counter = AccountPeriodCounter.current(self.saving)
+        self.assertEqual((counter.deposit_total, counter.withdrawal_count), (1000, 1))
+
+    def test_apply_operations_writes_each_table_once(self):
+        operations = [
+            {"account_id": self.saving.id, "transaction_type": "deposit", "amount": 1000},
+            {"account_id": self.student.id, "transaction_type": "withdrawal", "amount": 200},
+            {"account_id": self.saving.id, "transaction_type": "withdrawal", "amount": 500},
+            {"account_id": self.student.id, "transaction_type": "deposit", "amount": 20000},
+            {"account_id": 9999, "transaction_type": "deposit", "amount": 100},
+        ]
+        # The lock with the counters, the daily balances read, then one statement each for balances, ledger,
+        # rollup deltas, counters and daily balances.
+        with self.assertNumQueries(7):
+            results = apply_operations(operations)
+
+        self.assertEqual([result['status'] for result in results],
+                         ['posted', 'posted', 'posted', 'rejected', 'rejected'])
+        self.assertEqual([result['updated_balance'] for result in results[:3]], [11000, 4800, 10500])
+        self.saving.refresh_from_db()
+        self.student.refresh_from_db()
+        self.assertEqual((self.saving.balance, self.saving.version), (10500, 1))
+        self.assertEqual((self.student.balance, self.student.version), (4800, 1))
+        counter = AccountPeriodCounter.current(self.saving)
+        self.assertEqual((counter.deposit_total, counter.withdrawal_count), (1000, 1))
+        today = DailyBalance.objects.get(account=self.student, date=timezone.localdate())
+        self.assertEqual((today.opening_balance, today.closing_balance), (5000, 4800))
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_rules_see_earlier_operations_of_the_batch(self):
+        operations = [{"account_id": self.student.id, "transaction_type": "withdrawal", "amount": 100}] * 5
+        results = post_operations(operations)
+
+        self.assertEqual([result['status'] for result in results], ['posted'] * 4 + ['rejected'])
+        self.assertEqual(results[4]['reason'], 'Monthly withdrawal limit is exceeded.')
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.balance, 4600)
+
+    def test_matches_sequential_posting(self):
+        operations = [{"account_id": self.saving.id, "transaction_type": "withdrawal", "amount": 500}] * 12
+        results = post_operations(operations)
+        self.assertEqual(results[-1]['updated_balance'], 10000 - 12 * 500 - 2 * 5)
+
+    def test_atomic_batch_rolls_back_on_rejection(self):
+        response = self.post_batch([
+            {"account_id": self.saving.id, "transaction_type": "deposit", "amount": 1000},
+            {"account_id": self.student.id, "transaction_type": "withdrawal", "amount": 4500},
+        ], atomic=True)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['committed'])
+        self.assertEqual([result['status'] for result in response.data['results']], ['rolled_back', 'rejected'])
+        self.saving.refresh_from_db()
+        self.assertEqual(self.saving.balance, 10000)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_invalid_payload(self):
+        response = self.post_batch([{"account_id": self.saving.id, "transaction_type": "transfer", "amount": 0}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
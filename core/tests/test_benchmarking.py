@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from ..benchmarking import create_account, find_regressions, measure, percentile, summarize
+from ..cache import account_cache
+from ..constants import BenchmarkConstant
+
+
+class BenchmarkingTestCase(SimpleTestCase):
+    def test_summarize(self):
+        summary = summarize([0.001, 0.002, 0.003, 0.010])
+        self.assertEqual(summary['runs'], 4)
+        self.assertEqual(summary['median_ms'], 2.5)
+        self.assertEqual(summary['p95_ms'], 10.0)
+        self.assertEqual(summary['mean_ms'], 4.0)
+        self.assertEqual(percentile([], 50), 0)
+        self.assertEqual(summarize([])['median_ms'], 0)
+
+    def test_find_regressions(self):
+        baseline = {'fast': {'median_ms': 0.001}, 'slow': {'median_ms': 10.0}, 'gone': {'median_ms': 1.0}}
+        results = {'fast': {'median_ms': 0.002}, 'slow': {'median_ms': 13.0}, 'new': {'median_ms': 5.0}}
+        self.assertEqual(find_regressions(results, baseline, 0.2, min_delta_ms=0.5), [('slow', 10.0, 13.0)])
+        self.assertEqual(find_regressions(results, baseline, 0.5, min_delta_ms=0.5), [])
+        self.assertEqual(len(find_regressions(results, baseline, 0.2)), 2)
+
+    def test_comparing_needs_enough_repeats(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as baseline:
+            json.dump({'meta': {'repeat': BenchmarkConstant.MIN_COMPARE_REPEAT - 1}, 'results': {}}, baseline)
+        for repeat in (BenchmarkConstant.MIN_COMPARE_REPEAT - 1, BenchmarkConstant.MIN_COMPARE_REPEAT):
+            with self.assertRaises(CommandError):
+                call_command('bench_models', '--repeat', str(repeat), '--baseline', path, stdout=StringIO())
+
+
+class SameCodeTestCase(TestCase):
+    def test_same_code_passes_the_default_thresholds(self):
+        account_cache().clear()
+        account = create_account(balance=Decimal('1000000'))
+        benchmarks = {
+            'deposit': (lambda: account.deposit(1), True, 1),
+            'balance': (lambda: account.balance, False, BenchmarkConstant.INNER_LOOP),
+        }
+        runs = [{name: summarize(measure(function, BenchmarkConstant.MIN_COMPARE_REPEAT, rollback, number))
+                 for name, (function, rollback, number) in benchmarks.items()} for _ in range(2)]
+        self.assertEqual(find_regressions(runs[1], runs[0], BenchmarkConstant.REGRESSION_THRESHOLD,
+                                          BenchmarkConstant.REGRESSION_MIN_DELTA_MS), [])
@@ -0,0 +1,80 @@
+from datetime import timedelta
+from unittest import mock
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Account, Bank, Transaction, User
+
+
+class StaleAccountTestCase(TestCase):
+    """
+    Two requests that loaded the same account before either wrote must not overwrite each other.
+    """
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            # Opened long enough ago that the whole 90-day window is averaged.
+            opened_on=timezone.localdate() - timedelta(days=365),
+            user=self.user,
+            bank=self.bank
+        )
+
+    def test_concurrent_deposits_are_not_lost(self):
+        first = Account.objects.get(pk=self.account.pk)
+        second = Account.objects.get(pk=self.account.pk)
+
+        self.assertTrue(first.deposit(1000)[0])
+        self.assertTrue(second.deposit(500)[0])
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 11500)
+        self.assertEqual(second.balance, 11500)
+        self.assertEqual(
+            list(Transaction.objects.order_by('id').values_list('available_balance_after_transaction', flat=True)),
+            [11000, 11500],
+        )
+
+    def test_stale_withdrawal_cannot_overdraw(self):
+        first = Account.objects.get(pk=self.account.pk)
+        second = Account.objects.get(pk=self.account.pk)
+
+        self.assertTrue(first.withdraw(6000)[0])
+        success, reason = second.withdraw(6000)
+
+        self.assertFalse(success)
+        self.assertEqual(reason, 'Insufficient balance in your account')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 4000)
+
+    def test_kyc_update_does_not_overwrite_balance(self):
+        stale = Account.objects.get(pk=self.account.pk)
+        self.account.deposit(1000)
+
+        stale.update_kyc_status(True)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 11000)
+        self.assertTrue(self.account.kyc_verified)
+
+    def test_write_between_lock_and_update_is_retried(self):
+        real_lock = Account._lock_for_update
+        calls = []
+
+        def lock_then_concurrent_write(account):
+            context = real_lock(account)
+            calls.append(1)
+            if len(calls) == 1:
+                # Another writer on a backend where select_for_update() does not lock.
+                Account.objects.filter(pk=account.pk).update(balance=F('balance') + 500, version=F('version') + 1)
+            return context
+
+        with mock.patch.object(Account, '_lock_for_update', lock_then_concurrent_write):
+            self.assertEqual(self.account.deposit(1000), (True, ''))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((self.account.balance, self.account.version), (11500, 2))
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.balance, self.account.version), (11500, 2))
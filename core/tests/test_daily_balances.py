@@ -0,0 +1,108 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Account, Bank, DailyBalance, User
+
+
+class DailyBalanceTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.today = timezone.localdate()
+
+    def create_account(self, account_type, balance):
+        return Account.objects.create(
+            account_number='A123456789',
+            account_type=account_type,
+            balance=balance,
+            opened_on=self.today - timedelta(days=365),
+            user=self.user,
+            bank=self.bank
+        )
+
+    def test_deposit_and_withdraw_record_todays_balance(self):
+        account = self.create_account(account_type='regular_saving', balance=10000)
+        account.deposit(2000)
+        account.withdraw(500)
+
+        row = DailyBalance.objects.get(account=account)
+        self.assertEqual(row.date, self.today)
+        self.assertEqual(row.opening_balance, 10000)
+        self.assertEqual(row.closing_balance, 11500)
+
+    def test_average_without_activity_is_current_balance(self):
+        account = self.create_account(account_type='regular_saving', balance=7000)
+        self.assertEqual(DailyBalance.average_balance(account, 90), 7000)
+
+    def test_average_is_time_weighted(self):
+        account = self.create_account(account_type='regular_saving', balance=10000)
+        DailyBalance.record(account, 10000, 20000, day=self.today - timedelta(days=10))
+
+        # 79 days at 10000 followed by 11 days at 20000
+        expected = Decimal(79 * 10000 + 11 * 20000) / 90
+        self.assertEqual(DailyBalance.average_balance(account, 90, today=self.today), expected)
+
+    def test_average_ignores_days_outside_window(self):
+        account = self.create_account(account_type='regular_saving', balance=0)
+        DailyBalance.record(account, 0, 1000, day=self.today - timedelta(days=200))
+        DailyBalance.record(account, 1000, 9000, day=self.today - timedelta(days=100))
+        DailyBalance.record(account, 9000, 3000, day=self.today - timedelta(days=30))
+
+        expected = Decimal(59 * 9000 + 31 * 3000) / 90
+        self.assertEqual(DailyBalance.average_balance(account, 90, today=self.today), expected)
+
+    def test_low_average_blocks_regular_saving_withdrawal(self):
+        account = self.create_account(account_type='regular_saving', balance=2000)
+        DailyBalance.record(account, 2000, 9000, day=self.today)
+        account.balance = 9000
+        account.save()
+
+        # The balance only rose today, so the 90-day average is far below 5000
+        self.assertFalse(account.withdraw(100)[0])
+
+    def test_newly_opened_account_averages_since_opening(self):
+        account = Account.objects.create(account_number='B1', account_type='regular_saving', balance=0,
+                                         user=self.user, bank=self.bank)
+        self.assertTrue(account.deposit(10000)[0])
+        self.assertEqual(DailyBalance.average_balance(account, 90), 10000)
+        # The deposit was held for every day the account has existed, so the minimum average is met.
+        self.assertTrue(account.withdraw(2000)[0])
+
+        # Without an opening day, the window starts at the first recorded balance.
+        Account.objects.filter(pk=account.pk).update(opened_on=None)
+        account.refresh_from_db()
+        DailyBalance.objects.filter(account=account).update(date=self.today - timedelta(days=9))
+        self.assertEqual(DailyBalance.average_balance(account, 90), 8000)
+
+    def test_rollover_carries_balances_forward(self):
+        account = self.create_account(account_type='regular_saving', balance=5000)
+        idle_account = Account.objects.create(account_number='B1', account_type='student', balance=300,
+                                              user=self.user, bank=self.bank)
+        DailyBalance.record(account, 5000, 6000, day=self.today - timedelta(days=3))
+
+        call_command('rollover_daily_balances', stdout=StringIO())
+
+        row = DailyBalance.objects.get(account=account, date=self.today)
+        self.assertEqual(row.opening_balance, 6000)
+        self.assertEqual(row.cumulative_balance, 3 * 6000)
+        self.assertEqual(DailyBalance.objects.get(account=idle_account, date=self.today).closing_balance, 300)
+
+        call_command('rollover_daily_balances', stdout=StringIO())
+        self.assertEqual(DailyBalance.objects.filter(date=self.today).count(), 2)
+
+    def test_rebuild_matches_incremental_rows(self):
+        account = self.create_account(account_type='regular_saving', balance=10000)
+        account.deposit(2000)
+        account.withdraw(1000)
+        account.deposit(500)
+        expected = list(DailyBalance.objects.values_list('date', 'opening_balance', 'closing_balance',
+                                                         'cumulative_balance'))
+
+        call_command('rollover_daily_balances', rebuild=True, stdout=StringIO())
+
+        rebuilt = list(DailyBalance.objects.values_list('date', 'opening_balance', 'closing_balance',
+                                                        'cumulative_balance'))
+        self.assertEqual(rebuilt, expected)
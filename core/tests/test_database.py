@@ -0,0 +1,100 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from ..backends.sqlite3.base import DatabaseWrapper
+from ..cache import AccountCache, LRUBackend
+from ..constants import DatabaseConstant
+from ..middleware import ReplicaRoutingMiddleware
+from ..models import Account, Bank, User
+from ..routers import ReplicaRouter, replica_reads
+
+
+@contextmanager
+def configured_replica():
+    connections.settings[DatabaseConstant.REPLICA_ALIAS] = dict(connection.settings_dict)
+    try:
+        yield
+    finally:
+        del connections.settings[DatabaseConstant.REPLICA_ALIAS]
+
+
+class SQLiteBackendTestCase(TestCase):
+    def test_production_options_are_applied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=os.path.join(directory, 'db.sqlite3'),
+                                           **settings.SQLITE_PRODUCTION))
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA cache_size')
+                    self.assertEqual(cursor.fetchone()[0], -65536)
+                self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+            finally:
+                wrapper.close()
+
+    def test_rejects_unknown_transaction_mode(self):
+        settings_dict = dict(connection.settings_dict, OPTIONS={'transaction_mode': 'LAZY'})
+        with self.assertRaises(ImproperlyConfigured):
+            DatabaseWrapper(settings_dict).get_connection_params()
+
+
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Account))
+            return HttpResponse(status=400 if request.GET.get('fail') else 200)
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen[0], response
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_write(Account), DEFAULT_DB_ALIAS)
+        self.assertFalse(self.router.allow_migrate(DatabaseConstant.REPLICA_ALIAS, 'core'))
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+        with replica_reads():
+            # Without a replica alias every read stays on the primary.
+            self.assertIsNone(self.router.db_for_read(Account))
+            with configured_replica():
+                self.assertEqual(self.router.db_for_read(Account), DatabaseConstant.REPLICA_ALIAS)
+                self.assertIsNone(self.router.db_for_read(Group))
+        with configured_replica():
+            self.assertIsNone(self.router.db_for_read(Account))
+
+    def test_middleware_routes_safe_requests_and_pins_writers(self):
+        with configured_replica():
+            alias, _ = self.read_alias(self.factory.get('/transaction_history/1/'))
+            self.assertEqual(alias, DatabaseConstant.REPLICA_ALIAS)
+
+            alias, response = self.read_alias(self.factory.post('/deposit/1/'))
+            self.assertIsNone(alias)
+            self.assertEqual(response.cookies[DatabaseConstant.PIN_COOKIE]['max-age'], DatabaseConstant.PIN_SECONDS)
+            _, response = self.read_alias(self.factory.post('/deposit/1/?fail=1'))
+            self.assertNotIn(DatabaseConstant.PIN_COOKIE, response.cookies)
+
+            request = self.factory.get('/transaction_history/1/')
+            request.COOKIES[DatabaseConstant.PIN_COOKIE] = '1'
+            alias, _ = self.read_alias(request)
+            self.assertIsNone(alias)
+
+        alias, response = self.read_alias(self.factory.post('/deposit/1/'))
+        self.assertNotIn(DatabaseConstant.PIN_COOKIE, response.cookies)
+
+    def test_cache_fills_read_the_primary(self):
+        account = Account.objects.create(account_number='A123456789', account_type='student', balance=2000,
+                                          user=User.objects.create(name='Test User', address='Test Address'),
+                                          bank=Bank.objects.create(name='Test Bank'))
+        with configured_replica(), replica_reads(), self.assertNumQueries(1, using=DEFAULT_DB_ALIAS):
+            self.assertEqual(AccountCache(LRUBackend()).get(account.pk).balance, 2000)
@@ -0,0 +1,99 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from operator import itemgetter
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from rest_framework import status
+from ..exports import export_stream, ledger_rows
+from ..models import Account, Bank, User
+
+
+class LedgerExportTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.other_bank = Bank.objects.create(name='Other Bank')
+        self.account = self.create_account('A1', self.bank)
+        self.second_account = self.create_account('A2', self.bank)
+        self.other_account = self.create_account('B1', self.other_bank)
+        self.account.deposit(1000)
+        self.account.withdraw(300)
+        self.second_account.deposit(50)
+        self.other_account.deposit(70)
+
+    def create_account(self, account_number, bank):
+        return Account.objects.create(account_number=account_number, account_type='regular_saving', balance=10000,
+                                      user=self.user, bank=bank)
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_account_ndjson(self):
+        response = self.client.get(reverse('export_account_ledger', kwargs={'account_id': self.account.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        self.assertEqual([(row['transaction_type'], row['amount'], row['available_balance_after_transaction'])
+                          for row in rows], [('deposit', '1000.00', '11000.00'), ('withdrawal', '300.00', '10700.00')])
+        self.assertEqual({row['account'] for row in rows}, {self.account.id})
+
+    def test_bank_csv(self):
+        response = self.client.get(reverse('export_bank_ledger', kwargs={'bank_id': self.bank.id}), {'format': 'csv'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.read(response).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({int(row['account']) for row in rows}, {self.account.id, self.second_account.id})
+
+    def test_rows_match_the_history_api(self):
+        history = self.client.get(reverse('transaction_history', kwargs={'account_id': self.account.id})).json()
+        history.sort(key=itemgetter('id'))
+
+        response = self.client.get(reverse('export_account_ledger', kwargs={'account_id': self.account.id}))
+        self.assertEqual([json.loads(line) for line in self.read(response).decode().splitlines()], history)
+
+        response = self.client.get(reverse('export_account_ledger', kwargs={'account_id': self.account.id}),
+                                   {'format': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(self.read(response).decode())))
+        self.assertEqual(rows, [{name: str(value) for name, value in row.items()} for row in history])
+
+    def test_gzip(self):
+        response = self.client.get(reverse('export_account_ledger', kwargs={'account_id': self.account.id}),
+                                   {'format': 'csv', 'gzip': '1'})
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('ledger-account-%d.csv.gz' % self.account.id, response['Content-Disposition'])
+        lines = gzip.decompress(self.read(response)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_empty_csv_has_header(self):
+        account = self.create_account('A3', self.bank)
+        content = b''.join(export_stream(ledger_rows(account_id=account.id), 'csv')).decode()
+        self.assertEqual(content.strip(), 'id,amount,charge,transaction_type,timestamp,'
+                                          'available_balance_after_transaction,account')
+
+    def test_small_flush_size_streams_many_chunks(self):
+        chunks = list(export_stream(ledger_rows(bank_id=self.bank.id), 'ndjson', flush_bytes=1))
+        self.assertEqual(len(chunks), 3)
+
+    def test_errors(self):
+        response = self.client.get(reverse('export_account_ledger', kwargs={'account_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(reverse('export_bank_ledger', kwargs={'bank_id': self.bank.id}), {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ledger.ndjson.gz')
+            call_command('export_ledger', bank=self.other_bank.id, gzip=True, output=path)
+            with gzip.open(path, 'rt') as export:
+                rows = [json.loads(line) for line in export]
+        self.assertEqual([row['account'] for row in rows], [self.other_account.id])
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ..constants import HistoryConstant
+from ..models import Account, Bank, Transaction, User
+
+
+class TransactionHistoryAPITestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            user=self.user,
+            bank=self.bank
+        )
+        self.url = reverse('transaction_history', kwargs={'account_id': self.account.id})
+        now = timezone.now()
+        self.transactions = []
+        for day in range(7):
+            transaction = Transaction.objects.create(account=self.account, amount=100 + day,
+                                                     transaction_type='deposit' if day % 2 else 'withdrawal',
+                                                     available_balance_after_transaction=10000)
+            self.transactions.append(transaction)
+        # Two rows share a timestamp so that the id tie-breaker is exercised.
+        for index, transaction in enumerate(self.transactions):
+            transaction.timestamp = now - timedelta(days=min(index, 5))
+            Transaction.objects.filter(pk=transaction.pk).update(timestamp=transaction.timestamp)
+
+    def collect_pages(self, **params):
+        ids = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.client.get(self.url, query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(row['id'] for row in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_history_newest_first(self):
+        expected = [transaction.pk for transaction in sorted(
+            self.transactions, key=lambda transaction: (transaction.timestamp, transaction.pk), reverse=True)]
+        self.assertEqual(self.collect_pages(page_size=2), expected)
+        self.assertEqual(self.collect_pages(page_size=50), expected)
+
+    def test_unpaginated_history_is_a_list(self):
+        expected = [transaction.pk for transaction in sorted(
+            self.transactions, key=lambda transaction: (transaction.timestamp, transaction.pk), reverse=True)]
+        response = self.client.get(self.url)
+        self.assertEqual([row['id'] for row in response.data], expected)
+        response = self.client.get(self.url, {'transaction_type': 'deposit'})
+        self.assertEqual(sorted(row['id'] for row in response.data),
+                         [transaction.pk for transaction in self.transactions[1::2]])
+
+    def test_page_size_is_limited(self):
+        response = self.client.get(self.url, {'page_size': HistoryConstant.MAX_PAGE_SIZE + 100})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next_cursor'])
+
+        response = self.client.get(self.url, {'page_size': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_transaction_type_filter(self):
+        ids = self.collect_pages(page_size=2, transaction_type='deposit')
+        self.assertEqual(sorted(ids), [transaction.pk for transaction in self.transactions[1::2]])
+
+    def test_date_range_filter(self):
+        today = timezone.localdate()
+        ids = self.collect_pages(page_size=2, **{'from': (today - timedelta(days=2)).isoformat(),
+                                                 'to': today.isoformat()})
+        self.assertEqual(ids, [transaction.pk for transaction in self.transactions[:3]])
+
+        response = self.client.get(self.url, {'from': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Invalid cursor')
+
+    def test_unknown_account(self):
+        response = self.client.get(reverse('transaction_history', kwargs={'account_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
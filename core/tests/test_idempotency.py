@@ -0,0 +1,111 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ..cache import account_cache
+from ..idempotency import clear_front_cache, record, request_fingerprint
+from ..models import Account, Bank, IdempotencyKey, Transaction, User
+
+
+class IdempotencyKeyTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        clear_front_cache()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(
+            account_number='A123456789',
+            account_type='regular_saving',
+            balance=10000,
+            user=self.user,
+            bank=self.bank
+        )
+        self.deposit_url = reverse('deposit', kwargs={'account_id': self.account.id})
+        self.withdraw_url = reverse('withdraw', kwargs={'account_id': self.account.id})
+
+    def _post(self, url, amount, key):
+        return self.client.post(url, {"amount": amount}, content_type='application/json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_returns_stored_response_without_posting(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._post(self.deposit_url, 5000, 'key-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with mock.patch.object(Account, 'deposit') as deposit, self.assertNumQueries(0):
+            retry = self._post(self.deposit_url, 5000, 'key-1')
+        deposit.assert_not_called()
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 15000)
+
+    def test_retry_after_restart_reads_table(self):
+        self._post(self.withdraw_url, 500, 'key-2')
+        clear_front_cache()
+        with mock.patch.object(Account, 'withdraw') as withdraw:
+            retry = self._post(self.withdraw_url, 500, 'key-2')
+        withdraw.assert_not_called()
+        self.assertEqual(retry.json(), {"message": "Withdrawal successful", "updated_balance": 9500.0})
+
+    def test_rejected_request_is_replayed(self):
+        first = self._post(self.withdraw_url, 20000, 'key-3')
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.account.deposit(20000)
+        retry = self._post(self.withdraw_url, 20000, 'key-3')
+        self.assertEqual(retry.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.json(), first.json())
+
+    def test_key_reused_for_different_request(self):
+        self._post(self.deposit_url, 5000, 'key-4')
+        response = self._post(self.deposit_url, 6000, 'key-4')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = self._post(self.withdraw_url, 5000, 'key-4')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_invalid_key(self):
+        response = self._post(self.deposit_url, 5000, 'k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_expired_key_is_reused(self):
+        self._post(self.deposit_url, 5000, 'key-5')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self._post(self.deposit_url, 5000, 'key-5')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_concurrent_duplicate_rolls_back_write(self):
+        fingerprint = request_fingerprint('deposit', self.account.id, 5000)
+        IdempotencyKey.objects.create(key='key-6', fingerprint=fingerprint, status_code=200,
+                                      response_body={"message": "Deposit successful"},
+                                      expires_at=timezone.now() + timedelta(hours=1))
+        # The first request committed between our lookup and our insert.
+        with mock.patch.object(IdempotencyKey.objects, 'create', side_effect=IntegrityError):
+            stored = record('key-6', fingerprint, lambda: (200, {"posted": self.account.deposit(5000)}))
+        self.assertEqual(stored, (200, {"message": "Deposit successful"}))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 10000)
+
+    def test_async_views_share_keys(self):
+        self._post(self.deposit_url, 5000, 'key-7')
+        response = self._post(reverse('async_deposit', kwargs={'account_id': self.account.id}), 5000, 'key-7')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 1)
+
+    def test_purge_command(self):
+        self._post(self.deposit_url, 100, 'key-8')
+        self._post(self.deposit_url, 100, 'key-9')
+        IdempotencyKey.objects.filter(key='key-8').update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', '--batch-size', '1', stdout=out)
+        self.assertIn("Purged 1 expired idempotency keys.", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['key-9'])
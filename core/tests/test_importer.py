@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from ..cache import account_cache
+from ..importer import ImportValidationError, import_accounts, import_transactions
+from ..models import Account, AccountPeriodCounter, Bank, DailyBalance, ImportCheckpoint, Transaction, User
+from ..reconcile import reconcile
+
+ACCOUNT_HEADER = 'account_number,account_type,opening_balance,kyc_verified,customer_id,customer_name,customer_address'
+
+
+class LedgerImportTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        self.bank = Bank.objects.create(name='Test Bank', location='Test Location')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as output:
+            output.write('\n'.join(lines) + '\n')
+        return path
+
+    def import_file(self, kind, path, *args):
+        out = StringIO()
+        call_command('import_ledger', kind, path, *args, stdout=out)
+        return out.getvalue()
+
+    def create_accounts(self):
+        path = self.write('accounts.csv', [
+            ACCOUNT_HEADER,
+            'L-1,regular_saving,1000.00,true,C1,Alice,1 Main St',
+            'L-2,student,0,false,C2,Bob,2 Main St',
+            'L-3,zero_balance,50.50,,C1,Alice,1 Main St',
+        ])
+        self.import_file('accounts', path, '--bank', str(self.bank.pk))
+
+    def test_imports_accounts_with_shared_customers(self):
+        self.create_accounts()
+        self.assertEqual(User.objects.count(), 2)
+        first, second, third = Account.objects.order_by('account_number')
+        self.assertEqual(first.user_id, third.user_id)
+        self.assertEqual((first.balance, first.kyc_verified), (Decimal('1000.00'), True))
+        self.assertEqual((third.balance, third.kyc_verified), (Decimal('50.50'), False))
+        self.assertEqual(second.bank, self.bank)
+        self.assertEqual(first.opened_on, timezone.localdate())
+
+    def test_imports_opening_days(self):
+        record = {'account_number': 'L-1', 'account_type': 'regular_saving', 'opening_balance': '10',
+                  'opened_on': '2020-02-29', 'customer_id': 'C1', 'customer_name': 'Alice',
+                  'customer_address': '1 Main St'}
+        import_accounts([record], self.bank, 'opened')
+        self.assertEqual(str(Account.objects.get().opened_on), '2020-02-29')
+        with self.assertRaisesMessage(ImportValidationError, 'Record 1: Invalid opened_on 2020-02-30.'):
+            import_accounts([dict(record, account_number='L-2', opened_on='2020-02-30')], self.bank, 'invalid')
+
+    def test_account_import_resumes_after_a_bad_record(self):
+        lines = [ACCOUNT_HEADER,
+                 'L-1,regular_saving,10,true,C1,Alice,1 Main St',
+                 'L-2,student,10,true,C2,Bob,2 Main St',
+                 'L-3,checking,10,true,C3,Carol,3 Main St',
+                 'L-4,student,10,true,C1,Alice,1 Main St']
+        path = self.write('accounts.csv', lines)
+        with self.assertRaisesMessage(CommandError, 'Record 3: Unknown account type checking.'):
+            self.import_file('accounts', path, '--bank', str(self.bank.pk), '--batch-size', '2', '--job', 'onboard')
+        self.assertEqual(Account.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name='onboard').records, 2)
+
+        lines[3] = 'L-3,zero_balance,10,true,C3,Carol,3 Main St'
+        path = self.write('accounts.csv', lines)
+        output = self.import_file('accounts', path, '--bank', str(self.bank.pk), '--batch-size', '2',
+                                  '--job', 'onboard')
+        self.assertIn('Imported 2 accounts', output)
+        self.assertEqual(Account.objects.count(), 4)
+        # The customer of the first run's batch is still shared with the account imported on resume.
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(Account.objects.get(account_number='L-4').user_id,
+                         Account.objects.get(account_number='L-1').user_id)
+
+    def test_account_import_resumes_with_padded_fields(self):
+        records = [{'account_number': f' L-{number} ', 'account_type': 'student', 'opening_balance': '10',
+                    'customer_id': ' C1 ', 'customer_name': 'Alice', 'customer_address': '1 Main St'}
+                   for number in range(1, 4)]
+        records[1]['account_type'] = 'checking'
+        with self.assertRaises(ImportValidationError):
+            import_accounts(records, self.bank, 'padded', batch_size=1)
+        self.assertEqual(ImportCheckpoint.objects.get(name='padded').records, 1)
+
+        records[1]['account_type'] = 'student'
+        self.assertEqual(import_accounts(records, self.bank, 'padded', batch_size=1), 2)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(set(Account.objects.values_list('account_number', flat=True)), {'L-1', 'L-2', 'L-3'})
+
+    def test_rejects_existing_account_numbers(self):
+        self.create_accounts()
+        with self.assertRaises(ImportValidationError):
+            import_accounts([{'account_number': 'L-1', 'account_type': 'student', 'opening_balance': '0',
+                              'customer_id': 'C9', 'customer_name': 'Dan', 'customer_address': '9 Main St'}],
+                            self.bank, 'again')
+
+    def test_imports_transactions_with_derived_balances(self):
+        self.create_accounts()
+        start = timezone.now() - timedelta(days=70)
+        records = [
+            {'account_number': 'L-1', 'transaction_type': 'deposit', 'amount': 200.25,
+             'timestamp': start.isoformat()},
+            {'account_number': 'L-2', 'transaction_type': 'deposit', 'amount': 30, 'timestamp': start.isoformat()},
+            {'account_number': 'L-1', 'transaction_type': 'withdrawal', 'amount': 100, 'charge': 5,
+             'timestamp': (start + timedelta(days=1)).isoformat()},
+            {'account_number': 'L-1', 'transaction_type': 'deposit', 'amount': 10,
+             'timestamp': (start + timedelta(days=40)).isoformat()},
+            {'account_number': 'L-2', 'transaction_type': 'withdrawal', 'amount': 12.5,
+             'timestamp': (start + timedelta(days=40, hours=1)).isoformat()},
+        ]
+        path = self.write('transactions.ndjson', [json.dumps(record) for record in records])
+        output = self.import_file('transactions', path, '--batch-size', '2')
+        self.assertIn('Imported 5 transactions', output)
+
+        first = Account.objects.get(account_number='L-1')
+        self.assertEqual(first.balance, Decimal('1110.25'))
+        self.assertEqual(first.version, 2)
+        # The first imported transaction is older than the import, so the account was opened by then.
+        self.assertEqual(first.opened_on, timezone.localdate(start))
+        self.assertEqual(Account.objects.get(account_number='L-2').balance, Decimal('17.50'))
+        ledger = list(Transaction.objects.filter(account=first).order_by('id').values_list(
+            'timestamp', 'charge', 'available_balance_after_transaction'))
+        self.assertEqual([row[2] for row in ledger], [Decimal('1200.25'), Decimal('1100.25'), Decimal('1110.25')])
+        self.assertEqual(ledger[0][0], datetime.fromisoformat(records[0]['timestamp']))
+        self.assertEqual(ledger[1][1], Decimal('5'))
+        self.assertTrue(reconcile().clean)
+
+        # The counters and daily balances maintained by the import match a rebuild from the ledger.
+        imported_counters = set(AccountPeriodCounter.objects.values_list(
+            'account_id', 'period', 'withdrawal_count', 'deposit_total'))
+        imported_dailies = set(DailyBalance.objects.values_list(
+            'account_id', 'date', 'opening_balance', 'closing_balance', 'cumulative_balance'))
+        call_command('rebuild_period_counters', stdout=StringIO())
+        call_command('rollover_daily_balances', '--rebuild', stdout=StringIO())
+        self.assertEqual(imported_counters, set(AccountPeriodCounter.objects.values_list(
+            'account_id', 'period', 'withdrawal_count', 'deposit_total')))
+        self.assertEqual(imported_dailies, set(DailyBalance.objects.values_list(
+            'account_id', 'date', 'opening_balance', 'closing_balance', 'cumulative_balance')))
+
+        # Rerunning the finished job imports nothing.
+        self.assertIn('Imported 0 transactions', self.import_file('transactions', path))
+
+    def test_rejects_out_of_order_and_overdrawing_transactions(self):
+        self.create_accounts()
+        now = timezone.now()
+        import_transactions([{'account_number': 'L-2', 'transaction_type': 'deposit', 'amount': '5',
+                              'timestamp': (now - timedelta(days=1)).isoformat()}], 'first')
+        with self.assertRaisesMessage(ImportValidationError, 'must be chronological'):
+            import_transactions([{'account_number': 'L-2', 'transaction_type': 'deposit', 'amount': '5',
+                                  'timestamp': (now - timedelta(days=2)).isoformat()}], 'second')
+        with self.assertRaisesMessage(ImportValidationError, 'would be overdrawn'):
+            import_transactions([{'account_number': 'L-2', 'transaction_type': 'withdrawal', 'amount': '6',
+                                  'timestamp': now.isoformat()}], 'third')
+        with self.assertRaisesMessage(ImportValidationError, 'Unknown account L-9'):
+            import_transactions([{'account_number': 'L-9', 'transaction_type': 'deposit', 'amount': '1',
+                                  'timestamp': now.isoformat()}], 'fourth')
+        self.assertEqual(Account.objects.get(account_number='L-2').balance, Decimal('5'))
+
+    def test_replaces_rollover_rows_of_accounts_without_history(self):
+        self.create_accounts()
+        call_command('rollover_daily_balances', stdout=StringIO())
+        day = timezone.localdate() - timedelta(days=3)
+        import_transactions([{'account_number': 'L-2', 'transaction_type': 'deposit', 'amount': '5',
+                              'timestamp': timezone.make_aware(datetime.combine(day, datetime.min.time()))
+                             .isoformat()}], 'late')
+        account = Account.objects.get(account_number='L-2')
+        self.assertEqual(list(DailyBalance.objects.filter(account=account).values_list('date', 'closing_balance')),
+                         [(day, Decimal('5'))])
@@ -0,0 +1,144 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from ..cache import account_cache
+from ..interest import accrue_banks, accrue_interest, balance_days, interest_cents
+from ..models import Account, AccountPeriodCounter, Bank, DailyBalance, InterestAccrual, Transaction, User
+from ..periods import month_start
+from .test_reconcile import InlinePool
+
+# 3.65% a year is exactly 0.01% a day.
+RATE = Decimal('0.0365')
+PERIOD = date(2025, 1, 1)
+
+
+class BalanceDaysTestCase(SimpleTestCase):
+    def test_sums_end_of_day_balances(self):
+        account_ids = np.array([1, 2, 3], dtype=np.int64)
+        opening_cents = np.array([100, 200, 300], dtype=np.int64)
+        rows = [
+            (1, date(2025, 1, 3).toordinal(), 100, 150),
+            (1, date(2025, 1, 10).toordinal(), 150, 50),
+            (3, date(2025, 1, 1).toordinal(), 300, 400),
+        ]
+        totals = balance_days(account_ids, opening_cents, rows, PERIOD, date(2025, 2, 1))
+        self.assertEqual(totals.tolist(), [2 * 100 + 7 * 150 + 22 * 50, 31 * 200, 31 * 400])
+
+    def test_days_before_the_opening_count_as_zero(self):
+        account_ids = np.array([1, 2, 3], dtype=np.int64)
+        opening_cents = np.array([100, 200, 300], dtype=np.int64)
+        rows = [(1, date(2025, 1, 10).toordinal(), 100, 50)]
+        opened_days = np.array([date(2025, 1, 5).toordinal(), date(2025, 1, 22).toordinal(),
+                                date(2025, 3, 1).toordinal()], dtype=np.int64)
+        totals = balance_days(account_ids, opening_cents, rows, PERIOD, date(2025, 2, 1), opened_days)
+        self.assertEqual(totals.tolist(), [5 * 100 + 22 * 50, 10 * 200, 0])
+
+    def test_interest_rounds_half_up(self):
+        self.assertEqual(interest_cents(np.array([4999, 5000, 10000], dtype=np.int64), Decimal('0.0365')).tolist(),
+                         [0, 1, 1])
+
+    def test_precise_rate_on_a_large_balance_does_not_overflow(self):
+        # The largest balance for 31 days, times the rate's numerator, does not fit in an int64.
+        sums = np.array([9999999999 * 31, 10000], dtype=np.int64)
+        self.assertEqual(interest_cents(sums, Decimal('0.035123457')).tolist(), [29830881, 1])
+
+
+class InterestAccrualTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        user = User.objects.create(name='Test User', address='Test Address')
+        self.banks = [Bank.objects.create(name='First Bank'), Bank.objects.create(name='Second Bank')]
+        opened_on = date(2024, 12, 1)
+        self.account = Account.objects.create(account_number='A1', account_type='regular_saving', balance=20000,
+                                              user=user, bank=self.banks[0], opened_on=opened_on)
+        self.idle = Account.objects.create(account_number='A2', account_type='regular_saving', balance=7300,
+                                           user=user, bank=self.banks[1], opened_on=opened_on)
+        self.student = Account.objects.create(account_number='A3', account_type='student', balance=5000,
+                                              user=user, bank=self.banks[0], opened_on=opened_on)
+        DailyBalance.objects.create(account=self.account, date=date(2024, 12, 20), opening_balance=5000,
+                                    closing_balance=10000, cumulative_balance=0)
+        DailyBalance.objects.create(account=self.account, date=date(2025, 1, 10), opening_balance=10000,
+                                    closing_balance=20000, cumulative_balance=210000)
+
+    def test_accrues_and_posts_interest(self):
+        result = accrue_interest(PERIOD, annual_rate=RATE)
+        self.assertEqual((result.accounts, result.credited, result.interest), (2, 2, Decimal('75.63')))
+
+        # 9 days at 10000 and 22 days at 20000; 31 days at 7300.
+        accrual = InterestAccrual.objects.get(account=self.account, period=PERIOD)
+        self.assertEqual((accrual.balance_days, accrual.amount), (530000, Decimal('53.00')))
+        self.assertEqual(InterestAccrual.objects.get(account=self.idle).amount, Decimal('22.63'))
+        self.assertFalse(InterestAccrual.objects.filter(account=self.student).exists())
+
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.balance, self.account.version), (Decimal('20053.00'), 1))
+        self.assertEqual(account_cache().get(self.account.pk).balance, Decimal('20053.00'))
+        credit = Transaction.objects.get(account=self.account)
+        self.assertEqual((credit.transaction_type, credit.amount, credit.available_balance_after_transaction),
+                         ('deposit', 53, Decimal('20053.00')))
+
+        today = DailyBalance.objects.get(account=self.account, date=timezone.localdate())
+        self.assertEqual((today.opening_balance, today.closing_balance), (20000, Decimal('20053.00')))
+        self.assertEqual(today.cumulative_balance,
+                         DailyBalance.objects.get(account=self.account, date=date(2025, 1, 10)).cumulative_at(
+                             timezone.localdate()))
+        self.assertEqual(DailyBalance.objects.get(account=self.idle).opening_balance, 7300)
+        self.assertEqual(AccountPeriodCounter.current(self.account).deposit_total, Decimal('53.00'))
+
+    def test_accounts_earn_nothing_before_they_were_opened(self):
+        Account.objects.filter(pk=self.idle.pk).update(opened_on=date(2025, 1, 22))
+        new = Account.objects.create(account_number='A4', account_type='regular_saving', balance=10000,
+                                     user=self.idle.user, bank=self.banks[1])
+        self.assertEqual(new.opened_on, timezone.localdate())
+
+        result = accrue_interest(PERIOD, annual_rate=RATE)
+        self.assertEqual(result.accounts, 2)
+        # 10 days at 7300.
+        self.assertEqual(InterestAccrual.objects.get(account=self.idle).amount, Decimal('7.30'))
+        self.assertFalse(InterestAccrual.objects.filter(account=new).exists())
+        new.refresh_from_db()
+        self.assertEqual(new.balance, 10000)
+
+    def test_reruns_credit_each_account_once(self):
+        real_bulk_create = InterestAccrual.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('interrupted')
+            return real_bulk_create(*args, **kwargs)
+
+        with mock.patch.object(InterestAccrual.objects, 'bulk_create', side_effect=failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                accrue_interest(PERIOD, annual_rate=RATE, chunk_size=1)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+        self.assertEqual(accrue_interest(PERIOD, annual_rate=RATE).accounts, 1)
+        self.assertEqual(accrue_interest(PERIOD, annual_rate=RATE).accounts, 0)
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.idle.refresh_from_db()
+        self.assertEqual(self.idle.balance, Decimal('7322.63'))
+
+    def test_per_bank_partitions(self):
+        with mock.patch('core.interest.multiprocessing.get_context') as get_context:
+            get_context.return_value.Pool = InlinePool
+            result = accrue_banks(PERIOD, [bank.pk for bank in self.banks], workers=2, annual_rate=RATE)
+        self.assertEqual((result.accounts, result.interest), (2, Decimal('75.63')))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('accrue_interest', '--month', '2025-01', '--rate', '0.0365', '--bank', str(self.banks[1].pk),
+                     stdout=out)
+        self.assertIn("posted 22.63 of interest to 1 accounts", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('accrue_interest', '--month', f"{month_start():%Y-%m}", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('accrue_interest', '--month', '2025-01', '--rate', '0.035123457', stdout=StringIO())
+        with self.assertRaises(ValueError):
+            accrue_interest(PERIOD, annual_rate=Decimal('0.035123457'))
@@ -0,0 +1,88 @@
+import threading
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from ..cache import account_cache
+from ..journal import LedgerJournal, ledger_journal
+from ..models import Account, Bank, Transaction, User
+
+
+@override_settings(LEDGER_JOURNAL={'ENABLED': True, 'MAX_BATCH': 3, 'MAX_DELAY_MS': 200})
+class LedgerJournalTestCase(TransactionTestCase):
+    """
+    The journal commits from its own thread, so these tests cannot run inside a test transaction.
+    """
+    def setUp(self):
+        account_cache().clear()
+        user = User.objects.create(name='Test User', address='Test Address')
+        bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(account_number='A123456789', account_type='zero_balance',
+                                              balance=100, kyc_verified=True, user=user, bank=bank)
+        self.other = Account.objects.create(account_number='B123456789', account_type='zero_balance',
+                                            balance=100, kyc_verified=True, user=user, bank=bank)
+
+    def tearDown(self):
+        ledger_journal().close()
+        ledger_journal.cache_clear()
+
+    def test_group_commit_preserves_each_accounts_order(self):
+        journal = ledger_journal()
+        futures = [
+            journal.submit(self.account.pk, 'deposit', 100),
+            journal.submit(self.other.pk, 'withdrawal', 500),
+            # Only allowed because the deposit before it is applied first.
+            journal.submit(self.account.pk, 'withdrawal', 150),
+            journal.submit(self.other.pk, 'deposit', 50),
+        ]
+        results = [future.result() for future in futures]
+
+        self.assertEqual([result['status'] for result in results], ['posted', 'rejected', 'posted', 'posted'])
+        self.assertEqual([result['updated_balance'] for result in results], [200, None, 50, 150])
+        self.assertEqual((journal.batches, journal.operations), (2, 4))
+        self.assertEqual(
+            list(Transaction.objects.filter(account=self.account).order_by('id').values_list(
+                'available_balance_after_transaction', flat=True)), [200, 50])
+
+    def test_deposit_and_withdraw_wait_for_the_commit(self):
+        accounts = [Account.objects.get(pk=self.account.pk) for _ in range(6)]
+        outcomes = []
+
+        def deposit(account):
+            outcomes.append(account.deposit(10))
+
+        threads = [threading.Thread(target=deposit, args=(account,)) for account in accounts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes, [(True, '')] * 6)
+        self.assertEqual(sorted(account.balance for account in accounts), list(range(110, 170, 10)))
+        self.assertLess(ledger_journal().batches, 6)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, 160)
+        self.assertEqual(account_cache().get(self.account.pk).balance, 160)
+
+        self.assertEqual(self.account.withdraw(1000)[0], False)
+        self.assertEqual(Transaction.objects.count(), 6)
+
+    def test_writes_inside_a_transaction_bypass_the_journal(self):
+        with transaction.atomic():
+            self.assertEqual(self.account.deposit(10), (True, ''))
+        self.assertEqual(ledger_journal().operations, 0)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).balance, 110)
+
+    def test_failed_batch_is_retried_one_operation_at_a_time(self):
+        def post(operations):
+            if any(operation['amount'] < 0 for operation in operations):
+                raise ValueError("negative amount")
+            return [{'status': 'posted'} for _ in operations]
+
+        journal = LedgerJournal(post, MAX_BATCH=3, MAX_DELAY_MS=200)
+        futures = [journal.submit(1, 'deposit', 10), journal.submit(1, 'deposit', -1),
+                   journal.submit(2, 'deposit', 5)]
+        try:
+            self.assertEqual(futures[0].result(), {'status': 'posted'})
+            self.assertIsInstance(futures[1].exception(), ValueError)
+            self.assertEqual(futures[2].result(), {'status': 'posted'})
+            self.assertEqual(journal.batches, 2)
+        finally:
+            journal.close()
@@ -0,0 +1,35 @@
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+from ..management.commands.load_test import Command, failure_reason, parse_mix
+
+
+class LoadTestTestCase(SimpleTestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('deposit=3, history=1'), {'deposit': 3.0, 'history': 1.0})
+        with self.assertRaises(CommandError):
+            parse_mix('transfer=1')
+        with self.assertRaises(CommandError):
+            parse_mix('deposit=x')
+        with self.assertRaises(CommandError):
+            parse_mix('deposit=0')
+
+    def test_failure_reason(self):
+        self.assertEqual(failure_reason(500, None, 'OperationalError: database is locked'),
+                         'OperationalError: database is locked')
+        self.assertEqual(failure_reason(400, {'error': 'Insufficient balance'}, None), 'Insufficient balance')
+        self.assertEqual(failure_reason(400, {'amount': ['required'], 'account': ['invalid']}, None),
+                         'invalid account, amount')
+        self.assertEqual(failure_reason(502, None, None), 'HTTP 502')
+
+    def test_summarize(self):
+        samples = [('deposit', 0.0005, 200, None), ('deposit', 0.003, 200, None),
+                   ('deposit', 2.0, 500, 'OperationalError'), ('history', 0.015, 200, None)]
+        report = Command().summarize(samples, 2.0, {'workers': 2, 'accounts': 5, 'zipf': 1.1})
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['rps'], 2.0)
+        deposit = report['endpoints']['deposit']
+        self.assertEqual(deposit['statuses'], {'200': 2, '500': 1})
+        self.assertEqual(deposit['failures'], {'OperationalError': 1})
+        self.assertEqual(deposit['histogram'], [1, 0, 1, 0, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(deposit['p50_ms'], 3.0)
+        self.assertEqual(report['endpoints']['history']['histogram'][4], 1)
@@ -0,0 +1,109 @@
+import gc
+import threading
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..cache import account_cache
+from ..metrics import REGISTRY, Counter, Histogram, Registry, query_stats
+from ..models import Account, Bank, User
+
+
+class RegistryTestCase(TestCase):
+    def test_exposition(self):
+        registry = Registry()
+        latency = Histogram(registry, 'test_duration_seconds', "Test latency.", ('view',), buckets=(0.1, 1))
+        requests = Counter(registry, 'test_requests_total', "Test requests.", ('view',))
+        latency.observe(('a"b',), 0.05)
+        latency.observe(('a"b',), 0.1)
+        latency.observe(('a"b',), 3)
+        requests.inc(('home',))
+        requests.inc(('home',), 2)
+
+        self.assertEqual(registry.exposition().splitlines(), [
+            '# HELP test_duration_seconds Test latency.',
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{view="a\\"b",le="0.1"} 2',
+            'test_duration_seconds_bucket{view="a\\"b",le="1.0"} 2',
+            'test_duration_seconds_bucket{view="a\\"b",le="+Inf"} 3',
+            'test_duration_seconds_sum{view="a\\"b"} 3.15',
+            'test_duration_seconds_count{view="a\\"b"} 3',
+            '# HELP test_requests_total Test requests.',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{view="home"} 3',
+        ])
+
+    def test_threads_record_into_their_own_shards(self):
+        registry = Registry()
+        requests = Counter(registry, 'test_requests_total', "Test requests.", ('view',))
+
+        def work():
+            for _ in range(1000):
+                requests.inc(('home',))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(registry._shards), 4)
+        self.assertEqual(registry.collect()['test_requests_total'], {('home',): [4000]})
+
+    def test_shards_of_finished_threads_are_retired(self):
+        registry = Registry()
+        requests = Counter(registry, 'test_requests_total', "Test requests.", ('view',))
+        for _ in range(200):
+            thread = threading.Thread(target=requests.inc, args=(('home',),))
+            thread.start()
+            thread.join()
+        del thread
+        gc.collect()
+
+        self.assertEqual(registry.collect()['test_requests_total'], {('home',): [200]})
+        self.assertEqual(registry._shards, {})
+        requests.inc(('home',))
+        self.assertEqual(registry.collect()['test_requests_total'], {('home',): [201]})
+
+    def test_nested_query_stats_count_each_query_once(self):
+        with query_stats() as outer:
+            Bank.objects.count()
+            with query_stats() as inner:
+                Bank.objects.count()
+                User.objects.count()
+        self.assertEqual((outer.queries, inner.queries), (3, 2))
+        self.assertGreater(outer.seconds, 0)
+
+
+class MetricsEndpointTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        REGISTRY.clear()
+        user = User.objects.create(name='Test User', address='Test Address')
+        bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(account_number='A123456789', account_type='student', balance=2000,
+                                              user=user, bank=bank)
+
+    def test_records_requests_operations_and_rule_checks(self):
+        response = self.client.post(reverse('deposit', kwargs={'account_id': self.account.id}), {'amount': 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.account.withdraw(5000)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('banking_http_request_duration_seconds_count{view="deposit",method="POST",status="200"} 1',
+                      lines)
+        self.assertIn('banking_account_operation_duration_seconds_count'
+                      '{operation="deposit",account_type="student",outcome="allowed"} 1', lines)
+        self.assertIn('banking_account_operation_duration_seconds_count'
+                      '{operation="withdrawal",account_type="student",outcome="denied"} 1', lines)
+        self.assertIn('banking_rule_check_duration_seconds_count'
+                      '{strategy="StudentDeposit",account_type="student",outcome="allowed"} 1', lines)
+        self.assertIn('banking_rule_check_duration_seconds_count'
+                      '{strategy="StudentWithdrawal",account_type="student",outcome="denied"} 1', lines)
+
+        collected = REGISTRY.collect()
+        request_queries = collected['banking_http_request_db_queries_total'][('deposit',)][0]
+        operation_queries = collected['banking_account_operation_db_queries_total'][('deposit', 'student')][0]
+        self.assertGreater(operation_queries, 0)
+        self.assertGreaterEqual(request_queries, operation_queries)
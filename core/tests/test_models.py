@@ -1,4 +1,6 @@
+from datetime import timedelta
 from django.test import TestCase
+from django.utils import timezone
 from ..models import Account, Transaction, User, Bank
 
 
@@ -13,6 +15,8 @@ class AccountModelTestCase(TestCase):
             account_number='A123456789',
             account_type='regular_saving',
             balance=10000,
+            # Opened long enough ago that the whole 90-day window is averaged.
+            opened_on=timezone.localdate() - timedelta(days=365),
             user=self.user,
             bank=self.bank
         )
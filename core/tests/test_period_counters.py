@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Account, AccountPeriodCounter, Bank, Transaction, User
+
+
+class AccountPeriodCounterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+
+    def create_account(self, account_type, balance):
+        return Account.objects.create(
+            account_number='A123456789',
+            account_type=account_type,
+            balance=balance,
+            user=self.user,
+            bank=self.bank
+        )
+
+    def test_deposit_and_withdraw_update_counters(self):
+        account = self.create_account(account_type='regular_saving', balance=10000)
+        account.deposit(2000)
+        account.deposit(500)
+        account.withdraw(1000)
+
+        counter = AccountPeriodCounter.current(account)
+        self.assertEqual(counter.deposit_total, 2500)
+        self.assertEqual(counter.withdrawal_count, 1)
+        self.assertEqual(AccountPeriodCounter.objects.filter(account=account).count(), 1)
+
+    def test_rejected_operations_do_not_update_counters(self):
+        account = self.create_account(account_type='student', balance=5000)
+        self.assertFalse(account.deposit(20000)[0])
+        self.assertFalse(account.withdraw(4500)[0])
+
+        counter = AccountPeriodCounter.current(account)
+        self.assertIsNone(counter.pk)
+        self.assertEqual(counter.deposit_total, 0)
+        self.assertEqual(counter.withdrawal_count, 0)
+
+    def test_rules_read_counters(self):
+        account = self.create_account(account_type='zero_balance', balance=1000)
+        AccountPeriodCounter.objects.create(account=account, period=AccountPeriodCounter.period_for(),
+                                            withdrawal_count=4)
+        self.assertFalse(account.withdraw(100)[0])
+
+    def test_rebuild_command(self):
+        account = self.create_account(account_type='regular_saving', balance=10000)
+        account.deposit(3000)
+        account.withdraw(1000)
+        account.withdraw(1000)
+        old = Transaction.objects.create(account=account, amount=700, transaction_type='deposit',
+                                         available_balance_after_transaction=account.balance)
+        Transaction.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=62))
+        AccountPeriodCounter.objects.all().update(withdrawal_count=0, deposit_total=0)
+
+        call_command('rebuild_period_counters', stdout=StringIO())
+
+        counter = AccountPeriodCounter.current(account)
+        self.assertEqual(counter.deposit_total, 3000)
+        self.assertEqual(counter.withdrawal_count, 2)
+        self.assertEqual(AccountPeriodCounter.objects.filter(account=account).count(), 2)
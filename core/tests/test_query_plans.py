@@ -0,0 +1,72 @@
+import unittest
+from datetime import date, datetime, timedelta
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from ..models import Account, Bank, Transaction, User
+from ..pagination import after_cursor
+from ..periods import month_bounds, month_bounds_of, next_month_start
+
+
+class PeriodTestCase(TestCase):
+    def test_month_bounds_are_half_open_and_aware(self):
+        start, end = month_bounds(timezone.make_aware(datetime(2023, 12, 15, 10, 30)))
+        self.assertTrue(timezone.is_aware(start))
+        self.assertEqual((start.date(), end.date()), (date(2023, 12, 1), date(2024, 1, 1)))
+
+    def test_next_month_start(self):
+        self.assertEqual(next_month_start(date(2024, 1, 31)), date(2024, 2, 1))
+        self.assertEqual(next_month_start(date(2024, 2, 1)), date(2024, 3, 1))
+
+    def test_in_range_respects_year(self):
+        user = User.objects.create(name='Test User', address='Test Address')
+        bank = Bank.objects.create(name='Test Bank')
+        account = Account.objects.create(account_number='A1', account_type='zero_balance', balance=0,
+                                         user=user, bank=bank)
+        this_month = Transaction.objects.create(account=account, amount=10, transaction_type='deposit')
+        last_year = Transaction.objects.create(account=account, amount=10, transaction_type='deposit')
+        Transaction.objects.filter(pk=last_year.pk).update(timestamp=this_month.timestamp - timedelta(days=365))
+
+        in_month = Transaction.objects.in_range(*month_bounds_of(this_month.timestamp.date().replace(day=1)))
+        self.assertEqual(list(in_month.filter(account=account)), [this_month])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Query plan assertions are written against SQLite's EXPLAIN.")
+class LedgerQueryPlanTestCase(TestCase):
+    """
+    Guards against regressing to full table scans on the ledger queries.
+    """
+    def setUp(self):
+        user = User.objects.create(name='Test User', address='Test Address')
+        bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(account_number='A1', account_type='regular_saving', balance=0,
+                                              user=user, bank=bank)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('SCAN core_transaction', plan)
+        return plan
+
+    def test_period_query_uses_composite_index(self):
+        queryset = Transaction.objects.filter(
+            account=self.account, transaction_type='withdrawal',
+        ).in_range(*month_bounds())
+        self.assertUsesIndex(queryset, 'txn_account_type_ts_idx')
+
+    def test_history_query_is_ordered_by_index(self):
+        queryset = Transaction.objects.filter(account=self.account).order_by('-timestamp', '-id')
+        plan = self.assertUsesIndex(queryset, 'txn_account_ts_idx')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_history_range_query_uses_index(self):
+        queryset = Transaction.objects.filter(account=self.account).in_range(
+            *month_bounds()).order_by('-timestamp', '-id')
+        plan = self.assertUsesIndex(queryset, 'txn_account_')
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_keyset_page_seeks_index(self):
+        queryset = after_cursor(Transaction.objects.filter(account=self.account).order_by('-timestamp', '-id'),
+                                (timezone.now(), 100))[:51]
+        plan = self.assertUsesIndex(queryset, 'txn_account_ts_idx (account_id=? AND timestamp<?)')
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,98 @@
+import itertools
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from ..archive import archive_transactions
+from ..models import Account, Bank, Transaction, User
+from ..reconcile import reconcile, reconcile_banks
+
+
+class InlinePool:
+    def __init__(self, processes):
+        self.processes = processes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def starmap(self, function, arguments):
+        return list(itertools.starmap(function, arguments))
+
+
+class ReconcileTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.banks = [Bank.objects.create(name=f'Bank {index}') for index in range(2)]
+        self.accounts = []
+        for index in range(4):
+            account = Account.objects.create(account_number=f'A{index}', account_type='regular_saving',
+                                             balance=10000 + index, user=self.user,
+                                             bank=self.banks[index % 2])
+            for amount in (250, 100, 75):
+                account.deposit(amount)
+            account.withdraw(120)
+            self.accounts.append(account)
+
+    def test_clean_ledger(self):
+        for chunk_size in (1, 3, 5, 1000):
+            result = reconcile(chunk_size=chunk_size)
+            self.assertTrue(result.clean)
+            self.assertEqual(result.rows, 16)
+            self.assertEqual(result.accounts, 4)
+
+    def test_reports_row_and_balance_drift(self):
+        broken = self.accounts[1]
+        rows = list(Transaction.objects.filter(account=broken).order_by('id'))
+        # A lost update: the second deposit's row and every later balance are short by 1.50.
+        for row in rows[1:]:
+            Transaction.objects.filter(pk=row.pk).update(
+                available_balance_after_transaction=row.available_balance_after_transaction - Decimal('1.50'))
+        Account.objects.filter(pk=self.accounts[2].pk).update(balance=1)
+
+        for chunk_size in (2, 3, 1000):
+            result = reconcile(chunk_size=chunk_size)
+            self.assertFalse(result.clean)
+            self.assertEqual(result.row_drift.to_dict('records'), [
+                {'account_id': broken.pk, 'drifting_rows': 3, 'first_transaction_id': rows[1].pk,
+                 'max_drift_cents': 150},
+            ])
+            self.assertEqual(result.balance_drift.to_dict('records'), [
+                {'account_id': self.accounts[2].pk, 'ledger_balance_cents': 1030700,
+                 'account_balance_cents': 100, 'drift_cents': -1030600},
+            ])
+
+    def test_covers_archived_rows(self):
+        Transaction.objects.update(timestamp=timezone.now() - timedelta(days=10))
+        archive_transactions(timezone.now() - timedelta(days=5))
+        self.accounts[0].deposit(5)
+        Account.objects.filter(pk=self.accounts[0].pk).update(balance=5)
+        result = reconcile(chunk_size=4)
+        self.assertEqual(result.rows, 17)
+        self.assertEqual(list(result.balance_drift['account_id']), [self.accounts[0].pk])
+
+    def test_per_bank_partitions(self):
+        Account.objects.filter(pk=self.accounts[3].pk).update(balance=1)
+        with mock.patch('core.reconcile.multiprocessing.get_context') as get_context:
+            get_context.return_value.Pool = InlinePool
+            result = reconcile_banks([bank.pk for bank in self.banks], workers=2, chunk_size=2)
+        self.assertEqual(result.rows, 16)
+        self.assertEqual(result.accounts, 4)
+        self.assertEqual(list(result.balance_drift['account_id']), [self.accounts[3].pk])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('reconcile', '--chunk-size', '5', stdout=out)
+        self.assertIn("Checked 16 ledger rows of 4 accounts", out.getvalue())
+        self.assertIn("No drift found.", out.getvalue())
+
+        Account.objects.filter(pk=self.accounts[0].pk).update(balance=1)
+        out = StringIO()
+        call_command('reconcile', '--bank', str(self.banks[0].pk), stdout=out)
+        self.assertIn("Checked 8 ledger rows of 2 accounts", out.getvalue())
+        self.assertIn("Accounts whose balance drifts from the ledger: 1 accounts", out.getvalue())
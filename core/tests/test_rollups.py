@@ -0,0 +1,100 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from ..batch import post_operations
+from ..models import Account, Bank, BankRollup, RollupDelta, RollupTotals, User
+from ..rollups import bank_rollups, compact_rollups, rebuild_rollups, user_rollups
+
+
+def totals(rollup):
+    return {name: getattr(rollup, name) for name in RollupTotals.MEASURES}
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        self.banks = [Bank.objects.create(name='First Bank'), Bank.objects.create(name='Second Bank'),
+                      Bank.objects.create(name='Empty Bank')]
+        self.users = [User.objects.create(name='First User', address='Address'),
+                      User.objects.create(name='Second User', address='Address')]
+        self.accounts = [
+            Account.objects.create(account_number='A1', account_type='zero_balance', balance=1000,
+                                   user=self.users[0], bank=self.banks[0]),
+            Account.objects.create(account_number='A2', account_type='zero_balance', balance=500,
+                                   user=self.users[1], bank=self.banks[0]),
+            Account.objects.create(account_number='A3', account_type='regular_saving', balance=10000,
+                                   kyc_verified=True, user=self.users[0], bank=self.banks[1]),
+        ]
+        self.accounts[0].deposit(200)
+        self.accounts[0].withdraw(100)
+        self.accounts[1].withdraw(5000)
+        post_operations([
+            {'account_id': self.accounts[1].pk, 'transaction_type': 'deposit', 'amount': 50},
+            {'account_id': self.accounts[2].pk, 'transaction_type': 'withdrawal', 'amount': 1000},
+        ])
+
+    def assert_totals(self, rollup, **expected):
+        self.assertEqual(totals(rollup), dict(dict.fromkeys(RollupTotals.MEASURES, 0), **expected))
+
+    def assert_current(self):
+        first, second, empty = bank_rollups()
+        self.assert_totals(first, accounts=2, balance=Decimal('1650'), deposit_total=250, deposit_count=2,
+                           withdrawal_total=100, withdrawal_count=1)
+        self.assert_totals(second, accounts=1, balance=Decimal('9000'), withdrawal_total=1000, withdrawal_count=1)
+        self.assert_totals(empty)
+        first_user, second_user = user_rollups([user.pk for user in self.users])
+        self.assert_totals(first_user, accounts=2, balance=Decimal('10100'), deposit_total=200, deposit_count=1,
+                           withdrawal_total=1100, withdrawal_count=2)
+        self.assert_totals(second_user, accounts=1, balance=Decimal('550'), deposit_total=50, deposit_count=1)
+
+    def test_reads_include_pending_deltas(self):
+        self.assertFalse(BankRollup.objects.exists())
+        self.assert_current()
+
+    def test_compaction_folds_deltas(self):
+        self.assertEqual(compact_rollups(batch_size=2), 7)
+        self.assertFalse(RollupDelta.objects.exists())
+        self.assert_current()
+
+        self.accounts[2].deposit(1)
+        self.assertEqual(bank_rollups([self.banks[1].pk])[0].balance, Decimal('9001'))
+        self.assertEqual(compact_rollups(), 1)
+        self.assertEqual(BankRollup.objects.get(pk=self.banks[1].pk).balance, Decimal('9001'))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        compact_rollups()
+        incremental = [totals(rollup) for rollup in bank_rollups()]
+        self.assertEqual(rebuild_rollups(), 2)
+        self.assertEqual([totals(rollup) for rollup in bank_rollups()], incremental)
+
+        out = StringIO()
+        call_command('compact_rollups', '--rebuild', stdout=out)
+        self.assertIn("Rebuilt the rollups of 2 banks", out.getvalue())
+
+    def test_endpoints(self):
+        response = self.client.get(reverse('bank_rollup_list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['bank'], row['accounts']) for row in response.data],
+                         [(self.banks[0].pk, 2), (self.banks[1].pk, 1), (self.banks[2].pk, 0)])
+
+        response = self.client.get(reverse('bank_rollup', kwargs={'bank_id': self.banks[1].pk}))
+        self.assertEqual((response.data['balance'], response.data['withdrawal_count']), ('9000.00', 1))
+        response = self.client.get(reverse('user_rollup', kwargs={'user_id': self.users[1].pk}))
+        self.assertEqual((response.data['balance'], response.data['deposit_total']), ('550.00', '50.00'))
+
+        self.assertEqual(self.client.get(reverse('bank_rollup', kwargs={'bank_id': 999})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('user_rollup', kwargs={'user_id': 999})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+    def test_list_cost_does_not_grow_with_the_ledger(self):
+        compact_rollups()
+        with self.assertNumQueries(3):
+            self.client.get(reverse('bank_rollup_list'))
+        for _ in range(20):
+            self.accounts[0].deposit(1)
+        compact_rollups()
+        with self.assertNumQueries(3):
+            self.client.get(reverse('bank_rollup_list'))
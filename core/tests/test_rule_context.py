@@ -0,0 +1,61 @@
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ..models import Account, AccountPeriodCounter, Bank, DailyBalance, RuleContext, User
+
+
+class RuleContextTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+
+    def create_account(self, account_number, account_type, balance):
+        return Account.objects.create(
+            account_number=account_number,
+            account_type=account_type,
+            balance=balance,
+            user=self.user,
+            bank=self.bank
+        )
+
+    def load(self, account):
+        # The account with its counter row, then its daily balance rows.
+        with self.assertNumQueries(2):
+            return RuleContext.load(RuleContext.annotate(Account.objects.filter(pk=account.pk)))[account.pk]
+
+    def test_context_without_history(self):
+        context = self.load(self.create_account('A1', 'regular_saving', 7000))
+        self.assertEqual((context.withdrawal_count, context.deposit_total, context.average_balance), (0, 0, 7000))
+
+    def test_context_matches_counters_and_daily_balances(self):
+        account = self.create_account('A1', 'regular_saving', 10000)
+        today = timezone.localdate()
+        DailyBalance.record(account, 10000, 4000, day=today - timedelta(days=120))
+        DailyBalance.record(account, 4000, 9000, day=today - timedelta(days=20))
+        AccountPeriodCounter.add(account, withdrawal_count=3, deposit_total=1500)
+
+        context = self.load(account)
+        self.assertEqual(context.withdrawal_count, 3)
+        self.assertEqual(context.deposit_total, 1500)
+        self.assertEqual(context.average_balance, DailyBalance.average_balance(account, 90))
+
+    def test_context_extrapolates_before_first_row(self):
+        account = self.create_account('A1', 'regular_saving', 10000)
+        DailyBalance.record(account, 10000, 20000, day=timezone.localdate() - timedelta(days=10))
+        self.assertEqual(self.load(account).average_balance, DailyBalance.average_balance(account, 90))
+
+    def test_query_count_does_not_depend_on_account_type(self):
+        query_counts = set()
+        for account_type in ('zero_balance', 'student', 'regular_saving'):
+            account = self.create_account(account_type, account_type, 9000)
+            # The first write of the month/day creates the counter and daily balance rows.
+            account.deposit(100)
+            for operation in (account.deposit, account.withdraw):
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertTrue(operation(100)[0])
+                query_counts.add(len(queries))
+        self.assertEqual(len(query_counts), 1)
+        # The 9th query appends the rollup delta.
+        self.assertLessEqual(query_counts.pop(), 9)
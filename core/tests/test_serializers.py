@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from ..models import Account, ArchivedTransaction, Bank, Transaction, User
+from ..pagination import history_page
+from ..serializers import ACCOUNT_ROWS, TRANSACTION_ROWS, AccountSerializer, TransactionSerializer
+
+
+class ValuesSerializerTestCase(TestCase):
+    """
+    The fast path must produce exactly what the DRF serializers produce.
+    """
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.account = Account.objects.create(account_number='A123456789', account_type='regular_saving',
+                                              balance=Decimal('12345678.90'), user=self.user, bank=self.bank)
+        moment = datetime(2025, 3, 30, 23, 59, 59, 123456, tzinfo=dt_timezone.utc)
+        for index, amount in enumerate([Decimal('0'), Decimal('0.5'), Decimal('99999999.99'), Decimal('100')]):
+            Transaction.objects.create(account=self.account, amount=amount, charge=index,
+                                       transaction_type='deposit' if index % 2 else 'withdrawal',
+                                       timestamp=moment - timedelta(days=index, microseconds=index * 123456),
+                                       available_balance_after_transaction=amount)
+        ArchivedTransaction.objects.create(id=10 ** 6, account=self.account, amount=5, transaction_type='deposit',
+                                           timestamp=datetime(2020, 1, 1, tzinfo=dt_timezone.utc))
+
+    def assert_same_rows(self):
+        for model in (Transaction, ArchivedTransaction):
+            rows = model.objects.order_by('id')
+            self.assertEqual(TRANSACTION_ROWS.rows(rows.values_list(*TRANSACTION_ROWS.columns)),
+                             TransactionSerializer(rows, many=True).data)
+
+    def test_transactions_match(self):
+        self.assert_same_rows()
+
+    def test_transactions_match_in_another_timezone(self):
+        with timezone.override('Asia/Kolkata'):
+            self.assert_same_rows()
+        with self.settings(USE_TZ=False):
+            self.assert_same_rows()
+
+    def test_accounts_match(self):
+        self.assertEqual(ACCOUNT_ROWS.row(self.account), AccountSerializer(self.account).data)
+        unsaved = Account(account_number='B1', account_type='student', balance=1000, user=self.user, bank=self.bank)
+        self.assertEqual(ACCOUNT_ROWS.row(unsaved), AccountSerializer(unsaved).data)
+
+    def test_responses_match(self):
+        response = self.client.get(reverse('transaction_history', kwargs={'account_id': self.account.pk}),
+                                   {'page_size': 3})
+        rows, next_cursor = history_page(self.account, {'page_size': 3})
+        expected = {"results": TransactionSerializer(rows, many=True).data, "next_cursor": next_cursor}
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+        response = self.client.get(reverse('transaction_history', kwargs={'account_id': self.account.pk}))
+        rows = list(Transaction.objects.order_by('-timestamp', '-id')) + list(ArchivedTransaction.objects.all())
+        self.assertEqual(response.content, JSONRenderer().render(TransactionSerializer(rows, many=True).data))
+
+        response = self.client.get(reverse('account_detail', kwargs={'account_id': self.account.pk}))
+        self.assertEqual(response.content, JSONRenderer().render(AccountSerializer(self.account).data))
+
+    def test_pages_of_tuples_match_pages_of_instances(self):
+        params = {'page_size': 2}
+        while True:
+            rows, cursor = history_page(self.account, params)
+            tuples, tuple_cursor = history_page(self.account, params, TRANSACTION_ROWS.columns)
+            self.assertEqual([row[0] for row in tuples], [row.pk for row in rows])
+            self.assertEqual(tuple_cursor, cursor)
+            if cursor is None:
+                break
+            params = dict(params, cursor=cursor)
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ..archive import archive_transactions
+from ..models import Account, Bank, MonthlyStatement, Transaction, User
+from ..periods import day_start, month_start
+from ..statements import close_period
+
+
+class MonthlyStatementTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.period = (month_start() - timedelta(days=1)).replace(day=1)
+        before = self.period - timedelta(days=3)
+        self.account = Account.objects.create(account_number='A1', account_type='regular_saving', balance=11245,
+                                              user=self.user, bank=self.bank, opened_on=before)
+        self.idle = Account.objects.create(account_number='A2', account_type='student', balance=700,
+                                           user=self.user, bank=self.bank, opened_on=before)
+        after = month_start()
+        for day, transaction_type, amount, charge, balance_after in [
+            (before, 'deposit', 1000, 0, 11000),
+            (self.period, 'deposit', 500, 0, 11500),
+            (self.period + timedelta(days=1), 'withdrawal', 205, 5, 11295),
+            (self.period + timedelta(days=2), 'withdrawal', 100, 0, 11195),
+            (after, 'deposit', 50, 0, 11245),
+        ]:
+            row = Transaction.objects.create(account=self.account, transaction_type=transaction_type, amount=amount,
+                                             charge=charge, available_balance_after_transaction=balance_after)
+            Transaction.objects.filter(pk=row.pk).update(timestamp=day_start(day) + timedelta(hours=12))
+        call_command('rollover_daily_balances', '--rebuild', stdout=StringIO())
+
+    def assert_statement(self, statement, **expected):
+        for name, value in expected.items():
+            self.assertEqual(getattr(statement, name), value, name)
+
+    def test_close_period(self):
+        self.assertEqual(close_period(self.period), 2)
+        self.assert_statement(MonthlyStatement.objects.get(account=self.account, period=self.period),
+                              opening_balance=11000, closing_balance=11195, deposit_total=500, deposit_count=1,
+                              withdrawal_total=300, withdrawal_count=2, fee_total=5)
+        self.assert_statement(MonthlyStatement.objects.get(account=self.idle, period=self.period),
+                              opening_balance=700, closing_balance=700, deposit_total=0, withdrawal_count=0)
+
+    def test_skips_accounts_opened_after_the_period(self):
+        new = Account.objects.create(account_number='A3', account_type='regular_saving', balance=300,
+                                     user=self.user, bank=self.bank)
+        self.assertEqual(new.opened_on, timezone.localdate())
+        Account.objects.filter(pk=self.idle.pk).update(opened_on=self.period + timedelta(days=10))
+        legacy = Account.objects.create(account_number='A4', account_type='regular_saving', balance=400,
+                                        user=self.user, bank=self.bank, opened_on=None)
+
+        self.assertEqual(close_period(self.period), 3)
+        self.assertEqual(set(MonthlyStatement.objects.values_list('account_id', flat=True)),
+                         {self.account.pk, self.idle.pk, legacy.pk})
+        self.assertEqual(close_period(self.period, account_ids=[new.pk]), 0)
+
+    def test_covers_archived_transactions(self):
+        archive_transactions(day_start(self.period + timedelta(days=2)))
+        close_period(self.period)
+        self.assert_statement(MonthlyStatement.objects.get(account=self.account, period=self.period),
+                              deposit_total=500, withdrawal_total=300, withdrawal_count=2, fee_total=5)
+
+    def test_resumes_after_interruption(self):
+        real_bulk_create = MonthlyStatement.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('interrupted')
+            return real_bulk_create(*args, **kwargs)
+
+        with mock.patch.object(MonthlyStatement.objects, 'bulk_create', side_effect=failing_bulk_create):
+            with self.assertRaises(RuntimeError):
+                close_period(self.period, batch_size=1)
+        self.assertEqual(list(MonthlyStatement.objects.values_list('account_id', flat=True)), [self.account.pk])
+
+        self.assertEqual(close_period(self.period, batch_size=1), 1)
+        self.assertEqual(close_period(self.period), 0)
+        self.assertEqual(close_period(self.period, rebuild=True), 2)
+        self.assertEqual(MonthlyStatement.objects.count(), 2)
+
+    def test_full_close_after_closing_one_account(self):
+        self.assertEqual(close_period(self.period, account_ids=[self.idle.pk]), 1)
+        self.assertEqual(close_period(self.period, batch_size=1), 1)
+        self.assertEqual(set(MonthlyStatement.objects.values_list('account_id', flat=True)),
+                         {self.account.pk, self.idle.pk})
+
+    def test_statement_endpoint(self):
+        close_period(self.period)
+        url = reverse('monthly_statements', kwargs={'account_id': self.account.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(url, {'month': f'{self.period:%Y-%m}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['closing_balance'], '11195.00')
+        self.assertEqual(Decimal(response.data['fee_total']), 5)
+
+        response = self.client.get(url, {'month': f'{month_start():%Y-%m}'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {'month': 'May'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('monthly_statements', kwargs={'account_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('close_period', stdout=out)
+        self.assertIn(f"Closed {self.period:%Y-%m}: wrote 2 statements.", out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('close_period', '--month', f'{month_start():%Y-%m}', stdout=StringIO())
+
+    def test_withdrawal_charge_is_recorded(self):
+        account = Account.objects.create(account_number='A3', account_type='regular_saving', balance=100000,
+                                         kyc_verified=True, user=self.user, bank=self.bank)
+        for _ in range(11):
+            account.withdraw(10)
+        charges = list(Transaction.objects.filter(account=account).order_by('id').values_list('amount', 'charge'))
+        self.assertEqual(charges[-1], (15, 5))
+        self.assertEqual(charges[0], (10, 0))
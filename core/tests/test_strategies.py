@@ -0,0 +1,37 @@
+from unittest import mock
+from django.db import models
+from django.test import TestCase
+from .. import strategies
+from ..models import Account, Bank, User
+from ..strategies import DEFAULT_DEPOSIT_STRATEGY, WithdrawalStrategy, get_deposit_strategy, get_withdrawal_strategy
+
+
+class StrategyRegistryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+
+    def test_strategies_are_shared_plain_objects(self):
+        strategy = get_withdrawal_strategy('student')
+        self.assertIs(strategy, get_withdrawal_strategy('student'))
+        self.assertNotIsInstance(strategy, models.Model)
+        self.assertIs(get_deposit_strategy('regular_saving'), DEFAULT_DEPOSIT_STRATEGY)
+
+    def test_new_account_type_needs_only_a_registry_entry(self):
+        class CappedWithdrawal(WithdrawalStrategy):
+            def is_allowed(self, account, amount, context):
+                if amount > 100:
+                    return False, "Above cap."
+                return True, ''
+
+            def calculate_withdrawal_charge(self, account, context):
+                return 1
+
+        account = Account.objects.create(account_number='P1', account_type='capped', balance=1000,
+                                         user=self.user, bank=self.bank)
+        with mock.patch.dict(strategies.WITHDRAWAL_STRATEGIES, {'capped': CappedWithdrawal()}):
+            self.assertEqual(account.withdraw(500), (False, "Above cap."))
+            self.assertEqual(account.withdraw(100), (True, ''))
+            self.assertTrue(account.deposit(100)[0])
+
+        self.assertEqual(account.balance, 999)
@@ -0,0 +1,160 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from ..cache import account_cache
+from ..models import Account, AccountPeriodCounter, Bank, DailyBalance, RollupDelta, Transaction, Transfer, User
+from ..transfers import post_transfers
+
+
+class TransferTestCase(TestCase):
+    def setUp(self):
+        account_cache().clear()
+        self.user = User.objects.create(name='Test User', address='Test Address')
+        self.bank = Bank.objects.create(name='Test Bank')
+        self.saving = self.create_account('S1', 'regular_saving', 10000)
+        self.zero = self.create_account('Z1', 'zero_balance', 500)
+        self.student = self.create_account('T1', 'student', 5000)
+
+    def create_account(self, account_number, account_type, balance):
+        return Account.objects.create(account_number=account_number, account_type=account_type, balance=balance,
+                                      user=self.user, bank=self.bank)
+
+    def post_transfer(self, source, destination_id, amount, **headers):
+        return self.client.post(reverse('transfer', kwargs={'account_id': source.pk}),
+                                json.dumps({"destination_id": destination_id, "amount": amount}),
+                                content_type='application/json', headers=headers)
+
+    def test_transfer_writes_paired_rows(self):
+        self.assertEqual(self.saving.transfer(self.zero, 1000, reference='INV-1'), (True, ''))
+        self.assertEqual((self.saving.balance, self.zero.balance), (9000, 1500))
+
+        transfer = Transfer.objects.get()
+        withdrawal = Transaction.objects.get(pk=transfer.withdrawal_id)
+        deposit = Transaction.objects.get(pk=transfer.deposit_id)
+        self.assertEqual((withdrawal.account_id, withdrawal.transaction_type, withdrawal.amount,
+                          withdrawal.available_balance_after_transaction), (self.saving.pk, 'withdrawal', 1000, 9000))
+        self.assertEqual((deposit.account_id, deposit.transaction_type, deposit.amount,
+                          deposit.available_balance_after_transaction), (self.zero.pk, 'deposit', 1000, 1500))
+        self.assertEqual((transfer.amount, transfer.reference), (1000, 'INV-1'))
+
+        self.assertEqual(AccountPeriodCounter.current(self.saving).withdrawal_count, 1)
+        self.assertEqual(AccountPeriodCounter.current(self.zero).deposit_total, 1000)
+        today = DailyBalance.objects.get(account=self.zero, date=timezone.localdate())
+        self.assertEqual((today.opening_balance, today.closing_balance), (500, 1500))
+        self.assertEqual(account_cache().get(self.saving.pk).balance, 9000)
+        ledger_delta = RollupDelta.objects.get(accounts=0)
+        self.assertEqual((ledger_delta.balance, ledger_delta.deposit_count, ledger_delta.withdrawal_count), (0, 1, 1))
+
+    def test_both_directions_lock_in_the_same_order(self):
+        for source, destination in [(self.saving, self.zero), (self.zero, self.saving)]:
+            with CaptureQueriesContext(connection) as queries:
+                source.transfer(destination, 10)
+            lock = next(query['sql'] for query in queries if 'FROM "core_account"' in query['sql'])
+            self.assertIn('ORDER BY "core_account"."id" ASC', lock)
+
+    def test_rules_are_checked_on_both_sides(self):
+        AccountPeriodCounter.objects.create(account=self.student, period=AccountPeriodCounter.period_for(),
+                                            deposit_total=5000)
+        self.assertEqual(self.zero.transfer(self.saving, 600),
+                         (False, 'Insufficient balance in your account'))
+        self.assertEqual(self.saving.transfer(self.student, 6000),
+                         (False, 'Monthly deposit limit is exceeded.'))
+        self.assertEqual(self.saving.transfer(self.saving, 10),
+                         (False, 'The source and destination accounts must differ'))
+        self.assertFalse(Transaction.objects.exists())
+        self.saving.refresh_from_db()
+        self.assertEqual(self.saving.balance, 10000)
+
+    def test_charge_is_paid_by_the_source(self):
+        AccountPeriodCounter.objects.create(account=self.saving, period=AccountPeriodCounter.period_for(),
+                                            withdrawal_count=10)
+        self.assertEqual(self.saving.transfer(self.zero, 100), (True, ''))
+        self.assertEqual((self.saving.balance, self.zero.balance), (9895, 600))
+        self.assertEqual(Transfer.objects.get().charge, 5)
+
+    def test_batch_evaluates_transfers_in_order(self):
+        results = post_transfers([
+            {'source_id': self.zero.pk, 'destination_id': self.saving.pk, 'amount': 700},
+            {'source_id': self.saving.pk, 'destination_id': self.zero.pk, 'amount': 300, 'reference': 'R1'},
+            # Allowed only because the transfer before it was applied first.
+            {'source_id': self.zero.pk, 'destination_id': self.saving.pk, 'amount': 700},
+            {'source_id': self.saving.pk, 'destination_id': 9999, 'amount': 1},
+            {'source_id': self.saving.pk, 'destination_id': self.zero.pk, 'amount': 300, 'reference': 'R1'},
+        ], batch_size=2)
+
+        self.assertEqual([result['status'] for result in results],
+                         ['rejected', 'posted', 'posted', 'rejected', 'rejected'])
+        self.assertEqual([result['reason'] for result in results[3:]],
+                         ['Account not found', 'A transfer with this reference was already posted'])
+        self.assertEqual((results[2]['source_balance'], results[2]['destination_balance']), (100, 10400))
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.zero.refresh_from_db()
+        self.assertEqual(self.zero.balance, 100)
+        self.assertEqual(AccountPeriodCounter.current(self.zero).withdrawal_count, 1)
+
+    def test_atomic_batch_rolls_back(self):
+        results = post_transfers([
+            {'source_id': self.saving.pk, 'destination_id': self.zero.pk, 'amount': 100},
+            {'source_id': self.zero.pk, 'destination_id': self.saving.pk, 'amount': 5000},
+        ], atomic=True)
+
+        self.assertEqual([result['status'] for result in results], ['rolled_back', 'rejected'])
+        self.assertFalse(Transfer.objects.exists())
+        self.saving.refresh_from_db()
+        self.assertEqual(self.saving.balance, 10000)
+
+    def test_endpoints(self):
+        response = self.post_transfer(self.saving, self.zero.pk, 250, **{'Idempotency-Key': 'transfer-1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['updated_balance'], response.data['destination_balance']), (9750, 750))
+        replayed = self.post_transfer(self.saving, self.zero.pk, 250, **{'Idempotency-Key': 'transfer-1'})
+        self.assertEqual(replayed.headers['Idempotent-Replayed'], 'true')
+        reused = self.post_transfer(self.saving, self.student.pk, 250, **{'Idempotency-Key': 'transfer-1'})
+        self.assertEqual(reused.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Transfer.objects.count(), 1)
+
+        self.assertEqual(self.post_transfer(self.saving, 9999, 1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.post_transfer(self.saving, self.zero.pk, 0).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post_transfer(self.zero, self.saving.pk, 10000)
+        self.assertEqual(response.data['error'], 'Transfer failed because Insufficient balance in your account')
+
+        response = self.client.post(reverse('transfer_batch'), json.dumps({"atomic": False, "transfers": [
+            {"source_id": self.saving.pk, "destination_id": self.zero.pk, "amount": 50, "reference": "B1"},
+        ]}), content_type='application/json')
+        self.assertEqual(response.data['results'][0]['status'], 'posted')
+        self.assertTrue(response.data['committed'])
+
+    def test_settle_command(self):
+        path = self.settlement_file([
+            "source_account,destination_account,amount,reference",
+            "S1,Z1,100.50,L1",
+            "Z1,S1,abc,L2",
+            "S1,NOPE,10,L3",
+            "S1,Z1,100.50,L1",
+        ])
+        out, err = StringIO(), StringIO()
+        call_command('settle_transfers', path, stdout=out, stderr=err)
+        self.assertIn("Posted 1 of 4 transfers (3 rejected, 0 rolled back)", out.getvalue())
+        self.assertIn("Record 2: rejected: The amount must be a positive number", err.getvalue())
+        self.zero.refresh_from_db()
+        self.assertEqual(self.zero.balance, Decimal('600.50'))
+
+        # Rerunning the file posts nothing twice.
+        call_command('settle_transfers', path, '--atomic', stdout=out, stderr=StringIO())
+        self.assertIn("Posted 0 of 4 transfers (4 rejected, 0 rolled back)", out.getvalue())
+        self.assertEqual(Transfer.objects.count(), 1)
+
+    def settlement_file(self, lines):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as settlement:
+            settlement.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, settlement.name)
+        return settlement.name
@@ -0,0 +1,184 @@
+"""
+Account-to-account transfers, one at a time (`Account.transfer`) or in batches (settlement files).
+
+A transfer is a withdrawal from the source and a deposit into the destination: the source's withdrawal rules
+and the destination's deposit rules are each evaluated once, and the two ledger rows, the Transfer row that
+pairs them and both balance changes are written in one database transaction.
+
+Transfers are posted `batch_size` at a time. A batch locks every account it touches with a single
+SELECT ... FOR UPDATE ordered by id, so two batches (or two single transfers) moving money in opposite
+directions between the same accounts always take the locks in the same order and never deadlock. The rules
+are then evaluated in memory in request order, with each account's RuleContext and balance advanced as
+transfers are applied, and every table is written with one bulk statement, except the balances, which are
+compare-and-set on the version like core.batch.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .batch import StaleBalance, daily_row
+from .cache import account_cache
+from .constants import BatchConstant, TransferConstant
+from .models import Account, AccountPeriodCounter, DailyBalance, RollupDelta, RuleContext, Transaction, Transfer
+from .periods import month_start
+
+
+class TransfersRolledBack(Exception):
+    """
+    Raised inside an all-or-nothing batch to undo it after a transfer was rejected.
+    """
+
+
+def post_transfers(transfers, atomic=False, batch_size=TransferConstant.BATCH_SIZE):
+    """
+    Post a list of transfers and return one result per transfer, in request order.
+
+    Parameters:
+    - transfers: A list of dicts with `source_id`, `destination_id`, `amount` and an optional `reference`.
+    - atomic: When True, the whole list is committed only if every transfer is allowed.
+      Otherwise each batch of `batch_size` transfers is committed on its own and rejected transfers are skipped.
+    - batch_size: Number of transfers posted per database transaction when not atomic.
+
+    Returns:
+    - A list of result dicts with `status` 'posted', 'rejected' or 'rolled_back', the failure `reason`, and the
+      `transfer_id` and the `source_balance` and `destination_balance` after a posted transfer.
+    """
+    results = [
+        {
+            'index': index,
+            'source_id': item['source_id'],
+            'destination_id': item['destination_id'],
+            'amount': item['amount'],
+            'reference': item.get('reference') or '',
+            'status': 'rejected',
+            'reason': '',
+            'transfer_id': None,
+            'source_balance': None,
+            'destination_balance': None,
+        }
+        for index, item in enumerate(transfers)
+    ]
+    if not atomic:
+        for start in range(0, len(results), batch_size):
+            _post_batch(results[start:start + batch_size])
+        return results
+
+    try:
+        with transaction.atomic():
+            _post_batch(results)
+            if any(result['status'] == 'rejected' for result in results):
+                raise TransfersRolledBack
+    except TransfersRolledBack:
+        for result in results:
+            if result['status'] == 'posted':
+                result.update(status='rolled_back', reason=TransferConstant.FAILURE_REASONS["BATCH_ROLLED_BACK"],
+                              transfer_id=None, source_balance=None, destination_balance=None)
+    return results
+
+
+def _post_batch(results):
+    for attempt in range(BatchConstant.MAX_STALE_RETRIES):
+        try:
+            with transaction.atomic():
+                return _apply(results)
+        except StaleBalance:
+            for result in results:
+                result.update(status='rejected', reason='', transfer_id=None, source_balance=None,
+                              destination_balance=None)
+    for result in results:
+        result['reason'] = TransferConstant.FAILURE_REASONS["ACCOUNT_BUSY"]
+
+
+def _apply(results):
+    account_ids = {result[key] for result in results for key in ('source_id', 'destination_id')} - {None}
+    # One statement locks every account of the batch in id order: the lock order of every writer.
+    accounts = RuleContext.annotate(Account.objects.select_for_update(of=('self',))).filter(pk__in=account_ids)
+    accounts = {account.pk: account for account in accounts.order_by('pk')}
+    contexts = RuleContext.load(accounts.values())
+    opening_balances = {pk: account.balance for pk, account in accounts.items()}
+    references = {result['reference'] for result in results if result['reference']}
+    used_references = set(Transfer.objects.filter(reference__in=references).values_list('reference', flat=True))
+
+    now = timezone.now()
+    posted = []
+    for result in results:
+        reason, ledger_amount = _check(result, accounts, contexts, used_references)
+        if reason:
+            result['reason'] = reason
+            continue
+        source, destination = accounts[result['source_id']], accounts[result['destination_id']]
+        amount = result['amount']
+        source.balance -= ledger_amount
+        destination.balance += amount
+        contexts[source.pk].record('withdrawal', ledger_amount)
+        contexts[destination.pk].record('deposit', amount)
+        if result['reference']:
+            used_references.add(result['reference'])
+        withdrawal = Transaction(account_id=source.pk, amount=ledger_amount, charge=ledger_amount - amount,
+                                 transaction_type='withdrawal', timestamp=now,
+                                 available_balance_after_transaction=source.balance)
+        deposit = Transaction(account_id=destination.pk, amount=amount, transaction_type='deposit', timestamp=now,
+                              available_balance_after_transaction=destination.balance)
+        posted.append((result, withdrawal, deposit))
+        result.update(status='posted', source_balance=source.balance, destination_balance=destination.balance)
+
+    if not posted:
+        return
+    changed = [accounts[pk] for pk in sorted({pk for result, _, _ in posted
+                                              for pk in (result['source_id'], result['destination_id'])})]
+    for account in changed:
+        # Compare-and-set on the version the rules were evaluated against: on backends where
+        # select_for_update() is a no-op a concurrent writer makes this update miss and the batch is retried.
+        updated = Account.objects.filter(pk=account.pk, version=account.version).update(
+            balance=F('balance') + (account.balance - opening_balances[account.pk]), version=F('version') + 1)
+        if not updated:
+            raise StaleBalance
+        account.version += 1
+
+    ledger = [row for _, withdrawal, deposit in posted for row in (withdrawal, deposit)]
+    Transaction.objects.bulk_create(ledger)
+    rows = Transfer.objects.bulk_create([
+        Transfer(source_id=withdrawal.account_id, destination_id=deposit.account_id, amount=deposit.amount,
+                 charge=withdrawal.charge, reference=result['reference'], withdrawal_id=withdrawal.pk,
+                 deposit_id=deposit.pk, timestamp=now)
+        for result, withdrawal, deposit in posted
+    ])
+    for (result, _, _), row in zip(posted, rows):
+        result['transfer_id'] = row.pk
+    RollupDelta.record_ledger(accounts, ledger)
+
+    today = timezone.localdate(now)
+    period = month_start(now)
+    AccountPeriodCounter.objects.bulk_create(
+        [AccountPeriodCounter(account_id=account.pk, period=period,
+                              withdrawal_count=contexts[account.pk].withdrawal_count,
+                              deposit_total=contexts[account.pk].deposit_total) for account in changed],
+        update_conflicts=True, unique_fields=['account', 'period'],
+        update_fields=['withdrawal_count', 'deposit_total'])
+    DailyBalance.objects.bulk_create(
+        [daily_row(account, contexts[account.pk].latest, opening_balances[account.pk], today) for account in changed],
+        update_conflicts=True, unique_fields=['account', 'date'], update_fields=['closing_balance'])
+    cache = account_cache()
+    for account in changed:
+        cache.write_through(account)
+
+
+def _check(result, accounts, contexts, used_references):
+    """
+    Evaluate a transfer against the current in-memory state of its accounts.
+    Returns (reason, ledger_amount), with an empty reason when the transfer is allowed.
+    """
+    amount = result['amount']
+    if amount is None or amount <= 0:
+        return TransferConstant.FAILURE_REASONS["INVALID_AMOUNT"], None
+    if result['source_id'] == result['destination_id']:
+        return TransferConstant.FAILURE_REASONS["SAME_ACCOUNT"], None
+    source, destination = accounts.get(result['source_id']), accounts.get(result['destination_id'])
+    if source is None or destination is None:
+        return TransferConstant.FAILURE_REASONS["ACCOUNT_NOT_FOUND"], None
+    if result['reference'] in used_references:
+        return TransferConstant.FAILURE_REASONS["DUPLICATE_REFERENCE"], None
+    allowed, reason, ledger_amount = source.check_operation('withdrawal', amount, contexts[source.pk])
+    if allowed:
+        allowed, reason, _ = destination.check_operation('deposit', amount, contexts[destination.pk])
+    return reason, ledger_amount
@@ -1,14 +1,33 @@
 # accounts/urls.py
 
 from django.urls import path
-from .views import create_account, deposit, withdraw, transaction_history, create_bank, create_user, update_kyc_status
+from . import async_views
+from .views import create_account, deposit, withdraw, transaction_history, create_bank, create_user, \
+    update_kyc_status, transaction_batch, export_account_ledger, export_bank_ledger, account_detail, \
+    monthly_statements, metrics, bank_rollup_list, bank_rollup, user_rollup, transfer, transfer_batch
 
 urlpatterns = [
     path('create_account/', create_account, name='create_account'),
+    path('account/<int:account_id>/', account_detail, name='account_detail'),
     path('deposit/<int:account_id>/', deposit, name='deposit'),
     path('withdraw/<int:account_id>/', withdraw, name='withdraw'),
     path('transaction_history/<int:account_id>/', transaction_history, name='transaction_history'),
+    path('statements/<int:account_id>/', monthly_statements, name='monthly_statements'),
     path('create_user/', create_user, name='create_user'),
     path('create_bank/', create_bank, name='create_bank'),
     path('update_kyc/<int:account_id>/', update_kyc_status, name='update_kyc_status'),
+    path('transactions/batch/', transaction_batch, name='transaction_batch'),
+    path('transfer/<int:account_id>/', transfer, name='transfer'),
+    path('transfers/batch/', transfer_batch, name='transfer_batch'),
+    path('export/account/<int:account_id>/', export_account_ledger, name='export_account_ledger'),
+    path('export/bank/<int:bank_id>/', export_bank_ledger, name='export_bank_ledger'),
+    path('rollups/banks/', bank_rollup_list, name='bank_rollup_list'),
+    path('rollups/banks/<int:bank_id>/', bank_rollup, name='bank_rollup'),
+    path('rollups/users/<int:user_id>/', user_rollup, name='user_rollup'),
+    path('metrics', metrics, name='metrics'),
+    path('async/deposit/<int:account_id>/', async_views.deposit, name='async_deposit'),
+    path('async/withdraw/<int:account_id>/', async_views.withdraw, name='async_withdraw'),
+    path('async/transaction_history/<int:account_id>/', async_views.transaction_history,
+         name='async_transaction_history'),
+    path('async/update_kyc/<int:account_id>/', async_views.update_kyc_status, name='async_update_kyc_status'),
 ]
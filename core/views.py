@@ -1,7 +1,21 @@
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import Account, Transaction
-from .serializers import AccountSerializer, TransactionSerializer, UserSerializer, BankSerializer
+from .batch import post_operations
+from .cache import cached_account
+from .constants import ExportConstant, IdempotencyConstant, MetricsConstant, StatementConstant
+from .exports import CONTENT_TYPES, export_filename, export_stream, ledger_rows
+from .idempotency import IdempotencyError, record, replay, request_fingerprint
+from .metrics import REGISTRY
+from .models import Account, Bank, MonthlyStatement, User
+from .pagination import InvalidHistoryParameter, history_page, history_rows, is_paginated
+from .periods import parse_month
+from .rollups import bank_rollups, user_rollups
+from .serializers import ACCOUNT_ROWS, TRANSACTION_ROWS, AccountSerializer, UserSerializer, BankSerializer, \
+    TransactionBatchSerializer, MonthlyStatementSerializer, BankRollupSerializer, UserRollupSerializer, \
+    TransferSerializer, TransferBatchSerializer
+from .transfers import post_transfers
 
 
 @api_view(['POST'])
@@ -58,21 +72,45 @@ def create_account(request):
     return Response(serializer.errors, status=400)
 
 
+@api_view(['GET'])
+def account_detail(request, account_id):
+    """
+    Retrieve an account, including its balance and KYC status.
+
+    Parameters:
+    - request: The HTTP request object.
+    - account_id: The ID of the account to retrieve.
+
+    Returns:
+    - Response with the account data, or error data if account is not found.
+    """
+    try:
+        account = cached_account(account_id)
+    except Account.DoesNotExist:
+        return Response({"error": "Account not found"}, status=404)
+    return Response(ACCOUNT_ROWS.row(account), status=200)
+
+
 @api_view(['POST'])
 def deposit(request, account_id):
     """
     Deposit money into an account.
 
     Parameters:
-    - request: The HTTP request object.
+    - request: The HTTP request object. With an `Idempotency-Key` header, a retry with the same key returns the
+      response of the first request instead of depositing again.
     - account_id: The ID of the account to deposit money into.
 
     Returns:
     - Response with the success message and updated balance if deposit is successful,
       or error data if validation fails or deposit fails.
     """
+    return _with_idempotency_key(request, account_id, 'deposit', _deposit)
+
+
+def _deposit(request, account_id):
     try:
-        account = Account.objects.get(pk=account_id)
+        account = cached_account(account_id)
     except Account.DoesNotExist:
         return Response({"error": "Account not found"}, status=404)
 
@@ -95,15 +133,20 @@ def withdraw(request, account_id):
     Withdraw money from an account.
 
     Parameters:
-    - request: The HTTP request object.
+    - request: The HTTP request object. With an `Idempotency-Key` header, a retry with the same key returns the
+      response of the first request instead of withdrawing again.
     - account_id: The ID of the account to withdraw money from.
 
     Returns:
     - Response with the success message and updated balance if withdrawal is successful,
       or error data if validation fails or withdrawal fails.
     """
+    return _with_idempotency_key(request, account_id, 'withdrawal', _withdraw)
+
+
+def _withdraw(request, account_id):
     try:
-        account = Account.objects.get(pk=account_id)
+        account = cached_account(account_id)
     except Account.DoesNotExist:
         return Response({"error": "Account not found"}, status=404)
 
@@ -119,26 +162,277 @@ def withdraw(request, account_id):
     return Response({"error": error_message}, status=400)
 
 
+def _with_idempotency_key(request, account_id, transaction_type, post, details=()):
+    key = request.headers.get(IdempotencyConstant.HEADER)
+    if key is None:
+        return post(request, account_id)
+
+    fingerprint = request_fingerprint(transaction_type, account_id, request.data.get('amount', 0),
+                                      *(request.data.get(name, '') for name in details))
+    try:
+        stored = replay(key, fingerprint)
+        if stored is not None:
+            status_code, body = stored
+            return Response(body, status=status_code, headers={'Idempotent-Replayed': 'true'})
+
+        def respond():
+            response = post(request, account_id)
+            return response.status_code, response.data
+
+        status_code, body = record(key, fingerprint, respond)
+    except IdempotencyError as error:
+        return Response({"error": str(error)}, status=error.status_code)
+    return Response(body, status=status_code)
+
+
+@api_view(['POST'])
+def transaction_batch(request):
+    """
+    Post many deposits and withdrawals in one request.
+
+    Parameters:
+    - request: The HTTP request object. The body holds `operations`, a list of
+      {"account_id", "transaction_type", "amount"} objects, and an optional `atomic` flag. With `atomic`
+      the batch is committed only if every operation is allowed; otherwise each allowed operation is committed.
+
+    Returns:
+    - Response with one result per operation, in request order, or error data if validation fails.
+    """
+    serializer = TransactionBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    atomic = serializer.validated_data['atomic']
+    results = post_operations(serializer.validated_data['operations'], atomic=atomic)
+    committed = not atomic or all(result['status'] == 'posted' for result in results)
+    return Response({"atomic": atomic, "committed": committed, "results": results}, status=200)
+
+
+@api_view(['POST'])
+def transfer(request, account_id):
+    """
+    Transfer money from an account to another one in a single database transaction.
+
+    Parameters:
+    - request: The HTTP request object. The body holds `destination_id`, `amount` and an optional `reference`;
+      a non-empty reference is posted at most once. With an `Idempotency-Key` header, a retry with the same key
+      returns the response of the first request instead of transferring again.
+    - account_id: The ID of the account to transfer money from.
+
+    Returns:
+    - Response with the success message and the updated balances of both accounts if the transfer is successful,
+      or error data if validation fails or the transfer fails.
+    """
+    return _with_idempotency_key(request, account_id, 'transfer', _transfer,
+                                 details=('destination_id', 'reference'))
+
+
+def _transfer(request, account_id):
+    serializer = TransferSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    try:
+        account = cached_account(account_id)
+        destination = cached_account(serializer.validated_data['destination_id'])
+    except Account.DoesNotExist:
+        return Response({"error": "Account not found"}, status=404)
+
+    success, failed_reason = account.transfer(destination, serializer.validated_data['amount'],
+                                              serializer.validated_data['reference'])
+    if success:
+        return Response({"message": "Transfer successful",
+                         "updated_balance": account.get_balance(),
+                         "destination_balance": destination.get_balance()}, status=200)
+    return Response({"error": f"Transfer failed because {failed_reason}"}, status=400)
+
+
+@api_view(['POST'])
+def transfer_batch(request):
+    """
+    Post many transfers in one request, e.g. the lines of a settlement file.
+
+    Parameters:
+    - request: The HTTP request object. The body holds `transfers`, a list of
+      {"source_id", "destination_id", "amount", "reference"} objects, and an optional `atomic` flag. With `atomic`
+      the batch is committed only if every transfer is allowed; otherwise each allowed transfer is committed.
+
+    Returns:
+    - Response with one result per transfer, in request order, or error data if validation fails.
+    """
+    serializer = TransferBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+
+    atomic = serializer.validated_data['atomic']
+    results = post_transfers(serializer.validated_data['transfers'], atomic=atomic)
+    committed = not atomic or all(result['status'] == 'posted' for result in results)
+    return Response({"atomic": atomic, "committed": committed, "results": results}, status=200)
+
+
 @api_view(['GET'])
 def transaction_history(request, account_id):
     """
-    Retrieve transaction history for an account.
+    Retrieve transaction history for an account, newest first, including archived transactions. Passing
+    `page_size` or `cursor` returns one page at a time; otherwise the whole history is returned as a list.
 
     Parameters:
-    - request: The HTTP request object.
+    - request: The HTTP request object. Optional query parameters:
+      - page_size: Number of transactions per page (default 50, at most 500). Turns on pagination.
+      - cursor: The `next_cursor` of the previous page. Turns on pagination.
+      - from, to: ISO 8601 dates or datetimes bounding the timestamps; `from` is inclusive and `to` is exclusive.
+        A date `to` includes that whole day.
+      - transaction_type: Only return deposits or withdrawals.
     - account_id: The ID of the account to retrieve transaction history for.
 
     Returns:
-    - Response with the list of transaction data if successful, or error data if account is not found.
+    - Response with the list of transaction data, or, when paginated, with the page of transaction data and the
+      cursor of the next page (null on the last page). Error data if account is not found or a parameter is
+      invalid.
     """
     try:
-        account = Account.objects.get(pk=account_id)
+        account = cached_account(account_id)
     except Account.DoesNotExist:
         return Response({"error": "Account not found"}, status=404)
 
-    transactions = Transaction.objects.filter(account=account).order_by('-timestamp')
-    serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data, status=200)
+    try:
+        if not is_paginated(request.query_params):
+            return Response(TRANSACTION_ROWS.rows(history_rows(account, request.query_params,
+                                                               TRANSACTION_ROWS.columns)), status=200)
+        rows, next_cursor = history_page(account, request.query_params, TRANSACTION_ROWS.columns)
+    except InvalidHistoryParameter as error:
+        return Response({"error": str(error)}, status=400)
+
+    return Response({"results": TRANSACTION_ROWS.rows(rows), "next_cursor": next_cursor}, status=200)
+
+
+@api_view(['GET'])
+def monthly_statements(request, account_id):
+    """
+    Retrieve the monthly statements of an account, newest first.
+
+    Parameters:
+    - request: The HTTP request object. Optional query parameter `month` (YYYY-MM) to retrieve a single month.
+    - account_id: The ID of the account to retrieve statements for.
+
+    Returns:
+    - Response with the statement data, or error data if the account or the month's statement is not found
+      or the month is malformed.
+    """
+    if not Account.objects.filter(pk=account_id).exists():
+        return Response({"error": "Account not found"}, status=404)
+
+    statements = MonthlyStatement.objects.filter(account_id=account_id).order_by('-period')
+    month = request.query_params.get('month')
+    if month is None:
+        return Response(MonthlyStatementSerializer(statements, many=True).data, status=200)
+
+    try:
+        period = parse_month(month)
+    except ValueError:
+        return Response({"error": StatementConstant.FAILURE_REASONS["INVALID_MONTH"]}, status=400)
+    statement = statements.filter(period=period).first()
+    if statement is None:
+        return Response({"error": StatementConstant.FAILURE_REASONS["STATEMENT_NOT_FOUND"]}, status=404)
+    return Response(MonthlyStatementSerializer(statement).data, status=200)
+
+
+@api_view(['GET'])
+def bank_rollup_list(request):
+    """
+    Retrieve the totals of every bank: account count, total balance, and deposit, withdrawal and fee volumes.
+
+    Parameters:
+    - request: The HTTP request object.
+
+    Returns:
+    - Response with one rollup per bank, in bank id order.
+    """
+    return Response(BankRollupSerializer(bank_rollups(), many=True).data, status=200)
+
+
+@api_view(['GET'])
+def bank_rollup(request, bank_id):
+    """
+    Retrieve the totals of one bank.
+
+    Parameters:
+    - request: The HTTP request object.
+    - bank_id: The ID of the bank.
+
+    Returns:
+    - Response with the bank's rollup, or error data if the bank is not found.
+    """
+    rollups = bank_rollups([bank_id])
+    if not rollups:
+        return Response({"error": "Bank not found"}, status=404)
+    return Response(BankRollupSerializer(rollups[0]).data, status=200)
+
+
+@api_view(['GET'])
+def user_rollup(request, user_id):
+    """
+    Retrieve the totals of one user's accounts across banks.
+
+    Parameters:
+    - request: The HTTP request object.
+    - user_id: The ID of the user.
+
+    Returns:
+    - Response with the user's rollup, or error data if the user is not found.
+    """
+    if not User.objects.filter(pk=user_id).exists():
+        return Response({"error": "User not found"}, status=404)
+    return Response(UserRollupSerializer(user_rollups([user_id])[0]).data, status=200)
+
+
+@require_GET
+def export_account_ledger(request, account_id):
+    """
+    Stream the full ledger of an account as NDJSON or CSV.
+
+    Parameters:
+    - request: The HTTP request object. Optional query parameters `format` ('ndjson' or 'csv', default 'ndjson')
+      and `gzip` ('1' to compress the stream).
+    - account_id: The ID of the account to export.
+
+    Returns:
+    - A streaming file download, or error data if the account is not found or the format is unknown.
+    """
+    if not Account.objects.filter(pk=account_id).exists():
+        return JsonResponse({"error": "Account not found"}, status=404)
+    return _ledger_export_response(request, 'account', account_id, ledger_rows(account_id=account_id))
+
+
+@require_GET
+def export_bank_ledger(request, bank_id):
+    """
+    Stream the ledgers of every account of a bank as NDJSON or CSV, grouped by account.
+
+    Parameters:
+    - request: The HTTP request object. Same query parameters as `export_account_ledger`.
+    - bank_id: The ID of the bank to export.
+
+    Returns:
+    - A streaming file download, or error data if the bank is not found or the format is unknown.
+    """
+    if not Bank.objects.filter(pk=bank_id).exists():
+        return JsonResponse({"error": "Bank not found"}, status=404)
+    return _ledger_export_response(request, 'bank', bank_id, ledger_rows(bank_id=bank_id))
+
+
+def _ledger_export_response(request, scope, pk, rows):
+    # Plain Django views: DRF would treat `?format=` as a renderer override.
+    file_format = request.GET.get('format', 'ndjson')
+    if file_format not in ExportConstant.FORMATS:
+        return JsonResponse({"error": f"Unsupported export format: {file_format}"}, status=400)
+    compress = request.GET.get('gzip') in ('1', 'true')
+
+    response = StreamingHttpResponse(
+        export_stream(rows, file_format, compress),
+        content_type='application/gzip' if compress else CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(scope, pk, file_format, compress)}"'
+    return response
 
 
 @api_view(['PATCH'])
@@ -155,7 +449,7 @@ def update_kyc_status(request, account_id):
       or error data if account is not found or KYC flag is not provided.
     """
     try:
-        account = Account.objects.get(pk=account_id)
+        account = cached_account(account_id)
     except Account.DoesNotExist:
         return Response({"error": "Account not found"}, status=404)
 
@@ -165,3 +459,17 @@ def update_kyc_status(request, account_id):
 
     account.update_kyc_status(kyc_verified)
     return Response({"message": "KYC status updated successfully"}, status=200)
+
+
+@require_GET
+def metrics(request):
+    """
+    Expose the request, account operation and rule check metrics in the Prometheus text format.
+
+    Parameters:
+    - request: The HTTP request object.
+
+    Returns:
+    - The metrics of this process as plain text.
+    """
+    return HttpResponse(REGISTRY.exposition(), content_type=MetricsConstant.CONTENT_TYPE)